@@ -0,0 +1,6 @@
+# ai_service/api/__init__.py
+"""
+HTTP 서비스 (FastAPI).
+- main: 앱 / 엔드포인트 / 기동·종료 처리
+- schemas: 요청·응답 모델
+"""
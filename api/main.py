@@ -0,0 +1,311 @@
+# ai_service/api/main.py
+"""
+MediNote 챗봇 HTTP 서비스.
+
+    POST /v1/chat          : JSON 응답 (run_chat_flow)
+    POST /v1/chat/stream   : SSE 스트리밍 (event: delta ... event: done)
+    POST /v1/stt           : 음성 파일 업로드 → 텍스트
+    GET  /healthz          : 프로세스 생존 여부 (liveness)
+    GET  /readyz           : 워밍업 완료 + 종료 중 아님 (readiness)
+    GET  /metrics          : Prometheus (워커 프로세스 단위)
+
+실행:
+    python -m api.main                       # API_WORKERS 개 워커
+    uvicorn api.main:app --workers 4 --timeout-graceful-shutdown 30
+
+워커마다 클라이언트(OpenAI / OpenSearch)를 기동 시점에 만들어 두고,
+SIGTERM 을 받으면 uvicorn 이 새 연결을 막고 진행 중 요청을 API_GRACEFUL_TIMEOUT_SEC 까지 기다린 뒤
+lifespan 종료 단계에서 클라이언트를 닫고 로그 큐를 비운다.
+/metrics 는 워커별 값이므로 수평 확장 시에는 컨테이너당 워커 1개 + 파드 단위 스크레이프를 권장.
+"""
+import asyncio
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from llm.admission import AdmissionRejected
+from llm.breaker import breaker_snapshot
+from llm.deadline import DeadlineExceeded
+from llm.graph_orchestrator import run_chat_flow, stream_chat_flow
+from llm.telemetry import (
+    PROMETHEUS_CONTENT_TYPE,
+    configure_logging,
+    log_info,
+    record_error,
+    render_prometheus,
+    shutdown_logging,
+    trace_context,
+)
+
+from .schemas import ChatRequest, ChatResponse, SttResponse
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+API_GRACEFUL_TIMEOUT_SEC = int(os.getenv("API_GRACEFUL_TIMEOUT_SEC", "30"))
+STT_MAX_BYTES = int(os.getenv("STT_MAX_BYTES", str(25 * 1024 * 1024)))  # OpenAI 업로드 한도
+STT_FORM_OVERHEAD_BYTES = 64 * 1024  # multipart 경계 / language 필드 등 파일 외 부분 여유
+
+
+# =========================
+#  기동 / 종료
+# =========================
+def warmup() -> Dict[str, str]:
+    """
+    공유 클라이언트를 미리 만들어 둔다. (첫 요청이 클라이언트 생성 비용을 내지 않도록)
+    반환: {"openai": "ok" | 오류 메시지, "opensearch": ...}
+    """
+    from llm.embeddings import get_openai_client
+    from llm.opensearch_client import get_opensearch_client
+
+    status: Dict[str, str] = {}
+    for name, factory in (("openai", get_openai_client), ("opensearch", get_opensearch_client)):
+        try:
+            factory()
+            status[name] = "ok"
+        except Exception as e:
+            record_error("warmup", e)
+            status[name] = f"{type(e).__name__}: {e}"
+    return status
+
+
+def _close_clients() -> None:
+    from llm.embeddings import get_openai_client
+    from llm.opensearch_client import get_opensearch_client
+
+    for factory in (get_openai_client, get_opensearch_client):
+        try:
+            close = getattr(factory(), "close", None)
+            if callable(close):
+                close()
+        except Exception as e:
+            log_info("api_client_close_failed", error=str(e))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    app.state.ready = False
+    configure_logging()  # 워커 프로세스마다 로그 리스너 스레드 시작 (이전 종료에서 멈췄을 수 있음)
+    app.state.warmup = await run_in_threadpool(warmup)
+    app.state.ready = all(v == "ok" for v in app.state.warmup.values())
+    log_info("api_started", pid=os.getpid(), warmup=app.state.warmup)
+    try:
+        yield
+    finally:
+        # 여기 도달 = uvicorn 이 진행 중 요청을 다 처리했거나 graceful timeout 경과
+        app.state.ready = False
+        log_info("api_stopping", pid=os.getpid())
+        await run_in_threadpool(_close_clients)
+        shutdown_logging()
+
+
+app = FastAPI(title="MediNote AI Service", lifespan=lifespan)
+
+
+def _rejected_response(err: AdmissionRejected) -> JSONResponse:
+    return JSONResponse(
+        err.to_dict(),
+        status_code=429,
+        headers={"Retry-After": str(max(1, int(err.retry_after + 0.999)))},
+    )
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, err: AdmissionRejected) -> JSONResponse:
+    return _rejected_response(err)
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, err: DeadlineExceeded) -> JSONResponse:
+    return JSONResponse({"error": "deadline_exceeded", "stage": err.stage}, status_code=504)
+
+
+# =========================
+#  헬스 체크
+# =========================
+@app.get("/healthz")
+async def healthz() -> Dict[str, str]:
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(request: Request) -> JSONResponse:
+    ready = getattr(request.app.state, "ready", False)
+    # 브레이커가 열려 있어도 degraded 모드로 답할 수 있으므로 readiness 에는 반영하지 않고 정보로만
+    body = {
+        "ready": ready,
+        "warmup": getattr(request.app.state, "warmup", {}),
+        "breakers": breaker_snapshot(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+# =========================
+#  챗봇
+# =========================
+def _chat_sync(req: ChatRequest) -> Dict[str, Any]:
+    with trace_context(
+        name="api_chat_request",
+        run_type="chain",
+        inputs={"query": req.query, "user_id": req.user_id},
+        tags=["api"],
+        metadata={},
+    ):
+        return run_chat_flow(
+            query=req.query,
+            user_id=req.user_id,
+            history=req.history_dicts(),
+            user_profile=req.user_profile,
+            session_id=req.session_id,
+        )
+
+
+@app.post("/v1/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest) -> Dict[str, Any]:
+    # 파이프라인은 동기 I/O 라서 스레드풀에서 실행 (이벤트 루프를 막지 않게)
+    return await run_in_threadpool(_chat_sync, req)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _pump_events(make_events: Callable[[], Iterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    동기 이벤트 제너레이터를 워커 스레드 하나에서 끝까지 돌리고(ContextVar 유지),
+    이벤트를 asyncio 큐로 넘긴다. 입장 거절은 {"event": "rejected"} 로 바뀌어 나온다.
+    소비 쪽이 그만두면(클라이언트 끊김) stop 을 세워 다음 이벤트에서 제너레이터를 닫는다.
+    """
+    loop = asyncio.get_running_loop()
+    events: "asyncio.Queue[Dict[str, Any] | None]" = asyncio.Queue()
+    stop = threading.Event()
+
+    def emit(item: Dict[str, Any] | None) -> None:
+        try:
+            loop.call_soon_threadsafe(events.put_nowait, item)
+        except RuntimeError:  # 루프가 이미 닫힘 (종료 중)
+            stop.set()
+
+    def worker() -> None:
+        gen = make_events()
+        try:
+            for ev in gen:
+                if stop.is_set():
+                    break
+                emit(ev)
+        except AdmissionRejected as e:
+            emit({"event": "rejected", "data": e})
+        except Exception as e:
+            emit({"event": "error", "data": {"error": type(e).__name__, "message": str(e)}})
+        finally:
+            gen.close()
+            emit(None)
+
+    task = asyncio.ensure_future(run_in_threadpool(worker))
+    try:
+        while True:
+            ev = await events.get()
+            if ev is None:
+                break
+            yield ev
+    finally:
+        stop.set()
+        if task.done() and not task.cancelled():
+            task.exception()  # 미회수 예외 경고 방지
+
+
+@app.post("/v1/chat/stream")
+async def chat_stream(req: ChatRequest) -> Response:
+    def make_events() -> Iterator[Dict[str, Any]]:
+        return stream_chat_flow(
+            query=req.query,
+            user_id=req.user_id,
+            history=req.history_dicts(),
+            user_profile=req.user_profile,
+            session_id=req.session_id,
+        )
+
+    # 첫 이벤트(admitted / rejected)까지 기다렸다가 상태 코드를 정한다
+    pump = _pump_events(make_events)
+    first = await pump.__anext__()
+    if first["event"] == "rejected":
+        await pump.aclose()
+        return _rejected_response(first["data"])
+
+    async def body() -> AsyncIterator[str]:
+        try:
+            yield _sse(first["event"], first["data"])
+            async for ev in pump:
+                yield _sse(ev["event"], ev["data"])
+        finally:
+            await pump.aclose()
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =========================
+#  STT
+# =========================
+def _stt_too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail=f"파일이 너무 큽니다. (최대 {STT_MAX_BYTES} bytes)")
+
+
+@app.middleware("http")
+async def limit_stt_upload(request: Request, call_next: Callable) -> Response:
+    """Content-Length 가 한도를 넘으면 multipart 본문을 받기 전에 413"""
+    if request.url.path == "/v1/stt":
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > STT_MAX_BYTES + STT_FORM_OVERHEAD_BYTES:
+            err = _stt_too_large()
+            return JSONResponse(status_code=err.status_code, content={"detail": err.detail})
+    return await call_next(request)
+
+
+@app.post("/v1/stt", response_model=SttResponse)
+async def stt(file: UploadFile = File(...), language: str = Form("ko")) -> Dict[str, str]:
+    from multimodal.stt_service import transcribe_audio_bytes
+
+    # 한도 + 1 바이트까지만 메모리로 읽는다 (Content-Length 없는 chunked 업로드 대비)
+    audio = await file.read(STT_MAX_BYTES + 1)
+    if not audio:
+        raise HTTPException(status_code=400, detail="빈 파일입니다.")
+    if len(audio) > STT_MAX_BYTES:
+        raise _stt_too_large()
+
+    text = await run_in_threadpool(
+        transcribe_audio_bytes, audio, file.filename or "audio.wav", language or None
+    )
+    log_info("api_stt_completed", bytes=len(audio), chars=len(text))
+    return {"text": text}
+
+
+def main() -> None:
+    import uvicorn
+
+    uvicorn.run(
+        "api.main:app",
+        host=API_HOST,
+        port=API_PORT,
+        workers=API_WORKERS,
+        timeout_graceful_shutdown=API_GRACEFUL_TIMEOUT_SEC,
+        log_level=os.getenv("LOG_LEVEL", "info").lower(),
+    )
+
+
+if __name__ == "__main__":
+    main()
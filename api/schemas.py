@@ -0,0 +1,36 @@
+# ai_service/api/schemas.py
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ChatRequest(BaseModel):
+    query: str = Field(..., description="사용자 질문")
+    user_id: Optional[str] = None
+    # 대화 세션 id. history 를 생략하면 서버에 저장된 세션 이력을 쓰고 이번 턴을 추가한다
+    session_id: Optional[str] = None
+    # 클라이언트가 이력을 직접 관리할 때만 (session_id 가 있으면 요약 캐시 키로만 사용)
+    history: Optional[List[ChatMessage]] = None
+    # 없으면 user_id 로 DB 에서 로드
+    user_profile: Optional[Dict[str, Any]] = None
+
+    def history_dicts(self) -> Optional[List[Dict[str, str]]]:
+        if self.history is None:
+            return None
+        return [m.model_dump() for m in self.history]
+
+
+class ChatResponse(BaseModel):
+    answer: str
+    source_url: Optional[str] = None
+    citations: List[Dict[str, Any]] = Field(default_factory=list)
+    debug: Dict[str, Any] = Field(default_factory=dict)
+
+
+class SttResponse(BaseModel):
+    text: str
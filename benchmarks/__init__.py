@@ -0,0 +1 @@
+# 벤치마크 / 오프라인 평가 스크립트 패키지
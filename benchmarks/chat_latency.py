@@ -0,0 +1,172 @@
+# benchmarks/chat_latency.py
+"""
+run_chat_flow 엔드투엔드 지연시간 벤치마크 (API 비용 0).
+
+OpenAI / OpenSearch 대신 지연시간 분포를 설정한 가짜 클라이언트를 주입하고,
+여러 동시성 수준에서 요청을 돌려 처리량과 스테이지별 p50/p95/p99 를 기록한다.
+- embedding / knn / llm : 가짜 클라이언트 안에서 잰 시간 (헤지 사용 시 span 값)
+- orchestrator          : 전체 - (위 스테이지 합) = 우리 코드 오버헤드
+- normalize / safety / route / rerank / prompt_build : debug["timings_ms"] 의 span 값
+결과 JSON 은 커밋 간 비교용.
+
+    python -m benchmarks.chat_latency --concurrency 1 4 16 --requests 200
+    python -m benchmarks.chat_latency --llm-p50 0 --embed-p50 0 --knn-p50 0   # 순수 오버헤드
+"""
+import argparse
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fakes import DEFAULT_DIM, FakeOpenAI, LatencyModel, SlowSearchClient, StageRecorder, hash_embedding
+from benchmarks.local_index import LocalOpenSearchClient, load_corpus
+from benchmarks.report import RESULTS_DIR, latency_summary, print_table, write_json
+
+EXTERNAL_STAGES = ["embedding", "knn", "llm"]
+INTERNAL_STAGES = ["normalize", "safety", "route", "rerank", "prompt_build"]
+
+DRUGS = ["타이레놀", "아스피린", "이부프로펜", "리바로", "오메가3", "비타민D", "판콜에이", "겔포스"]
+SECTIONS = ["효능·효과", "용법·용량", "주의사항", "상호작용", "부작용"]
+
+QUERIES = [
+    "타이레놀 정제는 하루에 최대 몇 알까지 먹어도 되나요?",
+    "이부프로펜이랑 아스피린을 같이 먹어도 괜찮은가요?",
+    "리바로정 복용할 때 피해야 하는 음식이 있나요?",
+    "오메가3와 혈액응고에 관련된 주의사항이 있나요?",
+    "속쓰림이 있을 때 겔포스를 먹어도 되나요?",
+    "비타민D 보충제를 언제 먹는게 좋나요?",
+    "안녕 반가워",
+    "하이 오늘 기분 어때",
+]
+
+
+def synthetic_corpus(dim: int = DEFAULT_DIM):
+    """약 이름 × 섹션 조합의 작은 합성 코퍼스 (해시 임베딩)"""
+    sources = []
+    for i, (drug, section) in enumerate(itertools.product(DRUGS, SECTIONS)):
+        content = f"{drug} {section}: {drug}의 {section}에 관한 설명입니다. " * 8
+        sources.append(
+            {
+                "id": f"doc_{i}",
+                "title": f"{drug} {section}",
+                "doc_type": "drug",
+                "content": content,
+                "detail_url": f"https://example.com/{i}",
+            }
+        )
+    vectors = [hash_embedding(s["title"] + "\n" + s["content"], dim) for s in sources]
+    return sources, vectors
+
+
+def run_level(
+    concurrency: int,
+    n_requests: int,
+    recorder: StageRecorder,
+) -> Dict[str, Any]:
+    from llm.graph_orchestrator import run_chat_flow
+
+    def one(i: int) -> Dict[str, float]:
+        recorder.reset()
+        start = time.perf_counter()
+        result = run_chat_flow(query=QUERIES[i % len(QUERIES)], user_id=None, history=[], user_profile={})
+        total = (time.perf_counter() - start) * 1000
+        stages = recorder.snapshot()
+        timings = result.get("debug", {}).get("timings_ms", {})
+        for name in INTERNAL_STAGES:
+            if name in timings:
+                stages[name] = timings[name]
+        # 헤지(HEDGE_ENABLED)가 켜지면 가짜 클라이언트가 다른 스레드에서 돌아 recorder 에 안 잡힘 → span 값 사용
+        for name in EXTERNAL_STAGES:
+            if name not in stages and name in timings:
+                stages[name] = timings[name]
+        stages["total"] = total
+        stages["orchestrator"] = max(total - sum(stages.get(s, 0.0) for s in EXTERNAL_STAGES), 0.0)
+        return stages
+
+    # 워밍업 (import / 첫 호출 비용 제외)
+    for i in range(min(concurrency, len(QUERIES))):
+        one(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(n_requests)))
+    wall = time.perf_counter() - start
+
+    stages: Dict[str, Dict[str, float]] = {}
+    for name in ["total", "orchestrator"] + EXTERNAL_STAGES + INTERNAL_STAGES:
+        values = [s[name] for s in samples if name in s]
+        stages[name] = latency_summary(values)
+
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "wall_sec": round(wall, 3),
+        "throughput_rps": round(n_requests / wall, 2),
+        "stages": stages,
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="run_chat_flow 지연시간 벤치마크 (가짜 OpenAI/OpenSearch)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="동시성 수준별 요청 수")
+    parser.add_argument("--corpus", type=Path, help="코퍼스 스냅샷 (본문을 해시 임베딩으로 다시 계산)")
+    parser.add_argument("--embed-p50", type=float, default=80.0)
+    parser.add_argument("--embed-p95", type=float, default=200.0)
+    parser.add_argument("--knn-p50", type=float, default=40.0)
+    parser.add_argument("--knn-p95", type=float, default=120.0)
+    parser.add_argument("--llm-p50", type=float, default=1200.0)
+    parser.add_argument("--llm-p95", type=float, default=3000.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR / "chat_latency.json")
+    args = parser.parse_args(argv)
+
+    from llm.embeddings import set_openai_client
+    from llm.opensearch_client import set_opensearch_client
+
+    if args.corpus:
+        sources, _ = load_corpus(args.corpus)
+        vectors = [hash_embedding(f"{s.get('title', '')}\n{s.get('content', '')}") for s in sources]
+    else:
+        sources, vectors = synthetic_corpus()
+
+    recorder = StageRecorder()
+    fake_openai = FakeOpenAI(
+        embed_latency=LatencyModel(args.embed_p50, args.embed_p95, seed=args.seed),
+        chat_latency=LatencyModel(args.llm_p50, args.llm_p95, seed=args.seed + 1),
+        recorder=recorder,
+    )
+    search_client = SlowSearchClient(
+        LocalOpenSearchClient(sources, vectors),
+        LatencyModel(args.knn_p50, args.knn_p95, seed=args.seed + 2),
+        recorder=recorder,
+    )
+
+    set_openai_client(fake_openai)
+    set_opensearch_client(search_client)
+    try:
+        results = []
+        for c in args.concurrency:
+            print(f"⏱ 동시성 {c} × {args.requests} 요청...")
+            results.append(run_level(c, args.requests, recorder))
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+    rows = []
+    for r in results:
+        for stage, summary in r["stages"].items():
+            rows.append({"concurrency": r["concurrency"], "rps": r["throughput_rps"], "stage": stage, **summary})
+    print()
+    print_table(rows, ["concurrency", "rps", "stage", "count", "p50", "p95", "p99"])
+
+    config = {k: v for k, v in vars(args).items() if k != "out"}
+    config["corpus"] = str(args.corpus) if args.corpus else "synthetic"
+    config["docs"] = len(sources)
+    path = write_json(args.out, "chat_latency", config, results)
+    print(f"\n📝 결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# benchmarks/fakes.py
+"""
+API 비용 없이 파이프라인을 돌리기 위한 가짜 구성요소.
+
+- hash_embedding: 문자 n-gram 해싱 기반 결정적 임베딩
+  (비슷한 문자열끼리 가까운 벡터가 나오므로 검색 동작도 그럴듯하게 흉내냄)
+- FakeOpenAI / SlowSearchClient: 지연시간 분포를 설정할 수 있는 주입용 클라이언트
+- synth_speech / transcribe_tones: 단어마다 고유 주파수 톤을 쓰는 합성 "음성"과 그 전사기
+  (FakeOpenAI.audio.transcriptions 로 STT 청크 분할·이어 붙이기를 오프라인에서 검증)
+"""
+import hashlib
+import math
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_DIM = 256
+
+
+def hash_embedding(text: str, dim: int = DEFAULT_DIM, ngram: int = 2) -> List[float]:
+    vec = np.zeros(dim, dtype=np.float32)
+    text = (text or "").lower()
+    if len(text) < ngram:
+        text = text.ljust(ngram)
+
+    for i in range(len(text) - ngram + 1):
+        gram = text[i : i + ngram]
+        if not gram.strip():
+            continue
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+
+    norm = float(np.linalg.norm(vec))
+    if norm > 0:
+        vec /= norm
+    return vec.tolist()
+
+
+def embeddings_response(vectors: List[List[float]], prompt_tokens: int = 0) -> SimpleNamespace:
+    """openai embeddings.create 응답과 같은 모양"""
+    return SimpleNamespace(
+        data=[SimpleNamespace(embedding=v, index=i) for i, v in enumerate(vectors)],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens),
+    )
+
+
+# =========================
+#  지연시간 모델 / 스테이지 기록
+# =========================
+class LatencyModel:
+    """
+    로그정규 분포 지연시간. p50 / p95 (ms) 두 값으로 모양을 정한다.
+    seed 를 고정하면 같은 순서의 호출에 같은 지연이 나온다.
+    """
+
+    def __init__(self, p50_ms: float = 0.0, p95_ms: float | None = None, seed: int = 0):
+        self.p50_ms = p50_ms
+        self.p95_ms = p95_ms if p95_ms is not None else p50_ms
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self) -> float:
+        if self.p50_ms <= 0:
+            return 0.0
+        mu = math.log(self.p50_ms)
+        sigma = max(math.log(max(self.p95_ms, self.p50_ms) / self.p50_ms) / 1.645, 1e-9)
+        with self._lock:
+            return float(self._rng.lognormal(mu, sigma))
+
+    def sleep(self) -> float:
+        ms = self.sample_ms()
+        if ms > 0:
+            time.sleep(ms / 1000)
+        return ms
+
+
+class StageRecorder:
+    """
+    가짜 클라이언트가 호출될 때마다 스테이지별 소요시간(ms)을 스레드 단위로 누적.
+    벤치마크 워커는 요청 시작 시 reset(), 끝나면 snapshot() 을 읽는다.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def reset(self) -> None:
+        self._local.stages = {}
+
+    def add(self, stage: str, ms: float) -> None:
+        stages = getattr(self._local, "stages", None)
+        if stages is None:
+            stages = self._local.stages = {}
+        stages[stage] = stages.get(stage, 0.0) + ms
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(getattr(self._local, "stages", {}))
+
+
+class _Timed:
+    def __init__(self, recorder: Optional[StageRecorder], stage: str):
+        self.recorder = recorder
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.recorder is not None:
+            self.recorder.add(self.stage, (time.perf_counter() - self.start) * 1000)
+
+
+# =========================
+#  가짜 OpenAI 클라이언트
+# =========================
+class _FakeEmbeddings:
+    def __init__(self, parent: "FakeOpenAI"):
+        self.parent = parent
+
+    def create(self, model: str, input: Any, **_: Any):
+        texts = [input] if isinstance(input, str) else list(input)
+        with _Timed(self.parent.recorder, "embedding"):
+            self.parent.embed_latency.sleep()
+            vectors = [hash_embedding(t, self.parent.dim) for t in texts]
+        return embeddings_response(vectors, prompt_tokens=sum(len(t) for t in texts))
+
+
+class _FakeCompletions:
+    def __init__(self, parent: "FakeOpenAI"):
+        self.parent = parent
+
+    def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **_: Any):
+        with _Timed(self.parent.recorder, "llm"):
+            self.parent.chat_latency.sleep()
+            prompt = "".join(str(m.get("content", "")) for m in messages)
+            digest = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+            content = self.parent.answer_prefix + f"(fake answer {digest}) 일반적으로는 의료진과 상의하세요."
+        prompt_tokens = len(prompt) // 2
+        completion_tokens = len(content) // 2
+        usage = SimpleNamespace(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+        if stream:
+            return self._stream(model, content, usage)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            model=model,
+            usage=usage,
+        )
+
+    @staticmethod
+    def _stream(model: str, content: str, usage: SimpleNamespace, piece: int = 4):
+        """stream=True 응답: 몇 글자씩 delta 청크, 마지막에 usage 만 있는 청크"""
+        for i in range(0, len(content), piece):
+            delta = SimpleNamespace(content=content[i : i + piece])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta, finish_reason=None)], model=model, usage=None)
+        yield SimpleNamespace(choices=[], model=model, usage=usage)
+
+
+# =========================
+#  가짜 STT (단어 = 톤)
+# =========================
+STT_VOCAB = (
+    "오늘", "어제", "아침", "점심", "저녁", "식후", "혈압약", "당뇨약", "진통제", "두통",
+    "기침", "콧물", "열이", "조금", "많이", "있어요", "먹었어요", "괜찮아요", "병원에", "약국에",
+    "갔어요", "물", "한", "두", "알", "그리고", "그런데", "다시", "내일", "예약",
+)
+TONE_BASE_HZ = 400.0
+TONE_STEP_HZ = 40.0
+WORD_SEC = 0.4
+GAP_SEC = 0.2
+VOICED_DB = -30.0
+
+
+def synth_speech(
+    words: List[str],
+    vocab: tuple = STT_VOCAB,
+    sample_rate: int = 16000,
+    word_sec: float = WORD_SEC,
+    gap_sec: float = GAP_SEC,
+    channels: int = 1,
+) -> bytes:
+    """vocab 의 i 번째 단어 = (TONE_BASE_HZ + TONE_STEP_HZ * i) Hz 톤 word_sec 초, 단어 사이 gap_sec 무음 (WAV)"""
+    from multimodal.audio import PcmAudio, encode_wav
+
+    t = np.arange(int(word_sec * sample_rate)) / sample_rate
+    gap = np.zeros(int(gap_sec * sample_rate), dtype=np.float32)
+    parts = [gap]
+    for w in words:
+        freq = TONE_BASE_HZ + TONE_STEP_HZ * vocab.index(w)
+        parts += [0.5 * np.sin(2 * np.pi * freq * t).astype(np.float32), gap]
+    x = (np.concatenate(parts) * 32767).astype(np.int16)
+    if channels > 1:
+        x = np.repeat(x[:, None], channels, axis=1)
+    return encode_wav(PcmAudio(x, sample_rate))
+
+
+def transcribe_tones(data: bytes, vocab: tuple = STT_VOCAB, word_sec: float = WORD_SEC) -> str:
+    """synth_speech 의 역. 단어 길이의 절반 미만으로 잘린 톤(청크 경계)은 무시"""
+    from multimodal.audio import FRAME_MS, decode_audio, frame_db
+
+    audio = decode_audio(data)
+    x = audio.mono()
+    size = audio.sample_rate * FRAME_MS // 1000
+    voiced = np.append(frame_db(audio) > VOICED_DB, False)
+
+    words: List[str] = []
+    start = None
+    for i, v in enumerate(voiced):
+        if v and start is None:
+            start = i
+        elif not v and start is not None:
+            if (i - start) * FRAME_MS / 1000 >= word_sec / 2:
+                seg = x[start * size : i * size]
+                spectrum = np.abs(np.fft.rfft(seg * np.hanning(len(seg))))
+                freq = float(np.argmax(spectrum)) * audio.sample_rate / len(seg)
+                idx = int(round((freq - TONE_BASE_HZ) / TONE_STEP_HZ))
+                if 0 <= idx < len(vocab):
+                    words.append(vocab[idx])
+            start = None
+    return " ".join(words)
+
+
+class _FakeTranscriptions:
+    def __init__(self, parent: "FakeOpenAI"):
+        self.parent = parent
+
+    def create(self, model: str, file: Any, language: Optional[str] = None, **_: Any):
+        data = file.read()
+        with _Timed(self.parent.recorder, "stt"):
+            self.parent.stt_latency.sleep()
+            text = transcribe_tones(data, self.parent.vocab)
+        with self.parent._lock:
+            self.parent.stt_uploads.append(len(data))
+        return SimpleNamespace(text=text)
+
+
+class FakeOpenAI:
+    """
+    set_openai_client() 로 주입하는 가짜 OpenAI 클라이언트.
+    - embeddings.create: 해시 임베딩
+    - chat.completions.create: 프롬프트 해시로 만든 고정 답변 (stream=True 지원)
+      answer_prefix 로 "[NON_MEDICAL]" 같은 태그를 앞에 붙일 수 있다.
+    - audio.transcriptions.create: synth_speech 로 만든 톤 음성을 단어로 전사 (업로드 크기는 stt_uploads)
+    """
+
+    def __init__(
+        self,
+        dim: int = DEFAULT_DIM,
+        embed_latency: Optional[LatencyModel] = None,
+        chat_latency: Optional[LatencyModel] = None,
+        recorder: Optional[StageRecorder] = None,
+        answer_prefix: str = "",
+        stt_latency: Optional[LatencyModel] = None,
+        vocab: tuple = STT_VOCAB,
+    ):
+        self.dim = dim
+        self.answer_prefix = answer_prefix
+        self.embed_latency = embed_latency or LatencyModel()
+        self.chat_latency = chat_latency or LatencyModel()
+        self.stt_latency = stt_latency or LatencyModel()
+        self.vocab = vocab
+        self.recorder = recorder
+        self.stt_uploads: List[int] = []
+        self._lock = threading.Lock()
+        self.embeddings = _FakeEmbeddings(self)
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+        self.audio = SimpleNamespace(transcriptions=_FakeTranscriptions(self))
+
+
+class SlowSearchClient:
+    """로컬 검색 클라이언트(LocalOpenSearchClient 등)에 네트워크 지연을 씌운 래퍼"""
+
+    def __init__(self, inner: Any, latency: Optional[LatencyModel] = None, recorder: Optional[StageRecorder] = None):
+        self.inner = inner
+        self.latency = latency or LatencyModel()
+        self.recorder = recorder
+
+    def search(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        with _Timed(self.recorder, "knn"):
+            self.latency.sleep()
+            return self.inner.search(*args, **kwargs)
@@ -0,0 +1,110 @@
+# benchmarks/import_time.py
+"""
+모듈 import 시간 프로파일 (python -X importtime).
+
+새 프로세스에서 대상 모듈을 import 하고 stderr 의 importtime 출력을 파싱해서
+  - 전체 누적 시간(ms)
+  - 누적 시간 상위 모듈
+  - 무거운 SDK(openai / opensearchpy / boto3 / psycopg2 / langsmith ...) 가 로드됐는지
+를 표와 JSON 으로 출력한다. 무거운 SDK 는 첫 사용 시점에 import 해야 한다. (tests/test_import_time.py)
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --module api.main --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.report import RESULTS_DIR, print_table, write_json
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# import 시점에 로드되면 안 되는 패키지 (첫 호출 때 import)
+HEAVY_MODULES = (
+    "openai",
+    "opensearchpy",
+    "boto3",
+    "botocore",
+    "requests_aws4auth",
+    "psycopg2",
+    "langsmith",
+    "dotenv",
+)
+
+
+def profile_import(module: str) -> List[Dict[str, Any]]:
+    """
+    반환: [{"module", "self_ms", "cumulative_ms", "depth"}, ...] (importtime 출력 순서)
+    """
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        timeout=120,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} 실패:\n{proc.stderr[-2000:]}")
+
+    rows: List[Dict[str, Any]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            self_us_i, cum_us_i = int(self_us), int(cum_us)
+        except ValueError:
+            continue  # 헤더 줄 ("self [us] | cumulative | imported package")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append(
+            {
+                "module": name.strip(),
+                "self_ms": round(self_us_i / 1000, 3),
+                "cumulative_ms": round(cum_us_i / 1000, 3),
+                "depth": depth,
+            }
+        )
+    return rows
+
+
+def summarize(module: str, rows: List[Dict[str, Any]], top: int = 20) -> Dict[str, Any]:
+    loaded = {r["module"] for r in rows}
+    target = next((r for r in rows if r["module"] == module), None)
+    heavy = sorted(m for m in HEAVY_MODULES if m in loaded)
+    return {
+        "module": module,
+        "total_ms": target["cumulative_ms"] if target else 0.0,
+        "modules": len(rows),
+        "heavy_loaded": heavy,
+        "top": sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:top],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="모듈 import 시간 프로파일 (-X importtime)")
+    parser.add_argument("--module", default="llm.orchestrator", help="import 할 모듈")
+    parser.add_argument("--top", type=int, default=20, help="출력할 상위 모듈 수")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (최소값 사용)")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR / "import_time.json")
+    args = parser.parse_args(argv)
+
+    # 첫 실행은 .pyc 컴파일이 섞이므로 여러 번 돌려서 가장 빠른 결과를 쓴다
+    results = [summarize(args.module, profile_import(args.module), args.top) for _ in range(args.repeat)]
+    best = min(results, key=lambda r: r["total_ms"])
+
+    print(f"📦 import {best['module']}: {best['total_ms']:.1f} ms, 모듈 {best['modules']}개")
+    print(f"   무거운 SDK 로드: {', '.join(best['heavy_loaded']) or '없음'}\n")
+    print_table(best["top"], ["module", "cumulative_ms", "self_ms"])
+
+    config = {"module": args.module, "repeat": args.repeat}
+    path = write_json(args.out, "import_time", config, best)
+    print(f"\n📝 결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# benchmarks/knn_sweep.py
+"""
+HNSW 파라미터(m / ef_search / k) 스윕 벤치마크.
+
+각 조합마다 고정된 쿼리 세트를 돌려서
+  - recall@k : NumPy 전수 탐색 결과 대비
+  - p50/p95/p99 지연시간(ms)
+을 표와 JSON 으로 출력한다.
+
+    # 로컬 대역 인덱스 (임베딩 스냅샷 사용)
+    python -m benchmarks.knn_sweep --corpus rag/data/embedded_all.jsonl --limit 5000
+
+    # 스냅샷이 없으면 합성 벡터로 추세만 확인
+    python -m benchmarks.knn_sweep --synthetic 3000 --dim 256
+
+    # 실제 클러스터에서 k / ef_search 스윕 (m 은 인덱스 재생성 필요 → 스윕 불가)
+    python -m benchmarks.knn_sweep --corpus rag/data/embedded_all.jsonl --cluster
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.local_index import ExactIndex, HnswIndex, load_corpus, normalize
+from benchmarks.report import RESULTS_DIR, latency_summary, print_table, write_json
+
+DEFAULT_M = [8, 16, 32]
+DEFAULT_EF_SEARCH = [16, 32, 64, 100, 256]
+DEFAULT_K = [5, 10]
+EF_CONSTRUCTION = 128
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """주제별로 뭉쳐 있는 실제 임베딩 분포를 흉내낸 가우시안 클러스터"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + 0.35 * rng.normal(size=(n, dim))).astype(np.float32)
+
+
+def sample_queries(vectors: np.ndarray, n: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """코퍼스 벡터에 잡음을 섞어 쿼리로 사용 (질문 ≈ 문서 근처라는 가정)"""
+    rng = np.random.default_rng(seed)
+    base = normalize(vectors[rng.choice(vectors.shape[0], size=min(n, vectors.shape[0]), replace=False)])
+    return normalize(base + noise * rng.normal(size=base.shape).astype(np.float32))
+
+
+def recall_at_k(found: List[int], truth: List[int]) -> float:
+    if not truth:
+        return 0.0
+    return len(set(found) & set(truth)) / len(truth)
+
+
+def _measure(search, queries: np.ndarray, truth: List[List[int]], k: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    recalls: List[float] = []
+    for q, t in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(q, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(recall_at_k(found, t[:k]))
+    return {"recall": round(float(np.mean(recalls)), 4), **latency_summary(latencies)}
+
+
+def sweep_local(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    m_values: List[int],
+    ef_values: List[int],
+    k_values: List[int],
+) -> List[Dict[str, Any]]:
+    exact = ExactIndex(vectors)
+    max_k = max(k_values)
+    truth = [[i for _, i in exact.search(q, max_k)] for q in queries]
+
+    rows: List[Dict[str, Any]] = []
+    for k in k_values:
+        row = _measure(lambda q, kk: [i for _, i in exact.search(q, kk)], queries, truth, k)
+        rows.append({"backend": "exact", "m": "-", "ef_search": "-", "k": k, **row})
+
+    for m in m_values:
+        start = time.perf_counter()
+        index = HnswIndex(vectors, m=m, ef_construction=EF_CONSTRUCTION)
+        build_sec = round(time.perf_counter() - start, 2)
+        print(f"🔧 HNSW m={m} 빌드 완료 ({build_sec}s)")
+
+        for ef in ef_values:
+            for k in k_values:
+                row = _measure(
+                    lambda q, kk: [i for _, i in index.search(q, kk, ef_search=ef)],
+                    queries,
+                    truth,
+                    k,
+                )
+                rows.append(
+                    {"backend": "hnsw", "m": m, "ef_search": ef, "k": k, "build_sec": build_sec, **row}
+                )
+    return rows
+
+
+def sweep_cluster(
+    sources: List[Dict[str, Any]],
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    ef_values: List[int],
+    k_values: List[int],
+) -> List[Dict[str, Any]]:
+    """
+    설정된 클러스터(settings.opensearch_search_index)에 같은 쿼리를 보낸다.
+    ef_search 는 쿼리 단위 method_parameters 로 전달 (미지원 엔진이면 인덱스 설정값 사용).
+    recall 기준은 로컬 스냅샷 전수 탐색이므로, 스냅샷과 인덱스 내용이 같아야 의미가 있다.
+    """
+    from llm.config import settings
+    from llm.opensearch_client import get_opensearch_client
+
+    client = get_opensearch_client()
+    field = settings.opensearch_vector_field
+    index_name = settings.opensearch_search_index
+    exact = ExactIndex(vectors)
+    max_k = max(k_values)
+    truth_ids = [[str(sources[i].get("id", i)) for _, i in exact.search(q, max_k)] for q in queries]
+
+    rows: List[Dict[str, Any]] = []
+    for ef in ef_values:
+        for k in k_values:
+            use_params = True
+            latencies: List[float] = []
+            recalls: List[float] = []
+            for q, t in zip(queries, truth_ids):
+                spec: Dict[str, Any] = {"vector": q.tolist(), "k": k}
+                if use_params:
+                    spec["method_parameters"] = {"ef_search": ef}
+                body = {"size": k, "query": {"knn": {field: spec}}, "_source": ["id"]}
+                start = time.perf_counter()
+                try:
+                    resp = client.search(index=index_name, body=body)
+                except Exception:
+                    if not use_params:
+                        raise
+                    use_params = False  # method_parameters 미지원 → 인덱스 기본 ef_search
+                    del spec["method_parameters"]
+                    start = time.perf_counter()
+                    resp = client.search(index=index_name, body=body)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = [h.get("_source", {}).get("id") or h.get("_id") for h in resp["hits"]["hits"]]
+                recalls.append(recall_at_k(found, t[:k]))
+
+            rows.append(
+                {
+                    "backend": "cluster",
+                    "m": "index",
+                    "ef_search": ef if use_params else "index",
+                    "k": k,
+                    "recall": round(float(np.mean(recalls)), 4),
+                    **latency_summary(latencies),
+                }
+            )
+    return rows
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HNSW 파라미터 스윕 (recall@k / 지연시간)")
+    parser.add_argument("--corpus", type=Path, help="embedding 필드가 있는 JSONL 스냅샷")
+    parser.add_argument("--limit", type=int, default=5000, help="코퍼스 최대 문서 수")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 벡터 개수 (corpus 대신)")
+    parser.add_argument("--dim", type=int, default=256, help="합성 벡터 차원")
+    parser.add_argument("--queries", type=int, default=200, help="쿼리 개수")
+    parser.add_argument("--m", type=int, nargs="+", default=DEFAULT_M)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=DEFAULT_EF_SEARCH)
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K)
+    parser.add_argument("--cluster", action="store_true", help="설정된 OpenSearch 클러스터도 측정")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR / "knn_sweep.json")
+    args = parser.parse_args(argv)
+
+    if args.corpus:
+        sources, vectors = load_corpus(args.corpus, limit=args.limit)
+    elif args.synthetic:
+        vectors = synthetic_vectors(args.synthetic, args.dim)
+        sources = [{"id": str(i)} for i in range(vectors.shape[0])]
+    else:
+        parser.error("--corpus 또는 --synthetic 중 하나는 필요합니다.")
+
+    queries = sample_queries(vectors, args.queries)
+    print(f"📦 코퍼스 {vectors.shape[0]}개 × {vectors.shape[1]}차원, 쿼리 {len(queries)}개")
+
+    rows = sweep_local(vectors, queries, args.m, args.ef_search, args.k)
+    if args.cluster:
+        rows += sweep_cluster(sources, vectors, queries, args.ef_search, args.k)
+
+    print()
+    print_table(rows, ["backend", "m", "ef_search", "k", "recall", "p50", "p95", "p99"])
+
+    config = {
+        "corpus": str(args.corpus) if args.corpus else None,
+        "docs": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "queries": int(len(queries)),
+        "ef_construction": EF_CONSTRUCTION,
+    }
+    path = write_json(args.out, "knn_sweep", config, rows)
+    print(f"\n📝 결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# benchmarks/local_index.py
+"""
+OpenSearch kNN 인덱스의 로컬 대역 (NumPy).
+
+- ExactIndex : 전수 내적 (recall 기준값)
+- HnswIndex  : m / ef_construction / ef_search 를 그대로 노출하는 최소 HNSW 구현
+- LocalOpenSearchClient : client.search(index=..., body=...) 형식을 흉내내서
+  llm.retriever.retrieve_documents 에 그대로 주입할 수 있는 가짜 클라이언트
+
+절대 지연시간은 OpenSearch 와 다르지만, 파라미터에 따른 recall/지연 추세를 보는 용도.
+"""
+import heapq
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+VECTOR_FIELD = "embedding"
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def load_corpus(
+    path: Path, vector_field: str = VECTOR_FIELD, limit: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    embedded_all.jsonl 형식 → (벡터를 뺀 source 리스트, [N, dim] 행렬)
+    """
+    sources: List[Dict[str, Any]] = []
+    vectors: List[List[float]] = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            doc = json.loads(line)
+            vec = doc.pop(vector_field, None)
+            if not vec:
+                continue
+            sources.append(doc)
+            vectors.append(vec)
+            if limit is not None and len(sources) >= limit:
+                break
+    return sources, np.asarray(vectors, dtype=np.float32)
+
+
+class ExactIndex:
+    def __init__(self, vectors: np.ndarray):
+        self.data = normalize(vectors)
+
+    def search(self, query: np.ndarray, k: int, **_: Any) -> List[Tuple[float, int]]:
+        """(cosine distance, 문서 번호) 를 가까운 순으로 k개"""
+        sims = self.data @ normalize(query)
+        k = min(k, sims.shape[0])
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(float(1.0 - sims[i]), int(i)) for i in top]
+
+
+class HnswIndex:
+    """
+    Malkov & Yashunin HNSW 최소 구현 (cosine).
+    - m: 레이어별 이웃 수 (0번 레이어는 2m)
+    - ef_construction: 삽입 시 후보 리스트 크기
+    - ef_search: 검색 시 후보 리스트 크기 (search() 인자)
+    """
+
+    def __init__(self, vectors: np.ndarray, m: int = 16, ef_construction: int = 128, seed: int = 42):
+        self.data = normalize(vectors)
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self._ml = 1.0 / math.log(max(m, 2))
+        self._rng = np.random.default_rng(seed)
+        self.graph: List[Dict[int, List[int]]] = []
+        self.entry: Optional[int] = None
+        self.max_level = -1
+
+        for i in range(self.data.shape[0]):
+            self._insert(i)
+
+    def _dist(self, q: np.ndarray, ids: Sequence[int]) -> np.ndarray:
+        return 1.0 - self.data[list(ids)] @ q
+
+    def _search_layer(
+        self, q: np.ndarray, entry_points: List[int], ef: int, layer: int
+    ) -> List[Tuple[float, int]]:
+        visited = set(entry_points)
+        dists = self._dist(q, entry_points)
+        candidates = [(float(d), e) for d, e in zip(dists, entry_points)]
+        heapq.heapify(candidates)
+        results = [(-d, e) for d, e in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        links = self.graph[layer]
+        while candidates:
+            dc, c = heapq.heappop(candidates)
+            if dc > -results[0][0]:
+                break
+            neigh = [n for n in links.get(c, ()) if n not in visited]
+            if not neigh:
+                continue
+            visited.update(neigh)
+            for dn, n in zip(self._dist(q, neigh), neigh):
+                dn = float(dn)
+                if len(results) < ef or dn < -results[0][0]:
+                    heapq.heappush(candidates, (dn, n))
+                    heapq.heappush(results, (-dn, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted((-d, i) for d, i in results)
+
+    def _insert(self, i: int) -> None:
+        q = self.data[i]
+        level = int(-math.log(1.0 - self._rng.random()) * self._ml)
+        while len(self.graph) <= level:
+            self.graph.append({})
+
+        if self.entry is None:
+            for layer in range(level + 1):
+                self.graph[layer][i] = []
+            self.entry, self.max_level = i, level
+            return
+
+        ep = [self.entry]
+        for layer in range(self.max_level, level, -1):
+            ep = [self._search_layer(q, ep, 1, layer)[0][1]]
+
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(q, ep, self.ef_construction, layer)
+            neighbors = [n for _, n in found[: self.m]]
+            self.graph[layer][i] = neighbors
+
+            max_links = self.m0 if layer == 0 else self.m
+            for n in neighbors:
+                links = self.graph[layer][n]
+                links.append(i)
+                if len(links) > max_links:
+                    keep = np.argsort(self._dist(self.data[n], links))[:max_links]
+                    self.graph[layer][n] = [links[j] for j in keep]
+            ep = [n for _, n in found]
+
+        for layer in range(self.max_level + 1, level + 1):
+            self.graph[layer][i] = []
+        if level > self.max_level:
+            self.entry, self.max_level = i, level
+
+    def search(self, query: np.ndarray, k: int, ef_search: int = 100) -> List[Tuple[float, int]]:
+        if self.entry is None:
+            return []
+        q = normalize(query)
+        ep = [self.entry]
+        for layer in range(self.max_level, 0, -1):
+            ep = [self._search_layer(q, ep, 1, layer)[0][1]]
+        return self._search_layer(q, ep, max(ef_search, k), 0)[:k]
+
+
+def _matches(src: Dict[str, Any], clause: Dict[str, Any]) -> bool:
+    """kNN filter 에 쓰는 bool / terms / term 절만 지원 (*.keyword 는 원래 필드로 비교)"""
+    if "bool" in clause:
+        b = clause["bool"]
+        if not all(_matches(src, c) for c in b.get("must", []) + b.get("filter", [])):
+            return False
+        should = b.get("should", [])
+        if should:
+            return sum(_matches(src, c) for c in should) >= b.get("minimum_should_match", 1)
+        return True
+    for op in ("terms", "term"):
+        if op in clause:
+            (field, values), = clause[op].items()
+            values = values if op == "terms" else [values]
+            return src.get(field.removesuffix(".keyword")) in values
+    return True
+
+
+class LocalOpenSearchClient:
+    """
+    opensearch-py 클라이언트의 search() 만 흉내내는 로컬 대역.
+
+        client = LocalOpenSearchClient(sources, vectors)
+        resp = client.search(index="medinote", body={"query": {"knn": {...}}})
+    """
+
+    def __init__(
+        self,
+        sources: List[Dict[str, Any]],
+        vectors: np.ndarray,
+        vector_field: str = VECTOR_FIELD,
+        index: Any = None,
+    ):
+        self.sources = sources
+        self.vector_field = vector_field
+        self.index = index if index is not None else ExactIndex(vectors)
+
+    def _knn(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        spec = body["query"]["knn"][self.vector_field]
+        k = int(spec.get("k", body.get("size", 10)))
+        params = spec.get("method_parameters") or {}
+        vector = np.asarray(spec["vector"], dtype=np.float32)
+        if spec.get("filter"):
+            # efficient filter 흉내: 전체를 거리순으로 본 뒤 조건에 맞는 것만 k개
+            found = self.index.search(vector, len(self.sources), **params)
+            found = [(d, i) for d, i in found if _matches(self.sources[i], spec["filter"])][:k]
+        else:
+            found = self.index.search(vector, k, **params)
+
+        hits = []
+        for dist, i in found[: body.get("size", k)]:
+            src = self.sources[i]
+            hits.append(
+                {
+                    "_id": str(src.get("id", i)),
+                    # OpenSearch 기본 l2 space 점수: 1 / (1 + l2^2), 정규화 벡터면 l2^2 = 2 * cos_dist
+                    "_score": 1.0 / (1.0 + 2.0 * dist),
+                    "_source": src,
+                }
+            )
+        return hits
+
+    def search(self, index: str = "", body: Optional[Dict[str, Any]] = None, **_: Any) -> Dict[str, Any]:
+        body = body or {}
+        query = body.get("query", {})
+        if "knn" in query:
+            hits = self._knn(body)
+        else:
+            hits = [
+                {"_id": str(s.get("id", i)), "_score": 1.0, "_source": s}
+                for i, s in enumerate(self.sources[: body.get("size", 10)])
+            ]
+        return {
+            "hits": {
+                "total": {"value": len(self.sources), "relation": "eq"},
+                "hits": hits,
+            }
+        }
@@ -0,0 +1,270 @@
+# benchmarks/retrieval_eval.py
+"""
+오프라인 검색 품질 회귀 평가.
+
+골든 쿼리 세트(JSONL) 를 retrieve_documents + rerank_documents 에 그대로 태우고
+recall@k / MRR / nDCG@k 를 계산한다.
+- 검색 대상: 코퍼스 스냅샷(embedding 포함 JSONL)으로 만든 로컬 인덱스 (OpenSearch 호출 X)
+- 쿼리 임베딩: 캐시 파일에서 읽음 → 같은 입력이면 항상 같은 결과, API 호출 X
+  (캐시에 없는 쿼리만 실제 임베딩 API 호출, --offline 이면 해시 임베딩)
+
+골든 세트 형식 (한 줄에 하나):
+  {"query": "타이레놀 하루 최대 복용량", "relevant_ids": ["drug_123"]}
+  {"query": "...", "relevant_ids": ["a", "b"], "grades": {"a": 2, "b": 1}}
+
+    python -m benchmarks.retrieval_eval \\
+        --corpus rag/data/embedded_all.jsonl --golden rag/data/golden_queries.jsonl \\
+        --baseline benchmarks/results/retrieval_eval.json
+"""
+import argparse
+import hashlib
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from benchmarks.fakes import embeddings_response, hash_embedding
+from benchmarks.local_index import LocalOpenSearchClient, load_corpus
+from benchmarks.report import RESULTS_DIR, print_table, write_json
+
+DEFAULT_KS = [1, 3, 5, 10]
+DEFAULT_CACHE_PATH = RESULTS_DIR / "query_embeddings.json"
+
+
+# =========================
+#  지표
+# =========================
+def recall_at_k(ranked_ids: Sequence[str], relevant: Sequence[str], k: int) -> float:
+    if not relevant:
+        return 0.0
+    return len(set(ranked_ids[:k]) & set(relevant)) / len(set(relevant))
+
+
+def reciprocal_rank(ranked_ids: Sequence[str], relevant: Sequence[str]) -> float:
+    rel = set(relevant)
+    for rank, doc_id in enumerate(ranked_ids, start=1):
+        if doc_id in rel:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked_ids: Sequence[str], grades: Dict[str, float], k: int) -> float:
+    dcg = sum(
+        (2 ** grades.get(doc_id, 0) - 1) / math.log2(rank + 1)
+        for rank, doc_id in enumerate(ranked_ids[:k], start=1)
+    )
+    ideal = sorted(grades.values(), reverse=True)[:k]
+    idcg = sum((2 ** g - 1) / math.log2(rank + 1) for rank, g in enumerate(ideal, start=1))
+    return dcg / idcg if idcg > 0 else 0.0
+
+
+# =========================
+#  쿼리 임베딩 캐시
+# =========================
+class EmbeddingCache:
+    """
+    {sha1(embedder + model + text): vector} 형태의 JSON 파일 캐시.
+    embedder 는 벡터를 만든 쪽 ("live" / "offline-hash-<dim>") → 같은 파일을 써도
+    --offline 실행의 해시 벡터가 실제 API 실행에 섞이지 않는다.
+    """
+
+    def __init__(self, path: Optional[Path] = None, embedder: str = "live"):
+        self.path = path
+        self.embedder = embedder
+        self.data: Dict[str, List[float]] = {}
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        if path is not None and path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    def key(self, model: str, text: str) -> str:
+        return hashlib.sha1(f"{self.embedder}\n{model}\n{text}".encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, model: str, text: str, compute: Callable[[str], List[float]]) -> List[float]:
+        k = self.key(model, text)
+        vec = self.data.get(k)
+        if vec is not None:
+            self.hits += 1
+            return vec
+        self.misses += 1
+        vec = compute(text)
+        self.data[k] = vec
+        self.dirty = True
+        return vec
+
+    def save(self) -> None:
+        if self.path is None or not self.dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        self.dirty = False
+
+
+class _CachedEmbeddings:
+    def __init__(self, cache: EmbeddingCache, compute: Callable[[str], List[float]]):
+        self.cache = cache
+        self.compute = compute
+
+    def create(self, model: str, input: Any, **_: Any):
+        texts = [input] if isinstance(input, str) else list(input)
+        vectors = [self.cache.get_or_compute(model, t, self.compute) for t in texts]
+        return embeddings_response(vectors)
+
+
+class CachedEmbeddingClient:
+    """
+    set_openai_client() 로 주입하는 임베딩 전용 클라이언트.
+    캐시에 없으면 compute(text) 로 계산해서 캐시에 채운다.
+    """
+
+    def __init__(self, cache: EmbeddingCache, compute: Callable[[str], List[float]]):
+        self.embeddings = _CachedEmbeddings(cache, compute)
+
+
+def _live_embedder() -> Callable[[str], List[float]]:
+    from llm.config import settings
+    from llm.embeddings import _build_openai_client
+
+    client = _build_openai_client()
+
+    def compute(text: str) -> List[float]:
+        resp = client.embeddings.create(model=settings.openai_model_embedding, input=text)
+        return resp.data[0].embedding
+
+    return compute
+
+
+# =========================
+#  평가 실행
+# =========================
+def load_golden(path: Path) -> List[Dict[str, Any]]:
+    items = []
+    with path.open("r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+    return items
+
+
+def evaluate(
+    client: LocalOpenSearchClient,
+    golden: List[Dict[str, Any]],
+    embed_client: Any,
+    ks: Sequence[int] = DEFAULT_KS,
+) -> Dict[str, Any]:
+    """
+    retrieve_documents + rerank_documents 를 로컬 인덱스/캐시 임베딩으로 실행.
+    반환: {"metrics": {...}, "queries": [...]}
+    """
+    from llm.embeddings import set_openai_client
+    from llm.opensearch_client import set_opensearch_client
+    from llm.reranker import rerank_documents
+    from llm.retriever import retrieve_documents
+    from llm.utils.preprocess import normalize_query
+
+    max_k = max(ks)
+    per_query: List[Dict[str, Any]] = []
+
+    set_opensearch_client(client)
+    set_openai_client(embed_client)
+    try:
+        for item in golden:
+            query = normalize_query(item["query"])
+            relevant = [str(r) for r in item.get("relevant_ids", [])]
+            grades = {str(k): float(v) for k, v in (item.get("grades") or {}).items()}
+            if not grades:
+                grades = {r: 1.0 for r in relevant}
+
+            docs = retrieve_documents(query, top_k=max_k)
+            ranked = rerank_documents(query, docs)
+            ranked_ids = [str(d.get("id")) for d in ranked]
+
+            row: Dict[str, Any] = {
+                "query": item["query"],
+                "ranked_ids": ranked_ids,
+                "mrr": reciprocal_rank(ranked_ids, relevant),
+            }
+            for k in ks:
+                row[f"recall@{k}"] = recall_at_k(ranked_ids, relevant, k)
+                row[f"ndcg@{k}"] = ndcg_at_k(ranked_ids, grades, k)
+            per_query.append(row)
+    finally:
+        set_opensearch_client(None)
+        set_openai_client(None)
+
+    metric_names = ["mrr"] + [f"{m}@{k}" for k in ks for m in ("recall", "ndcg")]
+    n = max(len(per_query), 1)
+    metrics = {m: round(sum(r[m] for r in per_query) / n, 4) for m in metric_names}
+    return {"metrics": metrics, "queries": per_query}
+
+
+def compare_to_baseline(
+    metrics: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """baseline 대비 tolerance 보다 많이 떨어진 지표 목록"""
+    regressions = []
+    for name, base in baseline.items():
+        cur = metrics.get(name)
+        if cur is not None and cur < base - tolerance:
+            regressions.append(f"{name}: {base:.4f} → {cur:.4f}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="오프라인 검색 품질 평가 (recall@k / MRR / nDCG)")
+    parser.add_argument("--corpus", type=Path, required=True, help="embedding 필드가 있는 JSONL 스냅샷")
+    parser.add_argument("--golden", type=Path, required=True, help="골든 쿼리 JSONL")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_PATH, help="쿼리 임베딩 캐시 JSON")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_KS)
+    parser.add_argument("--offline", action="store_true", help="캐시 미스 시 해시 임베딩 사용 (API 호출 X)")
+    parser.add_argument("--baseline", type=Path, help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="허용 하락폭")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR / "retrieval_eval.json")
+    args = parser.parse_args(argv)
+
+    # --out 과 같은 파일일 수 있으므로 덮어쓰기 전에 먼저 읽어 둔다
+    baseline: Optional[Dict[str, float]] = None
+    if args.baseline and args.baseline.exists():
+        with args.baseline.open("r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]["metrics"]
+
+    sources, vectors = load_corpus(args.corpus)
+    client = LocalOpenSearchClient(sources, vectors)
+    golden = load_golden(args.golden)
+
+    if args.offline:
+        dim = int(vectors.shape[1])
+        cache = EmbeddingCache(args.cache, embedder=f"offline-hash-{dim}")
+        compute: Callable[[str], List[float]] = lambda t: hash_embedding(t, dim)
+    else:
+        cache = EmbeddingCache(args.cache, embedder="live")
+        compute = _live_embedder()
+
+    result = evaluate(client, golden, CachedEmbeddingClient(cache, compute), args.k)
+    cache.save()
+
+    print(f"📦 코퍼스 {len(sources)}개, 골든 쿼리 {len(golden)}개 (임베딩 캐시 hit {cache.hits} / miss {cache.misses})")
+    print_table([result["metrics"]], list(result["metrics"].keys()))
+
+    config = {"corpus": str(args.corpus), "golden": str(args.golden), "ks": list(args.k)}
+    path = write_json(args.out, "retrieval_eval", config, result)
+    print(f"\n📝 결과 저장: {path}")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(result["metrics"], baseline, args.tolerance)
+        if regressions:
+            print("❌ baseline 대비 하락:")
+            for r in regressions:
+                print(f"  - {r}")
+            return 1
+        print("✅ baseline 대비 하락 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
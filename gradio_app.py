@@ -1,11 +1,13 @@
 ﻿# gradio_app.py
 import os
+import uuid
 from typing import List, Dict, Tuple
 
 import gradio as gr
 
+from llm.admission import AdmissionRejected
 from llm.graph_orchestrator import run_chat_flow
-from llm.telemetry import trace_context, log_info
+from llm.telemetry import trace_context, log_info, start_metrics_server
 from llm.utils.user_profile import load_user_profile   # ✅ 사용자 프로필 로더 추가
 
 
@@ -23,20 +25,19 @@ def gradio_chat(
     message: str,
     history: List[Dict[str, str]],   # history: [{"role": "...", "content": "..."} ...]
     user_id: str,
+    session_id: str,
 ) -> Tuple[str, List[Dict[str, str]]]:
     """
     Gradio Chatbot <-> run_chat_flow 연결 함수
 
     - message: 사용자가 방금 입력한 질문
-    - history: [{"role": "user"/"assistant", "content": "..."}, ...]
+    - history: [{"role": "user"/"assistant", "content": "..."}, ...] (화면 표시용)
     - user_id: Gradio 입력 박스에 적힌 사용자 ID (테스트 시 문자열)
+    - session_id: 브라우저 세션별 대화 id. 대화 이력은 서버 세션 저장소에 쌓이므로 history 는 넘기지 않는다
     """
     if not message:
         return "", history
 
-    # 1) Gradio 히스토리 그대로 사용 (이미 messages 형식)
-    internal_history = history
-
     # 2) 테스트용 numeric user_id 만들기
     #    - 숫자만 들어오면 그걸 사용
     #    - 아니면 기본값 1로 고정
@@ -56,12 +57,16 @@ def gradio_chat(
         tags=["gradio"],
         metadata={},
     ):
-        result = run_chat_flow(
-            query=message,
-            user_id=str(numeric_user_id),
-            history=internal_history,
-            user_profile=user_profile,   # ✅ LLM 쪽으로 전달
-        )
+        try:
+            result = run_chat_flow(
+                query=message,
+                user_id=str(numeric_user_id),
+                session_id=session_id,
+                user_profile=user_profile,   # ✅ LLM 쪽으로 전달
+            )
+        except AdmissionRejected as e:
+            # 과부하 / 요청 한도 초과 → 대화는 유지하고 안내만
+            result = {"answer": f"요청이 많아 잠시 후 다시 시도해 주세요. ({e.retry_after:.0f}초 후)"}
 
     answer = result.get("answer", "")
     log_info(
@@ -80,9 +85,13 @@ def gradio_chat(
     return "", new_history
 
 
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
 def clear_history():
-    # Chatbot(type=messages)의 value는 list[dict]
-    return "", []
+    # Chatbot(type=messages)의 value는 list[dict], 서버 세션도 새로 시작
+    return "", [], new_session_id()
 
 
 # =========================
@@ -99,6 +108,7 @@ def create_demo() -> gr.Blocks:
                 value="1",                 # ✅ 테스트용 기본값 1
                 placeholder="사용자 ID (로그/추적용)",
             )
+        session_state = gr.State(new_session_id)
 
         chatbot = gr.Chatbot(
             label="MediNote Chat",
@@ -113,12 +123,12 @@ def create_demo() -> gr.Blocks:
             send_btn = gr.Button("전송", variant="primary")
             clear_btn = gr.Button("대화 초기화")
 
-        send_event_inputs = [msg, chatbot, user_id_box]
+        send_event_inputs = [msg, chatbot, user_id_box, session_state]
         send_event_outputs = [msg, chatbot]
 
         msg.submit(gradio_chat, send_event_inputs, send_event_outputs)
         send_btn.click(gradio_chat, send_event_inputs, send_event_outputs)
-        clear_btn.click(clear_history, None, [msg, chatbot])
+        clear_btn.click(clear_history, None, [msg, chatbot, session_state])
 
     return demo
 
@@ -127,5 +137,10 @@ if __name__ == "__main__":
     server_name = os.getenv("GRADIO_SERVER_NAME", "0.0.0.0")
     server_port = int(os.getenv("GRADIO_SERVER_PORT", "7860"))
 
+    # Prometheus 스크레이프용 /metrics (METRICS_PORT 가 있을 때만)
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+
     demo = create_demo()
     demo.launch(server_name=server_name, server_port=server_port)
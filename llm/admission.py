@@ -0,0 +1,204 @@
+# ai_service/llm/admission.py
+"""
+채팅 파이프라인 입장 제어 (admission control).
+
+- 전역 동시 실행 한도 (ADMISSION_MAX_CONCURRENT) + 대기열 길이 한도 (ADMISSION_MAX_QUEUE)
+- 대기 시간 SLO (ADMISSION_QUEUE_TIMEOUT_SEC): 넘기면 포기, 넘길 게 뻔하면 기다리지 않고 바로 거절
+- 사용자별 토큰 버킷 (USER_RATE_PER_SEC / USER_BURST)
+
+거절은 AdmissionRejected 로 올라가고, API 에서는 429 + Retry-After 로 변환한다.
+
+    with ADMISSION.admit(user_id) as ticket:
+        return run_chat_rag(...)
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+from .config import settings
+from .telemetry import REGISTRY, log_info
+
+ADMISSION_IN_FLIGHT = REGISTRY.gauge("medinote_admission_in_flight", "실행 중인 채팅 요청 수")
+ADMISSION_QUEUE_DEPTH = REGISTRY.gauge("medinote_admission_queue_depth", "입장 대기 중인 채팅 요청 수")
+ADMISSION_REJECTED = REGISTRY.counter(
+    "medinote_admission_rejected_total", "입장 거절 수", ("reason",)
+)
+ADMISSION_QUEUE_WAIT = REGISTRY.histogram(
+    "medinote_admission_queue_wait_ms", "입장까지 기다린 시간 (ms)"
+)
+
+# EWMA 가중치 (최근 처리시간 반영 비율)
+SERVICE_TIME_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """
+    reason:
+      - rate_limited   : 사용자별 토큰 버킷 소진
+      - queue_full     : 대기열이 가득 참
+      - queue_deadline : 예상 대기 시간이 SLO 를 넘어서 바로 거절
+      - queue_timeout  : 기다렸지만 SLO 안에 자리가 나지 않음
+    """
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"admission rejected: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": "too_many_requests", "reason": self.reason, "retry_after": self.retry_after}
+
+
+@dataclass
+class Ticket:
+    queue_ms: float
+
+
+class TokenBucket:
+    """rate(개/초) 로 채워지고 burst 개까지 쌓이는 버킷. 락은 호출하는 쪽에서."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, rate: float, burst: float, now: float) -> float:
+        """토큰 1개를 쓰면 0, 모자라면 다음 토큰까지 남은 초"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / rate
+
+
+class UserRateLimiter:
+    def __init__(self, rate: float, burst: float, max_users: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def check(self, user_id: str, now: Optional[float] = None) -> float:
+        """0 이면 통과, 아니면 retry_after(초)"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            bucket = self._buckets.get(user_id)
+            if bucket is None:
+                if len(self._buckets) >= self.max_users:
+                    self._prune(now)
+                bucket = self._buckets[user_id] = TokenBucket(self.burst, now)
+            return bucket.take(self.rate, self.burst, now)
+
+    def _prune(self, now: float) -> None:
+        # 이미 가득 찼을 버킷(= 새로 만든 것과 같은 상태)은 지워도 된다
+        full_after = self.burst / self.rate
+        for uid, b in list(self._buckets.items()):
+            if now - b.updated >= full_after:
+                del self._buckets[uid]
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout_sec: float,
+        user_rate_per_sec: float = 0.0,
+        user_burst: float = 1.0,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_sec = queue_timeout_sec
+        self.users = UserRateLimiter(user_rate_per_sec, user_burst)
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._service_sec = 0.0  # 요청 1건 처리시간 EWMA
+
+    def _reject(self, reason: str, retry_after: float) -> AdmissionRejected:
+        ADMISSION_REJECTED.inc(reason=reason)
+        log_info("admission_rejected", reason=reason, active=self._active, waiting=self._waiting)
+        return AdmissionRejected(reason, round(max(retry_after, 0.1), 2))
+
+    def stats(self) -> Dict[str, float]:
+        return {"active": self._active, "waiting": self._waiting, "service_sec": round(self._service_sec, 3)}
+
+    def _acquire(self, start: float) -> None:
+        limit = self.max_concurrent
+        with self._cond:
+            if self._active < limit and self._waiting == 0:
+                self._active += 1
+                return
+            if self._waiting >= self.max_queue:
+                raise self._reject("queue_full", self._service_sec or self.queue_timeout_sec)
+
+            # 앞에 선 요청들이 빠지는 데 걸릴 예상 시간이 SLO 를 넘으면 기다리지 않는다
+            estimate = (self._waiting + 1) / limit * self._service_sec
+            if estimate > self.queue_timeout_sec:
+                raise self._reject("queue_deadline", estimate)
+
+            self._waiting += 1
+            ADMISSION_QUEUE_DEPTH.set(self._waiting)
+            deadline = start + self.queue_timeout_sec
+            try:
+                while self._active >= limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._reject("queue_timeout", self._service_sec or self.queue_timeout_sec)
+                    self._cond.wait(remaining)
+                self._active += 1
+            finally:
+                self._waiting -= 1
+                ADMISSION_QUEUE_DEPTH.set(self._waiting)
+
+    def _release(self, service_sec: float) -> None:
+        with self._cond:
+            self._active -= 1
+            if self._service_sec == 0.0:
+                self._service_sec = service_sec
+            else:
+                self._service_sec += SERVICE_TIME_ALPHA * (service_sec - self._service_sec)
+            ADMISSION_IN_FLIGHT.set(self._active)
+            self._cond.notify()
+
+    @contextmanager
+    def admit(self, user_id: Optional[str] = None) -> Iterator[Ticket]:
+        """
+        자리가 날 때까지(최대 queue_timeout_sec) 기다렸다가 블록을 실행.
+        user_id 가 없으면(익명) 사용자별 한도는 적용하지 않는다.
+        """
+        if user_id:
+            retry_after = self.users.check(str(user_id))
+            if retry_after > 0:
+                raise self._reject("rate_limited", retry_after)
+
+        if self.max_concurrent <= 0:
+            yield Ticket(queue_ms=0.0)
+            return
+
+        start = time.monotonic()
+        self._acquire(start)
+        admitted = time.monotonic()
+        queue_ms = (admitted - start) * 1000
+        ADMISSION_QUEUE_WAIT.observe(queue_ms)
+        ADMISSION_IN_FLIGHT.set(self._active)
+        try:
+            yield Ticket(queue_ms=round(queue_ms, 3))
+        finally:
+            self._release(time.monotonic() - admitted)
+
+
+ADMISSION = AdmissionController(
+    max_concurrent=settings.admission_max_concurrent,
+    max_queue=settings.admission_max_queue,
+    queue_timeout_sec=settings.admission_queue_timeout_sec,
+    user_rate_per_sec=settings.user_rate_per_sec,
+    user_burst=settings.user_burst,
+)
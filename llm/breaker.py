@@ -0,0 +1,201 @@
+# ai_service/llm/breaker.py
+"""
+서킷 브레이커 (임베딩 / 검색 / 프로필 DB).
+
+- closed    : 정상. 최근 window_sec 동안의 호출로 오류율 / 느린 호출 비율을 계산
+- open      : 임계치를 넘으면 open_sec 동안 호출하지 않고 바로 CircuitOpen
+- half_open : open_sec 이 지나면 probe 호출 몇 개만 통과시켜 보고, 성공하면 closed / 실패하면 다시 open
+
+    with span("knn"):
+        resp = SEARCH_BREAKER.call(lambda: client.search(...))
+
+orchestrator 는 CircuitOpen(또는 해당 스테이지 오류)을 받으면 그 스테이지를 건너뛰는 degraded 모드로 답한다.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple, TypeVar
+
+from .config import settings
+from .telemetry import REGISTRY, log_info
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = REGISTRY.gauge(
+    "medinote_circuit_state", "서킷 브레이커 상태 (0=closed, 1=half_open, 2=open)", ("breaker",)
+)
+BREAKER_TRANSITIONS = REGISTRY.counter(
+    "medinote_circuit_transitions_total", "서킷 브레이커 상태 전이 수", ("breaker", "state")
+)
+BREAKER_SHORT_CIRCUITS = REGISTRY.counter(
+    "medinote_circuit_short_circuits_total", "open 상태라 호출하지 않고 거절한 수", ("breaker",)
+)
+DEGRADED_RESPONSES = REGISTRY.counter(
+    "medinote_degraded_responses_total", "스테이지를 건너뛰고(degraded) 답한 응답 수", ("stage",)
+)
+
+
+class CircuitOpen(RuntimeError):
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"circuit '{name}' is open (retry in {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window_sec: float = 30.0,
+        min_calls: int = 10,
+        error_rate: float = 0.5,
+        slow_call_ms: float = 0.0,
+        slow_rate: float = 0.8,
+        open_sec: float = 15.0,
+        half_open_probes: int = 2,
+    ):
+        """
+        slow_call_ms: 이보다 오래 걸린 호출은 "느린 호출" (0 이면 지연 기준 미사용)
+        """
+        self.name = name
+        self.window_sec = window_sec
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate = slow_rate
+        self.open_sec = open_sec
+        self.half_open_probes = half_open_probes
+
+        self._lock = threading.Lock()
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (ts, failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        BREAKER_STATE.set(0, breaker=name)
+
+    # ---------- 상태 ----------
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open(time.monotonic())
+            return self._state
+
+    def _set_state(self, state: str, now: float) -> None:
+        if state == self._state:
+            return
+        self._state = state
+        if state == OPEN:
+            self._opened_at = now
+        if state != HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._calls.clear()
+        BREAKER_STATE.set(_STATE_VALUE[state], breaker=self.name)
+        BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+        log_info("circuit_state_changed", breaker=self.name, state=state)
+
+    def _maybe_half_open(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_sec:
+            self._set_state(HALF_OPEN, now)
+
+    def _rates(self, now: float) -> Tuple[int, float, float]:
+        cutoff = now - self.window_sec
+        calls = self._calls
+        while calls and calls[0][0] < cutoff:
+            calls.popleft()
+        n = len(calls)
+        if n == 0:
+            return 0, 0.0, 0.0
+        failed = sum(1 for _, f, _ in calls if f)
+        slow = sum(1 for _, _, s in calls if s)
+        return n, failed / n, slow / n
+
+    # ---------- 호출 ----------
+    def _before(self) -> bool:
+        """open 이면 CircuitOpen. 통과시킬 때는 half_open probe 인지 여부를 돌려준다."""
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_half_open(now)
+            if self._state == OPEN:
+                BREAKER_SHORT_CIRCUITS.inc(breaker=self.name)
+                raise CircuitOpen(self.name, self.open_sec - (now - self._opened_at))
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    BREAKER_SHORT_CIRCUITS.inc(breaker=self.name)
+                    raise CircuitOpen(self.name, 0.0)
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def _after(self, probe: bool, failed: bool, elapsed_ms: float) -> None:
+        now = time.monotonic()
+        slow = self.slow_call_ms > 0 and elapsed_ms >= self.slow_call_ms
+        with self._lock:
+            if probe:
+                self._probes_in_flight -= 1
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._set_state(OPEN, now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._set_state(CLOSED, now)
+                return
+
+            self._calls.append((now, failed, slow))
+            if self._state != CLOSED:
+                return
+            n, err, slow_ratio = self._rates(now)
+            if n >= self.min_calls and (
+                err >= self.error_rate or (self.slow_call_ms > 0 and slow_ratio >= self.slow_rate)
+            ):
+                self._set_state(OPEN, now)
+
+    def call(self, fn: Callable[[], T]) -> T:
+        probe = self._before()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self._after(probe, True, (time.perf_counter() - start) * 1000)
+            raise
+        self._after(probe, False, (time.perf_counter() - start) * 1000)
+        return result
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._lock:
+            now = time.monotonic()
+            self._maybe_half_open(now)
+            n, err, slow = self._rates(now)
+            return {"state": self._state, "calls": n, "error_rate": round(err, 3), "slow_rate": round(slow, 3)}
+
+
+def _breaker(name: str, slow_call_ms: float) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window_sec=settings.breaker_window_sec,
+        min_calls=settings.breaker_min_calls,
+        error_rate=settings.breaker_error_rate,
+        slow_call_ms=slow_call_ms,
+        slow_rate=settings.breaker_slow_rate,
+        open_sec=settings.breaker_open_sec,
+    )
+
+
+EMBEDDING_BREAKER = _breaker("embedding", settings.embedding_timeout_sec * 1000 * 0.8)
+SEARCH_BREAKER = _breaker("search", settings.knn_timeout_sec * 1000 * 0.8)
+PROFILE_BREAKER = _breaker("profile", settings.profile_timeout_sec * 1000 * 0.8)
+
+BREAKERS: Dict[str, CircuitBreaker] = {
+    b.name: b for b in (EMBEDDING_BREAKER, SEARCH_BREAKER, PROFILE_BREAKER)
+}
+
+
+def breaker_snapshot() -> Dict[str, Dict[str, object]]:
+    return {name: b.snapshot() for name, b in BREAKERS.items()}
@@ -0,0 +1,116 @@
+# ai_service/llm/cascade.py
+"""
+모델 캐스케이드: 기본은 빠르고 저렴한 모델, 어려워 보이는 의료 질문만 강한 모델로.
+
+답변 전 신호 (choose_model):
+  - non_medical 루트                → fast
+  - 검색 결과 없음 / 최고 점수가 낮음  → strong ("low_retrieval")
+  - 안전 필터 soft_warn             → strong ("safety")
+  - 대화 이력이 김                   → strong ("long_history")
+답변 후 신호 (needs_escalation):
+  - fast 모델이 스스로 확신이 낮다고 표시([LOW_CONFIDENCE]) → strong 으로 다시 답변 ("low_confidence")
+    스트리밍은 이미 내보낸 답을 되돌릴 수 없으므로 답변 전 신호만 쓴다.
+
+토큰 예산 downgrade 중이면 캐스케이드보다 예산이 우선 (항상 downgrade 모델).
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from .config import settings
+from .telemetry import REGISTRY
+
+FAST, STRONG, DOWNGRADE = "fast", "strong", "downgrade"
+
+ESCALATION_REASONS = ("low_retrieval", "safety", "long_history", "low_confidence")
+
+LOW_CONFIDENCE_TAG = "[LOW_CONFIDENCE]"
+SELF_CHECK_INSTRUCTION = (
+    "참고 문서만으로 정확히 답하기 어렵거나, 용량·상호작용·금기처럼 틀리면 위험한 내용을 "
+    f"확신할 수 없다면 답변 맨 끝에 '{LOW_CONFIDENCE_TAG}' 태그를 붙여라. 확신하면 붙이지 마라."
+)
+
+# 모델이 태그 위치·모양을 조금 바꿔도 잡는다: 중간/끝 어디든, 대소문자, 괄호 안 공백, 괄호 없는 형태
+_LOW_CONFIDENCE_RE = re.compile(r"[ \t]*(?:\[\s*LOW[_ ]CONFIDENCE\s*\]|\bLOW_CONFIDENCE\b)", re.IGNORECASE)
+
+MODEL_CHOICES = REGISTRY.counter(
+    "medinote_model_choice_total", "라우트별 LLM 모델 선택 수", ("route", "tier", "model")
+)
+MODEL_ESCALATIONS = REGISTRY.counter(
+    "medinote_model_escalations_total", "강한 모델로 올린 수 (사유별)", ("route", "reason")
+)
+
+
+@dataclass
+class ModelChoice:
+    model: str
+    tier: str
+    reasons: List[str] = field(default_factory=list)
+    max_tokens: Optional[int] = None
+    # 답변 후 low_confidence 확인 (fast 모델로 의료 질문에 답할 때만)
+    self_check: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"model": self.model, "tier": self.tier, "reasons": list(self.reasons)}
+
+
+def _strong_signals(
+    documents: List[Dict[str, Any]],
+    safety_action: str,
+    history_tokens: int,
+) -> List[str]:
+    reasons: List[str] = []
+    top_score = max((d.get("score", 0.0) or 0.0 for d in documents), default=0.0)
+    if not documents or top_score < settings.cascade_min_top_score:
+        reasons.append("low_retrieval")
+    if safety_action == "soft_warn":
+        reasons.append("safety")
+    if settings.cascade_history_tokens > 0 and history_tokens > settings.cascade_history_tokens:
+        reasons.append("long_history")
+    return reasons
+
+
+def choose_model(
+    route: str,
+    budget: str = "allow",
+    documents: Optional[List[Dict[str, Any]]] = None,
+    safety_action: str = "allow",
+    history_tokens: int = 0,
+) -> ModelChoice:
+    if budget == "downgrade":
+        choice = ModelChoice(settings.openai_model_downgrade, DOWNGRADE, ["budget"], settings.downgrade_max_tokens)
+    elif not settings.cascade_enabled:
+        choice = ModelChoice(settings.openai_model_chat, STRONG, ["cascade_off"])
+    elif route == "non_medical":
+        choice = ModelChoice(settings.openai_model_fast, FAST, ["non_medical"])
+    else:
+        reasons = _strong_signals(documents or [], safety_action, history_tokens)
+        if reasons:
+            choice = ModelChoice(settings.openai_model_strong, STRONG, reasons)
+        else:
+            choice = ModelChoice(settings.openai_model_fast, FAST, ["simple"], self_check=settings.cascade_self_check)
+    return choice
+
+
+def needs_escalation(answer: str) -> Tuple[bool, str]:
+    """(확신 낮음 여부, 태그를 전부 뗀 답변). 태그 뒤에 출처·안내문이 더 붙어 있어도 찾는다."""
+    if not _LOW_CONFIDENCE_RE.search(answer):
+        return False, answer
+    cleaned = _LOW_CONFIDENCE_RE.sub("", answer)
+    cleaned = re.sub(r"\n{3,}", "\n\n", cleaned)
+    return True, cleaned.strip()
+
+
+def escalate(choice: ModelChoice, reason: str) -> ModelChoice:
+    return ModelChoice(settings.openai_model_strong, STRONG, [r for r in choice.reasons if r != "simple"] + [reason])
+
+
+def record_choice(route: str, choice: ModelChoice) -> None:
+    """요청당 1번 (최종 모델 기준). 에스컬레이션 비율 = tier="strong" 중 사유가 있는 것 / 전체"""
+    MODEL_CHOICES.inc(route=route, tier=choice.tier, model=choice.model)
+    if choice.tier == STRONG:
+        for reason in choice.reasons:
+            if reason in ESCALATION_REASONS:
+                MODEL_ESCALATIONS.inc(route=route, reason=reason)
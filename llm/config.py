@@ -1,16 +1,41 @@
 ﻿# ai_service/llm/utils/config.py
 import os
+from functools import lru_cache
 from pathlib import Path
 from pydantic import BaseModel
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]  # ai_service/ 기준 루트
+ENV_PATH = Path(__file__).resolve().parent.parent / ".env"  # 프로젝트 루트 .env
+
+
+@lru_cache()
+def load_env() -> None:
+    """
+    프로젝트 루트 .env 를 환경변수로 읽는다. (이미 있는 값은 유지)
+    import 시점이 아니라 OpenSearch 클라이언트 생성 / LangSmith 초기화처럼 처음 필요할 때 1번.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv(ENV_PATH)
+
 
 class Settings(BaseModel):
     # OpenAI
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_base_url: str | None = os.getenv("OPENAI_BASE_URL") or None
     openai_model_chat: str = os.getenv("OPENAI_MODEL_CHAT", "gpt-4o-mini")
+    # 모델 캐스케이드 (llm/cascade.py): 기본 fast, 어려운 의료 질문만 strong
+    cascade_enabled: bool = os.getenv("CASCADE_ENABLED", "true").lower() in {"1", "true", "yes"}
+    openai_model_fast: str = os.getenv("OPENAI_MODEL_FAST", "gpt-4o-mini")
+    openai_model_strong: str = os.getenv("OPENAI_MODEL_STRONG") or os.getenv("OPENAI_MODEL_CHAT", "gpt-4o-mini")
+    # 검색 최고 점수가 이보다 낮으면 / 이력 토큰이 이보다 많으면 strong (0 이면 이력 기준 미사용)
+    cascade_min_top_score: float = float(os.getenv("CASCADE_MIN_TOP_SCORE", "0.6"))
+    cascade_history_tokens: int = int(os.getenv("CASCADE_HISTORY_TOKENS", "1500"))
+    # fast 모델이 [LOW_CONFIDENCE] 를 붙이면 strong 으로 다시 답변 (비스트리밍만)
+    cascade_self_check: bool = os.getenv("CASCADE_SELF_CHECK", "true").lower() in {"1", "true", "yes"}
     openai_model_embedding: str = os.getenv(
         "OPENAI_MODEL_EMBEDDING", "text-embedding-3-large"
     )
@@ -19,15 +44,107 @@ class Settings(BaseModel):
     opensearch_index: str = os.getenv("OPENSEARCH_INDEX", "medinote_v3")
     opensearch_vector_field: str = os.getenv("OPENSEARCH_VECTOR_FIELD", "embedding")
     opensearch_content_field: str = os.getenv("OPENSEARCH_CONTENT_FIELD", "content")
+    # 블루/그린 배포용 읽기 alias (rag/index_creator.py 가 새 인덱스로 교체)
+    # 기본은 빈 값 → opensearch_index 를 직접 조회. alias 를 만든 뒤에 OPENSEARCH_READ_ALIAS=medinote 로 전환
+    opensearch_read_alias: str = os.getenv("OPENSEARCH_READ_ALIAS", "")
 
     # RAG / 챗봇
     retriever_top_k: int = int(os.getenv("RETRIEVER_TOP_K", "5"))
+    # 청크 인덱스: parent 문서 top_k 개를 채우기 위해 청크를 몇 배수로 가져올지
+    retriever_chunk_overfetch: int = int(os.getenv("RETRIEVER_CHUNK_OVERFETCH", "3"))
+    # 멀티 쿼리 검색: 원문 + 규칙 기반 재작성(임상 용어 / 약·질환명 / 영문)을 같이 검색해서 RRF 로 합침
+    multi_query_enabled: bool = os.getenv("MULTI_QUERY_ENABLED", "false").lower() in {"1", "true", "yes"}
+    multi_query_max: int = int(os.getenv("MULTI_QUERY_MAX", "4"))  # 원문 포함
+    multi_query_rrf_k: int = int(os.getenv("MULTI_QUERY_RRF_K", "60"))
+    # 원문 검색이 끝난 뒤 나머지 검색을 더 기다리는 시간 (넘으면 버림 → 단일 검색과 같은 지연)
+    multi_query_grace_ms: float = float(os.getenv("MULTI_QUERY_GRACE_MS", "30"))
+    # 약·질환 이름 사전 (llm/lexicon.py): off / boost / filter
+    lexicon_mode: str = os.getenv("LEXICON_MODE", "boost").lower()
+    lexicon_path: str = os.getenv("LEXICON_PATH") or str(Path(__file__).resolve().parents[1] / "rag" / "data" / "lexicon.json")
+    lexicon_boost: float = float(os.getenv("LEXICON_BOOST", "0.1"))
+    lexicon_max_postings: int = int(os.getenv("LEXICON_MAX_POSTINGS", "50"))
     max_history_turns: int = int(os.getenv("MAX_HISTORY_TURNS", "8"))
     max_history_chars: int = int(os.getenv("MAX_HISTORY_CHARS", "4000"))
     max_context_chars: int = int(os.getenv("MAX_CONTEXT_CHARS", "8000"))
+    # 후속 질문("그럼 부작용은?")이면 직전 검색 결과 재사용 (llm/followup.py)
+    followup_enabled: bool = os.getenv("FOLLOWUP_ENABLED", "true").lower() in {"1", "true", "yes"}
+    # 직전 질문 임베딩과의 코사인 유사도가 이 이상이면 후속 질문 (0 이면 휴리스틱만, 임베딩 선계산 안 함)
+    followup_similarity: float = float(os.getenv("FOLLOWUP_SIMILARITY", "0.85"))
+    # 짧은 생략형 질문은 캐시 문서와 글자 bigram 이 이 비율 이상 겹칠 때만 후속 질문으로 본다
+    followup_min_overlap: float = float(os.getenv("FOLLOWUP_MIN_OVERLAP", "0.5"))
+    followup_ttl_sec: float = float(os.getenv("FOLLOWUP_TTL_SEC", "1800"))
+    followup_cache_size: int = int(os.getenv("FOLLOWUP_CACHE_SIZE", "10000"))
+    # 대화 요약(rolling summary): 요약 안 된 이력이 trigger 토큰을 넘으면
+    # 최근 keep_recent 턴만 남기고 앞쪽을 저렴한 모델로 백그라운드 요약 (trigger 0 이면 비활성화)
+    history_summary_trigger_tokens: int = int(os.getenv("HISTORY_SUMMARY_TRIGGER_TOKENS", "1200"))
+    history_keep_recent_turns: int = int(os.getenv("HISTORY_KEEP_RECENT_TURNS", "4"))
+    history_summary_model: str = os.getenv("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")
+    history_summary_max_tokens: int = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+    history_summary_cache_size: int = int(os.getenv("HISTORY_SUMMARY_CACHE_SIZE", "2000"))
+    # 서버 측 세션 저장소: memory / sqlite / redis (session_id 만 보내는 클라이언트용)
+    session_store: str = os.getenv("SESSION_STORE", "memory")
+    session_sqlite_path: str = os.getenv("SESSION_SQLITE_PATH") or str(BASE_DIR / "sessions.sqlite3")
+    session_redis_url: str = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+    session_max_sessions: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))  # memory LRU 크기
+    session_max_turns: int = int(os.getenv("SESSION_MAX_TURNS", "200"))  # 세션당 보관 메시지 수
+    session_ttl_sec: float = float(os.getenv("SESSION_TTL_SEC", "86400"))  # 마지막 사용 후 만료
+
+    # 동일한 임베딩 / 검색 / LLM 호출이 동시에 진행 중이면 결과 공유 (single-flight)
+    singleflight_enabled: bool = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() in {"1", "true", "yes"}
+
+    # 입장 제어: 동시 실행 한도 / 대기열 길이 / 대기 시간 SLO (max_concurrent 0 이면 비활성화)
+    admission_max_concurrent: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "32"))
+    admission_max_queue: int = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    admission_queue_timeout_sec: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SEC", "5"))
+    # 사용자별 토큰 버킷 (초당 요청 수 / 최대 연속 요청 수, rate 0 이면 비활성화)
+    user_rate_per_sec: float = float(os.getenv("USER_RATE_PER_SEC", "0.5"))
+    user_burst: float = float(os.getenv("USER_BURST", "5"))
+
+    # 데드라인 / 스테이지별 타임아웃 상한 (초). 실제 타임아웃 = min(상한, 요청에 남은 시간)
+    request_timeout_sec: float = float(os.getenv("REQUEST_TIMEOUT_SEC", "30"))
+    embedding_timeout_sec: float = float(os.getenv("EMBEDDING_TIMEOUT_SEC", "5"))
+    knn_timeout_sec: float = float(os.getenv("KNN_TIMEOUT_SEC", "3"))
+    llm_timeout_sec: float = float(os.getenv("LLM_TIMEOUT_SEC", "25"))
+    profile_timeout_sec: float = float(os.getenv("PROFILE_TIMEOUT_SEC", "2"))
+    # OpenSearch 클라이언트 기본 타임아웃: bulk 적재 / 인덱스·alias 관리용 (검색은 호출마다 kNN 상한을 넘김)
+    opensearch_timeout_sec: float = float(os.getenv("OPENSEARCH_TIMEOUT_SEC", "60"))
+    openai_max_retries: int = int(os.getenv("OPENAI_MAX_RETRIES", "1"))
+    # 헤지 요청 (kNN / 임베딩): 지연이 p95 (또는 HEDGE_DELAY_MS) 를 넘으면 같은 요청을 한 번 더
+    hedge_enabled: bool = os.getenv("HEDGE_ENABLED", "false").lower() in {"1", "true", "yes"}
+    hedge_delay_ms: float = float(os.getenv("HEDGE_DELAY_MS", "0"))
+    hedge_min_samples: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    hedge_max_workers: int = int(os.getenv("HEDGE_MAX_WORKERS", "32"))
+
+    # 서킷 브레이커 (임베딩 / 검색 / 프로필): 최근 window 동안 min_calls 이상이고
+    # 오류율 >= error_rate 또는 느린 호출(스테이지 타임아웃의 80%) 비율 >= slow_rate 면 open_sec 동안 차단
+    breaker_window_sec: float = float(os.getenv("BREAKER_WINDOW_SEC", "30"))
+    breaker_min_calls: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    breaker_error_rate: float = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+    breaker_slow_rate: float = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+    breaker_open_sec: float = float(os.getenv("BREAKER_OPEN_SEC", "15"))
+
+    # 토큰 예산 (0 이면 제한 없음)
+    token_budget_window_sec: int = int(os.getenv("TOKEN_BUDGET_WINDOW_SEC", "3600"))
+    token_budget_per_user: int = int(os.getenv("TOKEN_BUDGET_PER_USER", "0"))
+    token_budget_global: int = int(os.getenv("TOKEN_BUDGET_GLOBAL", "0"))
+    # 예산 초과 시: "downgrade" (저렴한 모델 + 짧은 답변) / "reject"
+    token_budget_action: str = os.getenv("TOKEN_BUDGET_ACTION", "downgrade")
+    openai_model_downgrade: str = os.getenv("OPENAI_MODEL_DOWNGRADE", "gpt-4o-mini")
+    downgrade_max_tokens: int = int(os.getenv("DOWNGRADE_MAX_TOKENS", "400"))
+
+    # 응답 모양
+    # debug: "off" (비움) / "ids" (문서는 id·score 만) / "full" (문서 본문 포함)
+    response_debug_level: str = os.getenv("RESPONSE_DEBUG_LEVEL", "ids")
+    # citations 에 내려줄 필드 (쉼표 구분, metadata 는 필요할 때만 추가)
+    citation_fields: str = os.getenv("CITATION_FIELDS", "rank,id,title,doc_type,score,detail_url")
 
     # 기타
     env: str = os.getenv("APP_ENV", "local")
 
+    @property
+    def opensearch_search_index(self) -> str:
+        """리트리버가 실제로 검색할 대상 (alias 우선)"""
+        return self.opensearch_read_alias or self.opensearch_index
+
 
 settings = Settings()
@@ -0,0 +1,67 @@
+# ai_service/llm/deadline.py
+"""
+요청 단위 데드라인.
+
+run_chat_rag 가 요청 시작 시 deadline_scope(settings.request_timeout_sec) 를 열고,
+외부 호출(임베딩 / kNN / LLM / DB)은 stage_timeout() 으로
+"스테이지 상한"과 "요청에 남은 시간" 중 작은 값을 타임아웃으로 쓴다.
+
+    with deadline_scope(30):
+        t = stage_timeout(settings.knn_timeout_sec)   # 남은 시간이 없으면 DeadlineExceeded
+        client.search(..., request_timeout=t)
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar("medinote_deadline", default=None)
+
+# 남은 시간이 이보다 적으면 외부 호출을 시작하지 않는다 (초)
+MIN_STAGE_TIMEOUT_SEC = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str):
+        super().__init__(f"request deadline exceeded before/during {stage}")
+        self.stage = stage
+
+
+@contextmanager
+def deadline_scope(timeout_sec: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    지금부터 timeout_sec 뒤를 데드라인으로 설정. 바깥에 더 이른 데드라인이 있으면 그걸 유지.
+    timeout_sec 가 None / 0 이하면 데드라인을 새로 걸지 않는다.
+    """
+    outer = _current_deadline.get()
+    deadline = outer
+    if timeout_sec and timeout_sec > 0:
+        mine = time.monotonic() + timeout_sec
+        deadline = mine if outer is None else min(outer, mine)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """데드라인까지 남은 초 (데드라인이 없으면 None)"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def stage_timeout(cap_sec: Optional[float], stage: str = "stage") -> Optional[float]:
+    """
+    min(스테이지 상한, 남은 시간). 둘 다 없으면 None (= 클라이언트 기본값).
+    남은 시간이 MIN_STAGE_TIMEOUT_SEC 미만이면 DeadlineExceeded.
+    """
+    left = remaining()
+    if left is not None and left < MIN_STAGE_TIMEOUT_SEC:
+        raise DeadlineExceeded(stage)
+    cap = cap_sec if cap_sec and cap_sec > 0 else None
+    if left is None:
+        return cap
+    return left if cap is None else min(cap, left)
@@ -1,33 +1,105 @@
 ﻿# ai_service/llm/embeddings.py
+from __future__ import annotations
+
 from functools import lru_cache
-from typing import List
+from typing import TYPE_CHECKING, List
 
-from openai import OpenAI
+from .breaker import EMBEDDING_BREAKER
 from .config import settings
+from .deadline import stage_timeout
+from .hedging import hedged
+from .singleflight import SingleFlight
+from .usage import record_usage
 
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-@lru_cache()
-def get_openai_client() -> OpenAI:
+
+# 테스트/벤치마크에서 가짜 클라이언트를 끼워 넣을 때 사용
+_client_override = None
+
+
+def set_openai_client(client) -> None:
     """
-    OpenAI 클라이언트 생성.
-    - proxies 같은 인자는 절대 넣지 말 것 (openai>=1.0에서 지원 안 함)
+    get_openai_client() 가 돌려줄 클라이언트를 강제로 지정.
+    embeddings / chat.completions / audio 인터페이스만 맞추면 됨. None 을 넘기면 해제.
     """
+    global _client_override
+    _client_override = client
+
+
+_embed_flight = SingleFlight("embedding")
+
+
+@lru_cache()
+def _build_openai_client() -> OpenAI:
+    # openai SDK 는 import 비용이 커서(~0.7s) 클라이언트를 처음 만들 때 로드
+    from openai import OpenAI
+
+    # 호출마다 timeout 을 따로 넘기지만, 빠뜨린 호출도 무한정 걸리지 않도록 기본 상한
     return OpenAI(
         api_key=settings.openai_api_key,
         base_url=settings.openai_base_url or None,
+        timeout=settings.llm_timeout_sec,
+        max_retries=settings.openai_max_retries,
     )
 
 
+def get_openai_client() -> OpenAI:
+    """
+    OpenAI 클라이언트 생성.
+    - proxies 같은 인자는 절대 넣지 말 것 (openai>=1.0에서 지원 안 함)
+    """
+    if _client_override is not None:
+        return _client_override
+    return _build_openai_client()
+
+
 def embed_text(text: str) -> List[float]:
     """
     단일 문자열을 벡터로 변환.
+    같은 문자열 임베딩이 이미 진행 중이면 그 결과를 같이 쓴다.
     """
     if not text:
         return []
 
+    model = settings.openai_model_embedding
+    return _embed_flight.do(
+        (model, text), lambda: _embed_text(text, model), clone=list, timeout=settings.embedding_timeout_sec
+    )
+
+
+def _embed_text(text: str, model: str) -> List[float]:
     client = get_openai_client()
-    resp = client.embeddings.create(
-        model=settings.openai_model_embedding,
-        input=text,
+    timeout = stage_timeout(settings.embedding_timeout_sec, "embedding")
+    resp = EMBEDDING_BREAKER.call(
+        lambda: hedged(
+            "embedding",
+            lambda: client.embeddings.create(model=model, input=text, timeout=timeout),
+            timeout=timeout,
+        )
     )
+    record_usage("embedding", model, getattr(resp, "usage", None))
     return resp.data[0].embedding
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """
+    여러 문자열을 임베딩 API 호출 1번으로 변환 (멀티 쿼리 검색용). 입력 순서대로 반환.
+    """
+    if not texts:
+        return []
+
+    model = settings.openai_model_embedding
+    client = get_openai_client()
+    timeout = stage_timeout(settings.embedding_timeout_sec, "embedding")
+    resp = EMBEDDING_BREAKER.call(
+        lambda: hedged(
+            "embedding",
+            lambda: client.embeddings.create(model=model, input=list(texts), timeout=timeout),
+            timeout=timeout,
+        )
+    )
+    record_usage("embedding", model, getattr(resp, "usage", None))
+    data = sorted(resp.data, key=lambda d: getattr(d, "index", 0))
+    return [d.embedding for d in data]
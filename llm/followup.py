@@ -0,0 +1,202 @@
+# ai_service/llm/followup.py
+"""
+후속 질문 감지 → 직전 턴 검색 결과 재사용.
+
+"그럼 부작용은?" 같은 후속 질문을 단독으로 임베딩·검색하면 주어가 빠져서 엉뚱한 문서가 나온다.
+세션(또는 사용자)별로 직전 의료 질문의 순위 문서와 질문 임베딩을 들고 있다가,
+후속 질문이면 새로 검색하지 않고 캐시 문서를 가볍게 다시 정렬해서 쓴다.
+(질문의 주어는 프롬프트에 들어가는 대화 이력으로 LLM 이 해석)
+
+감지 (detect_followup, 비용 순):
+  - anaphora : "그럼", "그 약", "아까" 같은 지시어                         (임베딩 X)
+  - ellipsis : 띄어쓰기 없는 짧은 질문("부작용은?") + 캐시 문서와 글자가 충분히 겹침 (임베딩 X)
+  - similar  : 직전 질문 임베딩과 코사인 유사도 ≥ FOLLOWUP_SIMILARITY
+               (어차피 검색에 쓸 임베딩이라 추가 비용 없음)
+  단, 직전 질문·캐시 문서에 없는 약·질환 이름이 질문에 있으면 어느 경우든 새로 검색한다.
+  ("근데 와파린이랑 같이 먹어도 돼?" 를 직전 타이레놀 문서로 답하면 안 됨)
+
+    last = FOLLOWUPS.get(key)
+    reason = detect_followup(query, last)
+    docs = rerank_followup(query, last.docs) if reason else retrieve_documents(...)
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from .config import settings
+from .query_rewrite import SECTION_TERMS, extract_entities
+from .telemetry import REGISTRY
+
+Doc = Dict[str, Any]
+
+FOLLOWUP_TOTAL = REGISTRY.counter(
+    "medinote_followup_total", "후속 질문 감지 결과 (reason=none 이면 새로 검색)", ("reason",)
+)
+
+# 질문 맨 앞에 오면 앞 대화를 잇는 말
+# ("근데" / "그리고" / "또" 같은 단순 접속어는 새 질문에도 흔히 붙으므로 넣지 않는다)
+LEADING_MARKERS = ("그럼", "그러면", "혹시 그")
+# 어디 있든 앞 대화의 대상을 가리키는 말
+ANAPHORA_MARKERS = (
+    "그거", "그것", "그건", "그게", "이거", "이것", "저거",
+    "그 약", "이 약", "저 약", "그 병", "그 질환", "그 증상",
+    "그중", "그 중", "아까", "방금", "위에서", "앞에서", "말씀하신", "말한 약",
+)
+ELLIPSIS_MAX_CHARS = 8  # "복용량은요?" 정도까지
+
+
+@dataclass
+class LastRetrieval:
+    query: str
+    vector: Optional[List[float]]
+    docs: List[Doc]
+    created_at: float
+
+
+class RetrievalCache:
+    """key(session / user) → 직전 의료 질문의 검색 결과. LRU + TTL"""
+
+    def __init__(self, max_entries: int = 10000, ttl_sec: float = 1800):
+        self.max_entries = max_entries
+        self.ttl_sec = ttl_sec
+        self._data: "OrderedDict[str, LastRetrieval]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[LastRetrieval]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if self.ttl_sec > 0 and time.time() - entry.created_at > self.ttl_sec:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def put(self, key: str, query: str, vector: Optional[List[float]], docs: List[Doc]) -> None:
+        entry = LastRetrieval(query, vector, [dict(d) for d in docs], time.time())
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def touch(self, key: str) -> None:
+        """후속 질문에 재사용했으면 만료 시간만 연장 (기준 질문은 그대로)"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                entry.created_at = time.time()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+FOLLOWUPS = RetrievalCache(settings.followup_cache_size, settings.followup_ttl_sec)
+
+
+def retrieval_key(session_id: Optional[str], user_id: Optional[str]) -> Optional[str]:
+    """
+    익명 요청(둘 다 없음)은 이어지는 대화를 구분할 수 없으므로 캐시하지 않는다.
+    세션 키에도 user_id 를 넣어 다른 사용자가 같은 session_id 로 캐시를 읽지 못하게 한다.
+    """
+    if session_id:
+        return f"session:{user_id or ''}:{session_id}"
+    if user_id:
+        return f"user:{user_id}"
+    return None
+
+
+def _bigrams(text: str) -> set:
+    compact = "".join(ch for ch in text.lower() if ch.isalnum())
+    return {compact[i : i + 2] for i in range(len(compact) - 1)}
+
+
+def _overlap(query_grams: set, doc: Doc) -> float:
+    if not query_grams:
+        return 0.0
+    doc_grams = _bigrams(f"{doc.get('title') or ''} {doc.get('content') or ''}")
+    return len(query_grams & doc_grams) / len(query_grams)
+
+
+def _compact(text: str) -> str:
+    return "".join(text.lower().split())
+
+
+def new_entities(query: str, last: LastRetrieval) -> List[str]:
+    """질문 속 약·질환·증상 이름 중 직전 질문과 캐시 문서 어디에도 없는 것"""
+    names = [e for e in extract_entities(query) if e not in SECTION_TERMS]
+    if not names:
+        return []
+    parts = [last.query]
+    for d in last.docs:
+        parts += [str(d.get("title") or ""), str(d.get("content") or "")]
+        parts += [str(v) for v in (d.get("metadata") or {}).values() if isinstance(v, str)]
+    seen = _compact(" ".join(parts))
+    return [n for n in names if _compact(n) not in seen]
+
+
+def cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def detect_followup(
+    query: str,
+    last: Optional[LastRetrieval],
+    vector: Optional[Sequence[float]] = None,
+) -> Optional[str]:
+    """
+    후속 질문이면 감지 사유("anaphora" / "ellipsis" / "similar"), 아니면 None.
+    vector 를 안 넘기면 임베딩 없는 휴리스틱만 본다.
+    """
+    if last is None or not last.docs or not settings.followup_enabled:
+        return None
+    q = query.strip()
+    if not q:
+        return None
+    if new_entities(q, last):
+        return None
+
+    if q.startswith(LEADING_MARKERS) or any(m in q for m in ANAPHORA_MARKERS):
+        return "anaphora"
+
+    # "부작용은?" 은 후속, "타이레놀은?" 은 새 약 이름 → 캐시 문서에 그 글자가 있는지로 구분
+    core = q.rstrip("?？ ")
+    if " " not in core and len(core) <= ELLIPSIS_MAX_CHARS:
+        grams = _bigrams(core)
+        if max((_overlap(grams, d) for d in last.docs), default=0.0) >= settings.followup_min_overlap:
+            return "ellipsis"
+
+    if (
+        vector is not None
+        and last.vector
+        and settings.followup_similarity > 0
+        and cosine(vector, last.vector) >= settings.followup_similarity
+    ):
+        return "similar"
+    return None
+
+
+def rerank_followup(query: str, docs: List[Doc], weight: float = 0.5) -> List[Doc]:
+    """
+    캐시 문서를 후속 질문과 글자 bigram 이 겹치는 정도로 다시 정렬 (검색 점수 * (1 + weight * 겹침)).
+    문서의 score 는 바꾸지 않는다. (캐스케이드의 검색 신뢰도 판단에 그대로 쓰임)
+    """
+    grams = _bigrams(query)
+    scored = [
+        ((d.get("score", 0.0) or 0.0) * (1.0 + weight * _overlap(grams, d)), i, dict(d))
+        for i, d in enumerate(docs)
+    ]
+    scored.sort(key=lambda t: (-t[0], t[1]))
+    return [d for _, _, d in scored]
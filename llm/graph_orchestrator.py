@@ -1,7 +1,8 @@
 ﻿# ai_service/llm/utils/graph_orchestrator.py
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional
 
-from .orchestrator import run_chat_rag
+from .admission import ADMISSION
+from .orchestrator import run_chat_rag, stream_chat_rag
 
 
 def run_chat_flow(
@@ -9,15 +10,43 @@ def run_chat_flow(
     user_id: Optional[str] = None,
     history: Optional[List[Dict[str, str]]] = None,
     user_profile: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     나중에 여러 노드(분류 → RAG → 툴콜 등)를 연결하고 싶으면
     여기서 graph-style로 orchestration.
     지금은 단일 RAG 파이프라인만 래핑.
+    동시 실행 / 사용자별 한도를 넘으면 AdmissionRejected 를 던진다.
     """
-    return run_chat_rag(
-        query=query,
-        user_id=user_id,
-        history=history,
-        user_profile=user_profile,
-    )
+    with ADMISSION.admit(user_id):
+        return run_chat_rag(
+            query=query,
+            user_id=user_id,
+            history=history,
+            user_profile=user_profile,
+            session_id=session_id,
+        )
+
+
+def stream_chat_flow(
+    query: str,
+    user_id: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    user_profile: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    run_chat_flow 의 스트리밍 버전 (SSE 엔드포인트용).
+    입장하면 {"event": "admitted"} 를 먼저 보내고,
+    {"event": "delta", ...} 들 다음에 {"event": "done", "data": payload} 가 온다.
+    입장 거절은 첫 next() 에서 AdmissionRejected 로 올라간다.
+    """
+    with ADMISSION.admit(user_id) as ticket:
+        yield {"event": "admitted", "data": {"queue_ms": ticket.queue_ms}}
+        yield from stream_chat_rag(
+            query=query,
+            user_id=user_id,
+            history=history,
+            user_profile=user_profile,
+            session_id=session_id,
+        )
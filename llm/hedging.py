@@ -0,0 +1,139 @@
+# ai_service/llm/hedging.py
+"""
+헤지 요청 (hedged request): 첫 요청이 p95 지연을 넘기면 같은 요청을 하나 더 보내고 먼저 온 답을 쓴다.
+꼬리 지연(p99)을 줄이는 대신 요청량이 최대 ~5% 늘어난다. 멱등한 읽기(kNN 검색 / 임베딩)에만 사용.
+
+    vector = hedged("embedding", lambda: client.embeddings.create(...), timeout=t)
+
+- 지연 기준: settings.hedge_delay_ms 가 있으면 고정값, 없으면 스테이지별 최근 지연의 p95
+- 두 요청 모두 ContextVar(타이밍 / 사용량 / 데드라인)를 복사한 채로 실행
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, TypeVar
+
+from .config import settings
+from .deadline import DeadlineExceeded
+from .telemetry import REGISTRY
+
+T = TypeVar("T")
+
+HEDGES = REGISTRY.counter(
+    "medinote_hedged_requests_total",
+    "헤지 요청 수 (fired: 두 번째 요청 발사, won: 두 번째 요청이 먼저 끝남)",
+    ("stage", "result"),
+)
+
+
+class LatencyTracker:
+    """최근 window 개 지연시간(ms)으로 분위수를 계산"""
+
+    def __init__(self, window: int = 500):
+        self._values: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, ms: float) -> None:
+        with self._lock:
+            self._values.append(ms)
+
+    def count(self) -> int:
+        return len(self._values)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._values)
+        if not values:
+            return None
+        idx = min(len(values) - 1, max(0, int(round(q * (len(values) - 1)))))
+        return values[idx]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def tracker(stage: str) -> LatencyTracker:
+    with _trackers_lock:
+        t = _trackers.get(stage)
+        if t is None:
+            t = _trackers[stage] = LatencyTracker()
+        return t
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _trackers_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.hedge_max_workers, thread_name_prefix="hedge"
+            )
+        return _executor
+
+
+def hedge_delay_sec(stage: str) -> Optional[float]:
+    """헤지를 보낼 지연(초). 샘플이 모자라면 None (= 헤지 안 함)"""
+    if settings.hedge_delay_ms > 0:
+        return settings.hedge_delay_ms / 1000
+    t = tracker(stage)
+    if t.count() < settings.hedge_min_samples:
+        return None
+    p95 = t.quantile(0.95)
+    return p95 / 1000 if p95 is not None else None
+
+
+def _submit(fn: Callable[[], T]) -> "Future[T]":
+    ctx = contextvars.copy_context()
+    return _pool().submit(ctx.run, fn)
+
+
+def hedged(stage: str, fn: Callable[[], T], timeout: Optional[float] = None) -> T:
+    """
+    fn 을 실행하고 결과를 돌려준다. 헤지가 꺼져 있으면 그냥 fn().
+    timeout(초) 안에 어느 쪽도 끝나지 않으면 DeadlineExceeded.
+    """
+    start = time.perf_counter()
+    if not settings.hedge_enabled:
+        result = fn()
+        tracker(stage).observe((time.perf_counter() - start) * 1000)
+        return result
+
+    delay = hedge_delay_sec(stage)
+    end = None if timeout is None else start + timeout
+    primary = _submit(fn)
+    futures = [primary]
+
+    # p95 기준은 첫 요청 자체의 지연으로 (헤지가 이긴 값을 넣으면 기준이 계속 내려감)
+    def _observe(f: "Future[T]") -> None:
+        if not f.cancelled() and f.exception() is None:
+            tracker(stage).observe((time.perf_counter() - start) * 1000)
+
+    primary.add_done_callback(_observe)
+
+    first_wait = delay
+    if end is not None:
+        left = end - time.perf_counter()
+        first_wait = left if first_wait is None else min(first_wait, left)
+    done, _ = wait(futures, timeout=first_wait)
+
+    if not done and delay is not None and (end is None or time.perf_counter() < end):
+        HEDGES.inc(stage=stage, result="fired")
+        futures.append(_submit(fn))
+
+    while True:
+        left = None if end is None else max(0.0, end - time.perf_counter())
+        done, pending = wait(futures, timeout=left, return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(stage)
+        # 성공한 쪽이 있으면 그걸 쓰고, 둘 다 실패하면 첫 예외
+        for f in futures:
+            if f in done and f.exception() is None:
+                if f is not primary:
+                    HEDGES.inc(stage=stage, result="won")
+                return f.result()
+        if not pending:
+            raise futures[0].exception() or futures[-1].exception()  # type: ignore[misc]
+        futures = list(pending)
@@ -0,0 +1,250 @@
+# ai_service/llm/history.py
+"""
+긴 대화 압축 (rolling summary).
+
+요약되지 않은 이력이 HISTORY_SUMMARY_TRIGGER_TOKENS 를 넘으면
+최근 HISTORY_KEEP_RECENT_TURNS 턴은 그대로 두고 그 앞의 턴들을 요약 1개로 접는다.
+
+- 요약은 저렴한 모델(HISTORY_SUMMARY_MODEL)로 백그라운드 스레드에서 만든다. (응답 지연에 포함 X)
+- 세션별 캐시: "앞쪽 N턴까지의 요약" 을 들고 있다가, 새로 밀려난 턴만 기존 요약에 이어 붙인다 (증분)
+- 요약이 아직 준비되지 않았으면 이번 턴은 기존처럼 trim_history 로 자른 이력만 사용
+
+    summary, recent = compact_history(history, session_id=..., user_id=...)
+    build_messages(..., history=recent, history_summary=summary)
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .embeddings import get_openai_client
+from .telemetry import REGISTRY, log_info, record_error
+from .usage import record_usage
+from .utils.preprocess import trim_history
+
+Message = Dict[str, str]
+# (이전 요약 또는 None, 새로 접을 턴들) → 새 요약
+SummarizeFn = Callable[[Optional[str], List[Message]], str]
+
+HISTORY_SUMMARIES = REGISTRY.counter(
+    "medinote_history_summaries_total", "백그라운드 대화 요약 수", ("result",)
+)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "너는 건강 상담 챗봇의 대화 기록을 요약하는 도우미다. "
+    "이전 요약과 새 대화를 합쳐서, 이후 답변에 필요한 사실만 한국어로 간결하게 정리해라. "
+    "사용자가 말한 증상·복용 약·질환·알레르기·검사 수치와 이미 안내한 핵심 내용은 빠뜨리지 말고, "
+    "인사나 잡담은 생략해라. 5~10줄의 글머리표로 작성해라."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    tiktoken 없이 쓰는 근사치: 한글 등 비 ASCII 는 글자당 ~1토큰, ASCII 는 ~4글자당 1토큰.
+    """
+    if not text:
+        return 0
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return (len(text) - ascii_chars) + ascii_chars // 4 + 1
+
+
+def history_tokens(history: List[Message]) -> int:
+    # 메시지당 role / 구분자 오버헤드 ~4토큰
+    return sum(estimate_tokens(m.get("content", "")) + 4 for m in history)
+
+
+def _digest(turns: List[Message]) -> str:
+    h = hashlib.sha1()
+    for m in turns:
+        h.update(m.get("role", "").encode("utf-8"))
+        h.update(b"\x00")
+        h.update(m.get("content", "").encode("utf-8"))
+        h.update(b"\x01")
+    return h.hexdigest()
+
+
+def _summarize_with_llm(previous: Optional[str], turns: List[Message]) -> str:
+    lines = [f"{'사용자' if m.get('role') == 'user' else '챗봇'}: {m.get('content', '')}" for m in turns]
+    body = ""
+    if previous:
+        body += f"[이전 요약]\n{previous}\n\n"
+    body += "[새 대화]\n" + "\n".join(lines)
+
+    model = settings.history_summary_model
+    resp = get_openai_client().chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": body},
+        ],
+        max_tokens=settings.history_summary_max_tokens,
+        timeout=settings.llm_timeout_sec,
+    )
+    record_usage("summary", model, getattr(resp, "usage", None))
+    return (resp.choices[0].message.content or "").strip()
+
+
+@dataclass(frozen=True)
+class _Summary:
+    text: str
+    folded: int  # 요약에 들어간 앞쪽 턴 수
+    digest: str  # 그 턴들의 해시 (클라이언트가 다른 이력을 보내면 무효화)
+
+
+class HistoryCompactor:
+    def __init__(
+        self,
+        summarize: SummarizeFn = _summarize_with_llm,
+        trigger_tokens: int = 1200,
+        keep_recent: int = 4,
+        max_sessions: int = 2000,
+        max_workers: int = 2,
+    ):
+        self.summarize = summarize
+        self.trigger_tokens = trigger_tokens
+        self.keep_recent = max(1, keep_recent)
+        self.max_sessions = max_sessions
+        self.max_workers = max_workers
+        self._cache: "OrderedDict[str, _Summary]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    # ---------- 캐시 ----------
+    def _lookup(self, key: str, history: List[Message]) -> Optional[_Summary]:
+        with self._lock:
+            state = self._cache.get(key)
+            if state is not None:
+                self._cache.move_to_end(key)
+        if state is None:
+            return None
+        if state.folded > len(history) or _digest(history[: state.folded]) != state.digest:
+            return None  # 같은 키로 다른 대화가 들어옴 (새 대화 / 이력 편집)
+        return state
+
+    def _store(self, key: str, state: _Summary) -> None:
+        with self._lock:
+            self._cache[key] = state
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_sessions:
+                self._cache.popitem(last=False)
+
+    def cached(self, key: str) -> Optional[_Summary]:
+        with self._lock:
+            return self._cache.get(key)
+
+    # ---------- 백그라운드 요약 ----------
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="history-summary"
+                )
+            return self._executor
+
+    def submit(
+        self,
+        key: str,
+        previous: Optional[str],
+        turns: List[Message],
+        on_done: Callable[[str], None],
+    ) -> bool:
+        """
+        previous 요약에 turns 를 이어 붙인 새 요약을 백그라운드로 만들고 on_done(text) 호출.
+        같은 key 로 이미 요약 중이면 예약하지 않는다. (끝나면 다음 턴에 이어서)
+        """
+        pool = self._pool()
+        with self._lock:
+            if key in self._pending:
+                return False
+            future = self._pending[key] = pool.submit(self._fold, key, previous, list(turns), on_done)
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return True
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _fold(
+        self, key: str, previous: Optional[str], turns: List[Message], on_done: Callable[[str], None]
+    ) -> None:
+        try:
+            text = self.summarize(previous, turns)
+            if text:
+                on_done(text)
+            HISTORY_SUMMARIES.inc(result="ok")
+            log_info("history_summarized", session=key, new_turns=len(turns))
+        except Exception as e:
+            HISTORY_SUMMARIES.inc(result="error")
+            record_error("history_summary", e)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """진행 중인 요약이 끝날 때까지 대기 (테스트 / 종료 시)"""
+        with self._lock:
+            futures = list(self._pending.values())
+        if futures:
+            wait(futures, timeout=timeout)
+
+    # ---------- 메인 ----------
+    def should_fold(self, folded: int, total: int, tail_tokens: int) -> bool:
+        """요약 안 된 턴(folded 이후)이 trigger 를 넘고, 최근 keep_recent 턴 앞에 접을 턴이 있는지"""
+        return (
+            self.trigger_tokens > 0
+            and total - self.keep_recent > folded
+            and tail_tokens > self.trigger_tokens
+        )
+
+    def compact(self, key: str, history: List[Message]) -> Tuple[Optional[str], List[Message]]:
+        """
+        반환: (요약 또는 None, 프롬프트에 그대로 넣을 최근 이력)
+        """
+        if not history:
+            return None, []
+        if self.trigger_tokens <= 0:
+            return None, trim_history(history)
+
+        state = self._lookup(key, history)
+        folded = state.folded if state is not None else 0
+        tail = history[folded:]
+
+        fold_upto = len(history) - self.keep_recent
+        if self.should_fold(folded, len(history), history_tokens(tail)):
+            folding = history[:fold_upto]
+            self.submit(
+                key,
+                state.text if state is not None else None,
+                folding[folded:],
+                lambda text: self._store(key, _Summary(text, fold_upto, _digest(folding))),
+            )
+
+        return (state.text if state is not None else None), trim_history(tail)
+
+
+def session_key(session_id: Optional[str], user_id: Optional[str], history: List[Message]) -> str:
+    """세션 id > 사용자 id > 첫 메시지 해시 순으로 캐시 키를 정한다."""
+    if session_id:
+        return f"session:{session_id}"
+    if user_id:
+        return f"user:{user_id}"
+    return f"history:{_digest(history[:1])}"
+
+
+COMPACTOR = HistoryCompactor(
+    trigger_tokens=settings.history_summary_trigger_tokens,
+    keep_recent=settings.history_keep_recent_turns,
+    max_sessions=settings.history_summary_cache_size,
+)
+
+
+def compact_history(
+    history: List[Message],
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> Tuple[Optional[str], List[Message]]:
+    return COMPACTOR.compact(session_key(session_id, user_id, history), history)
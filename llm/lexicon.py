@@ -0,0 +1,296 @@
+# ai_service/llm/lexicon.py
+"""
+약·질환 이름 사전 (in-memory trie) → 질문 속 엔티티 감지 → kNN 필터 / 부스트.
+
+코퍼스의 drug_name_kor / drug_name_eng / disease_name_kor / disease_name_eng 값으로 사전을 만들어 두고
+(python -m llm.lexicon --input rag/data/merged_all.jsonl), 질문을 글자 단위로 한 번 훑어서
+가장 긴 이름을 찾는다. (질문 길이 × 최장 이름 길이, 수십 µs)
+이름은 단어 경계에서 시작해야 하고, 영문 이름 뒤에는 영문·숫자가 붙으면 안 된다.
+한글 이름 뒤에는 조사가 붙을 수 있고, 짧은(2글자) 이름은 뒤가 경계이거나 조사일 때만 인정한다.
+
+  - 사전 키: 원래 이름 + 제형·함량을 뗀 기본 이름  "타이레놀정500밀리그람" → "타이레놀"
+  - 사전 값: (필드, 코퍼스에 저장된 원래 값) 목록  → OpenSearch keyword 서브필드 terms 필터에 그대로 사용
+
+LEXICON_MODE:
+  - off    : 사용 안 함
+  - boost  : 검색 후 이름이 일치하는 문서 점수를 (1 + LEXICON_BOOST) 배 (기본, 인덱스 변경 불필요)
+  - filter : kNN efficient filter 로 후보를 그 약·질환 문서로 제한 (결과가 없으면 필터 없이 다시 검색)
+             rag/schema 의 *.keyword 서브필드가 있는 인덱스에서만 동작
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+from .telemetry import REGISTRY, log_info
+
+NAME_FIELDS = ("drug_name_kor", "drug_name_eng", "disease_name_kor", "disease_name_eng")
+KEYWORD_SUFFIX = ".keyword"
+MIN_KOR_CHARS = 2
+MIN_ENG_CHARS = 3
+SHORT_KOR_CHARS = 2  # 이 길이 이하 한글 이름은 뒤에 조사 / 경계만 허용 ("감기" O, "감기약" X)
+
+# 한글 약 이름 끝의 제형 (함량 숫자를 뗀 뒤 제거)
+DOSAGE_FORMS = (
+    "연질캡슐", "서방정", "필름코팅정", "캡슐", "시럽", "현탁액", "주사액", "과립", "크림", "연고",
+    "패취", "점안액", "액", "겔", "산", "정",
+)
+_PARENS = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_TRAILING_STRENGTH = re.compile(r"[\d.,/]+\s*[a-zA-Z가-힣]*$")
+_ENG_WORD = re.compile(r"[a-z]+")
+_KOR_PARTICLE = re.compile(r"이랑|랑|하고|에서|에게|에는|에도|으로|로|이나|나|은|는|이|가|을|를|에|의|도|만|과|와")
+
+LEXICON_HITS = REGISTRY.counter(
+    "medinote_lexicon_queries_total", "사전 엔티티 감지 결과", ("result",)
+)
+
+Posting = Tuple[str, str]  # (필드, 원래 값)
+_END = ""  # trie 노드에서 종료 표시 키 (글자 키와 겹치지 않음)
+
+
+def normalize_name(text: str) -> str:
+    return "".join(text.lower().split())
+
+
+def base_names(field: str, value: str) -> List[str]:
+    """사전 키 후보: 원래 이름과 제형·함량·괄호를 뗀 기본 이름"""
+    names = [normalize_name(value)]
+    stripped = _PARENS.sub("", value).strip()
+    if field.endswith("_eng"):
+        words = _ENG_WORD.findall(stripped.lower())
+        if words:
+            names.append(words[0])
+    else:
+        stripped = normalize_name(stripped)
+        stripped = _TRAILING_STRENGTH.sub("", stripped)
+        for form in DOSAGE_FORMS:
+            if stripped.endswith(form) and len(stripped) - len(form) >= MIN_KOR_CHARS:
+                stripped = stripped[: -len(form)]
+                break
+        names.append(stripped)
+    min_len = MIN_ENG_CHARS if field.endswith("_eng") else MIN_KOR_CHARS
+    out: List[str] = []
+    for n in names:
+        if len(n) >= min_len and n not in out:
+            out.append(n)
+    return out
+
+
+@dataclass(frozen=True)
+class Entity:
+    text: str  # 질문에서 찾은 부분
+    kind: str  # "drug" / "disease"
+    start: int
+    end: int
+    postings: Tuple[Posting, ...]
+
+
+class Lexicon:
+    """글자 trie. 키는 normalize_name 한 이름, 값은 postings"""
+
+    def __init__(self, entries: Iterable[Dict[str, str]] = (), max_postings: int = 50):
+        self.max_postings = max_postings
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+        for e in entries:
+            self.add(e["key"], e["field"], e["value"])
+
+    def add(self, key: str, field: str, value: str) -> None:
+        node = self._root
+        for ch in key:
+            node = node.setdefault(ch, {})
+        postings: List[Posting] = node.setdefault(_END, [])
+        if not postings:
+            self.size += 1
+        if (field, value) not in postings and len(postings) < self.max_postings:
+            postings.append((field, value))
+
+    def detect(self, query: str) -> List[Entity]:
+        """
+        왼쪽부터 가장 긴 이름을 겹치지 않게 찾는다. (공백은 무시하고 원문 위치로 되돌림)
+        다른 단어 가운데에 걸친 이름은 버린다. ("소화" 가 "소화불량" 안에서 잡히지 않도록)
+        """
+        chars: List[str] = []
+        positions: List[int] = []
+        for i, ch in enumerate(query.lower()):
+            if not ch.isspace():
+                chars.append(ch)
+                positions.append(i)
+
+        found: List[Entity] = []
+        i = 0
+        while i < len(chars):
+            if not _starts_word(query, positions[i]):
+                i += 1
+                continue
+            node, best = self._root, None
+            j = i
+            while j < len(chars):
+                node = node.get(chars[j])
+                if node is None:
+                    break
+                j += 1
+                if _END in node and _ends_word(query, positions[j - 1] + 1, j - i):
+                    best = (j, node[_END])
+            if best is None:
+                i += 1
+                continue
+            end, postings = best
+            start_pos, end_pos = positions[i], positions[end - 1] + 1
+            kind = "drug" if postings[0][0].startswith("drug") else "disease"
+            found.append(Entity(query[start_pos:end_pos], kind, start_pos, end_pos, tuple(postings)))
+            i = end
+        return found
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def _script(ch: str) -> str:
+    if "가" <= ch <= "힣":
+        return "kor"
+    if ch.isascii() and ch.isalnum():
+        return "eng"
+    return "other" if ch.isalnum() else ""
+
+
+def _starts_word(query: str, start: int) -> bool:
+    """바로 앞 글자가 없거나, 공백·기호이거나, 다른 문자 체계면 단어 시작"""
+    if start == 0:
+        return True
+    prev = _script(query[start - 1])
+    return not prev or prev != _script(query[start])
+
+
+def _ends_word(query: str, end: int, length: int) -> bool:
+    """query[:end] 로 끝나는 이름(공백 뺀 길이 length) 뒤가 단어 경계인지"""
+    if end >= len(query):
+        return True
+    last, nxt = _script(query[end - 1]), _script(query[end])
+    if not nxt or nxt != last:
+        return True
+    if last == "kor":
+        # 한글 이름 뒤 조사는 허용. 긴 이름은 복합어("타이레놀시럽")도 허용
+        return length > SHORT_KOR_CHARS or _KOR_PARTICLE.match(query, end) is not None
+    return False
+
+
+def build_entries(docs: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """코퍼스 문서들 → 사전 항목 [{"key", "field", "value"}] (중복 제거)"""
+    seen = set()
+    entries: List[Dict[str, str]] = []
+    for doc in docs:
+        for field in NAME_FIELDS:
+            value = doc.get(field)
+            if not value or not isinstance(value, str):
+                continue
+            value = value.strip()
+            for key in base_names(field, value):
+                item = (key, field, value)
+                if item not in seen:
+                    seen.add(item)
+                    entries.append({"key": key, "field": field, "value": value})
+    return entries
+
+
+def load_lexicon(path: Optional[str] = None) -> Lexicon:
+    path = path or settings.lexicon_path
+    p = Path(path)
+    if not p.exists():
+        log_info("lexicon_missing", path=str(p))
+        return Lexicon()
+    with p.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    lexicon = Lexicon(data.get("entries", []), settings.lexicon_max_postings)
+    log_info("lexicon_loaded", path=str(p), names=len(lexicon))
+    return lexicon
+
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_lock = threading.Lock()
+
+
+def get_lexicon() -> Lexicon:
+    """프로세스 내 공유 사전 (처음 쓸 때 LEXICON_PATH 에서 로드, 파일이 없으면 빈 사전)"""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                _lexicon = load_lexicon()
+    return _lexicon
+
+
+def set_lexicon(lexicon: Optional[Lexicon]) -> None:
+    """테스트에서 사전 교체. None 이면 다음 호출 때 파일에서 다시 로드."""
+    global _lexicon
+    _lexicon = lexicon
+
+
+def detect_entities(query: str) -> List[Entity]:
+    if settings.lexicon_mode == "off":
+        return []
+    entities = get_lexicon().detect(query)
+    LEXICON_HITS.inc(result="hit" if entities else "miss")
+    return entities
+
+
+def knn_filter(entities: List[Entity]) -> Optional[Dict[str, Any]]:
+    """엔티티 → kNN efficient filter (이름 중 하나라도 일치하는 문서만)"""
+    values: Dict[str, List[str]] = {}
+    for ent in entities:
+        for field, value in ent.postings:
+            bucket = values.setdefault(field + KEYWORD_SUFFIX, [])
+            if value not in bucket:
+                bucket.append(value)
+    if not values:
+        return None
+    return {
+        "bool": {
+            "should": [{"terms": {field: vals}} for field, vals in values.items()],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+def boost_documents(docs: List[Dict[str, Any]], entities: List[Entity], boost: float) -> List[Dict[str, Any]]:
+    """이름이 일치하는 문서는 score * (1 + boost), entity_match 표시 후 다시 정렬"""
+    if not entities or boost <= 0:
+        return docs
+    wanted = {(field, value) for ent in entities for field, value in ent.postings}
+    for doc in docs:
+        meta = doc.get("metadata") or {}
+        if any((field, meta.get(field)) in wanted for field in NAME_FIELDS):
+            doc["score"] = (doc.get("score", 0.0) or 0.0) * (1.0 + boost)
+            doc["entity_match"] = True
+    docs.sort(key=lambda d: d.get("score", 0.0), reverse=True)
+    return docs
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="코퍼스 JSONL → 약·질환 이름 사전(JSON)")
+    parser.add_argument("--input", type=Path, required=True, help="merged_all.jsonl / embedded_all.jsonl")
+    parser.add_argument("--out", type=Path, default=Path(settings.lexicon_path))
+    args = parser.parse_args(argv)
+
+    def _docs():
+        with args.input.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    entries = build_entries(_docs())
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with args.out.open("w", encoding="utf-8") as f:
+        json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False)
+    print(f"📝 사전 저장: {args.out} (항목 {len(entries)}개, 이름 {len(Lexicon(entries))}개)")
+
+
+if __name__ == "__main__":
+    main()
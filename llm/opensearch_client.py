@@ -1,51 +1,83 @@
 ﻿# OpenSearch 연결
 # llm/opensearch_client.py
 
+# opensearchpy / boto3 / requests_aws4auth 는 무거워서(import 만 수백 ms) 클라이언트를 처음 만들 때 import 한다.
+# (tests/test_import_time.py 가 llm.orchestrator import 시 로드되지 않는지 확인)
+from __future__ import annotations
+
 import os
-from pathlib import Path
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from .config import load_env, settings
+
+if TYPE_CHECKING:
+    from opensearchpy import OpenSearch
+
+
+@lru_cache()
+def _opensearch_env() -> tuple[str | None, str]:
+    """
+    .env 를 읽고 (host, region) 반환. import 시점이 아니라 클라이언트를 처음 만들 때 1번만.
+    """
+    load_env()
+    return os.getenv("OPENSEARCH_HOST"), os.getenv("OPENSEARCH_REGION", "ap-northeast-2")
 
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from requests_aws4auth import AWS4Auth
-import boto3
-from dotenv import load_dotenv
+# 테스트/벤치마크에서 로컬 대역 클라이언트를 끼워 넣을 때 사용
+_client_override = None
 
-# =========================
-#  .env 로드
-# =========================
-# 이 파일 경로: ai_service/llm/opensearch_client.py
-# parent      : ai_service/llm
-# parent.parent : ai_service (프로젝트 루트)
-BASE_DIR = Path(__file__).resolve().parent.parent
-env_path = BASE_DIR / ".env"
-load_dotenv(env_path)
 
-OPENSEARCH_HOST = os.getenv("OPENSEARCH_HOST") 
-OPENSEARCH_REGION = os.getenv("OPENSEARCH_REGION", "ap-northeast-2")
+def set_opensearch_client(client) -> None:
+    """
+    get_opensearch_client() 가 돌려줄 클라이언트를 강제로 지정.
+    (benchmarks/ 의 LocalOpenSearchClient 등). None 을 넘기면 해제.
+    """
+    global _client_override
+    _client_override = client
 
 
 def get_aws_auth():
-    """AWS IAM 자격증명으로 OpenSearch Serverless(aoss) 인증 객체 생성"""
+    """
+    AWS IAM 자격증명으로 OpenSearch Serverless(aoss) 인증 객체 생성.
+    refreshable_credentials 로 넘겨서 임시 자격증명(역할/SSO)이 만료돼도 자동 갱신.
+    """
+    import boto3
+    from requests_aws4auth import AWS4Auth
+
+    _, region = _opensearch_env()
     session = boto3.Session()
     credentials = session.get_credentials()
 
     return AWS4Auth(
-        credentials.access_key,
-        credentials.secret_key,
-        OPENSEARCH_REGION,
-        "aoss",  # Serverless OpenSearch 서비스 이름
-        session_token=credentials.token,
+        region=region,
+        service="aoss",  # Serverless OpenSearch 서비스 이름
+        refreshable_credentials=credentials,
     )
 
 
-def get_opensearch_client() -> OpenSearch:
-    """OpenSearch Serverless 클라이언트 생성"""
-    awsauth = get_aws_auth()
+@lru_cache()
+def _build_opensearch_client() -> OpenSearch:
+    """프로세스당 1개 (커넥션 풀 / TLS 세션 재사용)"""
+    from opensearchpy import OpenSearch, RequestsHttpConnection
 
-    client = OpenSearch(
-        hosts=[{"host": OPENSEARCH_HOST, "port": 443}],
-        http_auth=awsauth,
+    host, _ = _opensearch_env()
+    return OpenSearch(
+        hosts=[{"host": host, "port": 443}],
+        http_auth=get_aws_auth(),
         use_ssl=True,
         verify_certs=True,
         connection_class=RequestsHttpConnection,
+        # 같은 클라이언트를 bulk 적재(rag/bulk_ingester.py) / 인덱스 관리(rag/index_creator.py)도 쓰므로
+        # 기본값은 넉넉하게 두고, 검색은 호출마다 request_timeout=kNN 상한을 넘긴다 (llm/retriever.py)
+        timeout=settings.opensearch_timeout_sec,
+        max_retries=0,
+        retry_on_timeout=False,
+        pool_maxsize=int(os.getenv("OPENSEARCH_POOL_MAXSIZE", "32")),
     )
-    return client
+
+
+def get_opensearch_client() -> OpenSearch:
+    """OpenSearch Serverless 클라이언트 (프로세스 내 공유)"""
+    if _client_override is not None:
+        return _client_override
+    return _build_opensearch_client()
@@ -1,41 +1,230 @@
 ﻿from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
-
-from openai import OpenAI
+import json
+from dataclasses import dataclass, field
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 from .config import settings
-from .utils.preprocess import normalize_query, trim_history
+from .utils.preprocess import normalize_query
 from .utils.safety import check_safety
 from .utils.formatter import build_response_payload
 from .utils.user_profile import load_user_profile  # ✅ DB에서 프로필 로드
-from .retriever import retrieve_documents
+from .history import compact_history, estimate_tokens, history_tokens
+from .cascade import SELF_CHECK_INSTRUCTION, ModelChoice, choose_model, escalate, needs_escalation, record_choice
+from .session_store import SESSION_OPS, Session, SessionOwnershipError, get_session_store, session_history
+from .followup import FOLLOWUP_TOTAL, FOLLOWUPS, detect_followup, rerank_followup, retrieval_key
+from .retriever import embed_query, retrieve_documents
 from .reranker import rerank_documents
 from .prompts import build_system_prompt, build_messages  # ✅ 중요
-from .telemetry import log_info, build_debug_snapshot
+from .telemetry import (
+    log_info,
+    build_debug_snapshot,
+    collect_timings,
+    span,
+    add_timing,
+    observe_chat_request,
+    record_error,
+)
 from .embeddings import get_openai_client
+from .breaker import DEGRADED_RESPONSES, PROFILE_BREAKER
+from .deadline import deadline_scope, stage_timeout
+from .singleflight import SingleFlight
+from .usage import account_usage, check_token_budget, collect_usage, record_usage
 from .routers import route_query, RouteType
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 NON_MEDICAL_TAG = "[NON_MEDICAL]"
+BUDGET_REJECT_MESSAGE = "지금은 이용량이 많아 답변을 드리기 어려워요. 잠시 후 다시 시도해 주세요."
+# 문서 검색 장애(degraded)로 참고 문서 없이 답했을 때 답변 끝에 붙이는 안내
+DEGRADED_RAG_NOTICE = "※ 지금은 의약품·질병 문서 검색이 원활하지 않아 일반적인 정보로만 답변드렸어요."
+
+
+_llm_flight = SingleFlight("llm")
+
 
+def _call_llm(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """프롬프트(모델 + 메시지)가 바이트 단위로 같은 호출이 진행 중이면 그 답변을 같이 쓴다."""
+    model = model or settings.openai_model_chat
+    key = (model, max_tokens, json.dumps(messages, ensure_ascii=False, sort_keys=True))
+    return _llm_flight.do(key, lambda: _complete(messages, model, max_tokens), timeout=settings.llm_timeout_sec)
 
-def _call_llm(messages: List[Dict[str, str]]) -> str:
+
+def _complete(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: Optional[int],
+) -> str:
     client: OpenAI = get_openai_client()
+    kwargs: Dict[str, Any] = {"timeout": stage_timeout(settings.llm_timeout_sec, "llm")}
+    if max_tokens:
+        kwargs["max_tokens"] = max_tokens
     resp = client.chat.completions.create(
-        model=settings.openai_model_chat,
+        model=model,
         messages=messages,
+        **kwargs,
     )
+    record_usage("chat", model, getattr(resp, "usage", None))
     return resp.choices[0].message.content or ""
 
 
+def _stream_llm(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    chat.completions 스트리밍. 텍스트 조각을 순서대로 돌려준다.
+    usage 는 마지막 청크(stream_options.include_usage)에 실려 온다.
+    """
+    client: OpenAI = get_openai_client()
+    model = model or settings.openai_model_chat
+    kwargs: Dict[str, Any] = {"timeout": stage_timeout(settings.llm_timeout_sec, "llm")}
+    if max_tokens:
+        kwargs["max_tokens"] = max_tokens
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        **kwargs,
+    )
+    usage = None
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        for choice in getattr(chunk, "choices", None) or []:
+            text = getattr(choice.delta, "content", None)
+            if text:
+                yield text
+    record_usage("chat", model, usage)
+
+
+@dataclass
+class _Turn:
+    """LLM 호출 직전까지 준비된 요청 1건의 상태"""
+
+    user_id: Optional[str]
+    query: str
+    route: RouteType
+    budget: str
+    messages: List[Dict[str, str]]
+    raw_docs: List[Dict[str, Any]] = field(default_factory=list)
+    ranked_docs: List[Dict[str, Any]] = field(default_factory=list)
+    # 캐스케이드가 고른 모델 (llm/cascade.py)
+    model: Optional[ModelChoice] = None
+    # 장애로 건너뛴 스테이지 ("profile" / "retrieval" / "session")
+    degraded: List[str] = field(default_factory=list)
+    # 서버 측 세션 모드면 세션 id (답변 후 이번 턴을 세션에 추가)
+    session_id: Optional[str] = None
+    # 직전 검색 결과를 재사용한 후속 질문이면 감지 사유 (llm/followup.py)
+    followup: Optional[str] = None
+
+
+def _degrade(degraded: List[str], stage: str, err: Exception) -> None:
+    degraded.append(stage)
+    DEGRADED_RESPONSES.inc(stage=stage)
+    log_info("chat_stage_degraded", stage=stage, error=f"{type(err).__name__}: {err}")
+
+
+def _retrieve_or_reuse(
+    query: str,
+    key: Optional[str],
+) -> Tuple[List[Dict[str, Any]], Optional[List[float]], Optional[str]]:
+    """
+    반환: (검색 문서, 질문 임베딩 또는 None, 후속 질문 사유 또는 None)
+    후속 질문이면 검색하지 않고 직전 턴 문서를 그대로 돌려준다. (예외는 호출한 쪽에서 degraded 처리)
+    """
+    last = FOLLOWUPS.get(key) if key else None
+    reason = detect_followup(query, last)
+    vector: Optional[List[float]] = None
+    if reason is None and key and settings.followup_enabled and settings.followup_similarity > 0:
+        # 다음 턴 비교용으로 임베딩을 직접 구해서 검색에 넘긴다 (임베딩 호출 수는 그대로)
+        vector = embed_query(query)
+        reason = detect_followup(query, last, vector)
+    FOLLOWUP_TOTAL.inc(reason=reason or "none")
+    if reason is not None:
+        FOLLOWUPS.touch(key)
+        return [dict(d) for d in last.docs], None, reason
+    return retrieve_documents(query, top_k=settings.retriever_top_k, vector=vector), vector, None
+
+
+def _load_session(session_id: str, user_id: Optional[str], degraded: List[str]) -> Optional[Session]:
+    try:
+        session = get_session_store().get(session_id)
+        if session is not None and not session.owned_by(user_id):
+            # 다른 사용자의 session_id → 이력을 넣지 않는다 (저장은 store.append 가 거절)
+            SESSION_OPS.inc(op="get", result="forbidden")
+            log_info("session_owner_mismatch", session_id=session_id, user_id=user_id)
+            return None
+        SESSION_OPS.inc(op="get", result="ok" if session is not None else "miss")
+        return session
+    except Exception as e:
+        # 저장소 장애 → 이력 없이 진행
+        SESSION_OPS.inc(op="get", result="error")
+        record_error("session", e)
+        _degrade(degraded, "session", e)
+        return None
+
+
+def _save_turn(turn: _Turn, answer: str) -> None:
+    if turn.session_id is None:
+        return
+    try:
+        with span("session_save"):
+            get_session_store().append(
+                turn.session_id,
+                turn.user_id,
+                [{"role": "user", "content": turn.query}, {"role": "assistant", "content": answer}],
+            )
+        SESSION_OPS.inc(op="append", result="ok")
+    except SessionOwnershipError:
+        SESSION_OPS.inc(op="append", result="forbidden")
+    except Exception as e:
+        SESSION_OPS.inc(op="append", result="error")
+        record_error("session", e)
+
+
+def _answer_with_cascade(turn: _Turn) -> str:
+    """
+    fast 모델로 의료 질문에 답할 때는 확신이 낮으면 [LOW_CONFIDENCE] 를 붙이게 하고,
+    붙어 오면 strong 모델로 한 번 더 답한다. (비스트리밍 전용)
+    """
+    choice = turn.model
+    if not choice.self_check:
+        return _call_llm(turn.messages, model=choice.model, max_tokens=choice.max_tokens)
+
+    checked = turn.messages[:-1] + [{"role": "system", "content": SELF_CHECK_INSTRUCTION}, turn.messages[-1]]
+    answer = _call_llm(checked, model=choice.model, max_tokens=choice.max_tokens)
+    low_confidence, answer = needs_escalation(answer)
+    if not low_confidence or answer.startswith(NON_MEDICAL_TAG):
+        return answer
+
+    turn.model = escalate(choice, "low_confidence")
+    log_info("chat_model_escalated", user_id=turn.user_id, model=turn.model.model)
+    with span("llm_escalation", run_type="llm"):
+        answer = _call_llm(turn.messages, model=turn.model.model, max_tokens=turn.model.max_tokens)
+    # strong 모델이 이력을 따라 태그를 흉내 내도 사용자에게는 보이지 않게
+    return needs_escalation(answer)[1]
+
+
 def run_chat_rag(
     query: str,
     user_id: Optional[str] = None,
     history: Optional[List[Dict[str, str]]] = None,
     user_profile: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     메인 오케스트레이터.
+    스테이지별 소요시간은 debug["timings_ms"], 토큰 사용량은 debug["usage"] 로 내려간다.
+    전체 처리는 settings.request_timeout_sec 안에 끝나야 하며, 넘기면 DeadlineExceeded.
 
     1) 1차 라우터(route_query): LLM 호출 없이 코드로 분기
        - "non_medical"       → 완전 비의료 플로우 (RAG/출처 X, LLM 1번)
@@ -45,16 +234,115 @@ def run_chat_rag(
        - LLM이 답변 앞에 [NON_MEDICAL] 태그를 붙이면,
          최종적으로 비의료로 간주하고 문서/출처를 사용하지 않는다.
     """
+    with collect_timings(), collect_usage() as usage_calls, deadline_scope(settings.request_timeout_sec):
+        try:
+            turn, early = _prepare_turn(query, user_id, history, user_profile, session_id)
+            if early is not None:
+                return early
+            with span("llm", run_type="llm"):
+                answer_raw = _answer_with_cascade(turn)
+            return _finish_turn(turn, answer_raw, usage_calls)
+        except Exception as e:
+            record_error("chat", e)
+            raise
+
+
+def stream_chat_rag(
+    query: str,
+    user_id: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    user_profile: Optional[Dict[str, Any]] = None,
+    session_id: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    run_chat_rag 의 스트리밍 버전. 이벤트 dict 를 순서대로 돌려준다.
+    - {"event": "delta", "data": {"text": "..."}}  : 답변 조각 ([NON_MEDICAL] 태그는 제거된 상태)
+    - {"event": "done",  "data": payload}           : run_chat_rag 와 같은 최종 응답
+
+    ContextVar 로 타이밍/사용량을 모으므로 처음부터 끝까지 같은 스레드에서 순회해야 한다.
+    """
+    with collect_timings(), collect_usage() as usage_calls, deadline_scope(settings.request_timeout_sec):
+        try:
+            turn, early = _prepare_turn(query, user_id, history, user_profile, session_id)
+            if early is not None:
+                yield {"event": "done", "data": early}
+                return
+
+            # candidate_medical 은 답변 앞부분이 태그인지 판별될 때까지 버퍼링
+            pending = turn.route != "non_medical"
+            buffer = ""
+            parts: List[str] = []
+            start = perf_counter_ns()
+            first = True
+            with span("llm", run_type="llm"):
+                for text in _stream_llm(
+                    turn.messages, model=turn.model.model, max_tokens=turn.model.max_tokens
+                ):
+                    if first:
+                        add_timing("llm_first_token", perf_counter_ns() - start)
+                        first = False
+                    parts.append(text)
+                    if pending:
+                        buffer += text
+                        if len(buffer) < len(NON_MEDICAL_TAG) and NON_MEDICAL_TAG.startswith(buffer):
+                            continue
+                        pending = False
+                        text = buffer
+                        if buffer.startswith(NON_MEDICAL_TAG):
+                            text = buffer[len(NON_MEDICAL_TAG) :].lstrip()
+                        if not text:
+                            continue
+                    yield {"event": "delta", "data": {"text": text}}
+
+            answer_raw = "".join(parts)
+            if "retrieval" in turn.degraded and not answer_raw.startswith(NON_MEDICAL_TAG):
+                yield {"event": "delta", "data": {"text": f"\n\n{DEGRADED_RAG_NOTICE}"}}
+            yield {"event": "done", "data": _finish_turn(turn, answer_raw, usage_calls)}
+        except Exception as e:
+            record_error("chat", e)
+            raise
+
+
+def _prepare_turn(
+    query: str,
+    user_id: Optional[str],
+    history: Optional[List[Dict[str, str]]],
+    user_profile: Optional[Dict[str, Any]],
+    session_id: Optional[str] = None,
+) -> Tuple[Optional[_Turn], Optional[Dict[str, Any]]]:
+    """
+    LLM 호출 전 단계 (정규화 → 안전 → 예산 → 이력 → 프로필 → 라우팅 → 검색 → 프롬프트).
+    바로 응답해야 하는 경우 (빈 질문 / 예산 거절) 는 (None, payload) 를 돌려준다.
+    session_id 가 있고 history 가 None 이면 서버 측 세션 저장소의 이력을 쓴다.
+    """
+    use_session = bool(session_id) and history is None
     history = history or []
 
-    normalized_query = normalize_query(query)
-    trimmed_history = trim_history(history)
+    with span("normalize"):
+        normalized_query = normalize_query(query)
 
     if not normalized_query:
-        return build_response_payload("질문을 입력해 주세요.", [], debug={})
+        return None, build_response_payload("질문을 입력해 주세요.", [], debug={})
 
     # 0) 안전 필터
-    check_safety(normalized_query)
+    with span("safety"):
+        safety_action, _ = check_safety(normalized_query)
+
+    # 0.3) 토큰 예산 가드 (초과 시 거절 또는 저렴한 모델 + 짧은 답변)
+    budget = check_token_budget(user_id)
+    if budget == "reject":
+        log_info("chat_budget_rejected", user_id=user_id)
+        return None, build_response_payload(BUDGET_REJECT_MESSAGE, [], debug={"budget": budget})
+    degraded: List[str] = []
+
+    # 0.4) 대화 이력: 앞쪽 턴은 세션별 요약으로 접고(백그라운드), 최근 턴만 그대로
+    with span("history"):
+        if use_session:
+            session = _load_session(session_id, user_id, degraded)
+            history_summary, trimmed_history = session_history(session_id, session)
+        else:
+            history_summary, trimmed_history = compact_history(history, session_id=session_id, user_id=user_id)
+    turn_session_id = session_id if use_session else None
 
     # 0.5) 사용자 프로필 자동 로딩 (user_profile이 없고 user_id만 들어온 경우)
     if user_profile is None and user_id:
@@ -63,56 +351,126 @@ def run_chat_rag(
                 uid_for_db: int | str = int(user_id)
             except ValueError:
                 uid_for_db = user_id  # 문자열 ID도 허용
-            user_profile = load_user_profile(uid_for_db)
+            with span("profile_load"):
+                timeout = stage_timeout(settings.profile_timeout_sec, "profile_load")
+                user_profile = PROFILE_BREAKER.call(
+                    lambda: load_user_profile(uid_for_db, timeout_sec=timeout)
+                )
         except Exception as e:
+            # 프로필 없이 진행 (브레이커가 열려 있으면 DB 호출 없이 바로 여기로)
             log_info("user_profile_load_failed", user_id=user_id, error=str(e))
+            record_error("profile_load", e)
+            _degrade(degraded, "profile", e)
             user_profile = None
 
     # 1) 1차 라우터
-    route: RouteType = route_query(normalized_query)
+    with span("route"):
+        route: RouteType = route_query(normalized_query)
 
     # ---------- A. 완전 비의료 루트 (RAG/출처 X) ----------
     if route == "non_medical":
-        system_prompt = build_system_prompt(is_medical_mode=False)
+        with span("prompt_build"):
+            system_prompt = build_system_prompt(is_medical_mode=False)
+            messages = build_messages(
+                system_prompt=system_prompt,
+                query=normalized_query,
+                history=trimmed_history,
+                history_summary=history_summary,
+                documents=None,
+                # ✅ 비의료 모드에서도 이름/기초 정보는 활용
+                user_profile=user_profile,
+            )
+        turn = _Turn(
+            user_id, normalized_query, route, budget, messages,
+            model=choose_model(route, budget), degraded=degraded,
+            session_id=turn_session_id,
+        )
+        return turn, None
+
+    # ---------- B. 의료/애매 루트 (RAG + LLM) ----------
+    # 여기로 오는 건 "candidate_medical" 뿐
+    # embedding / knn span 은 retriever 안에서 기록
+    # 검색이 실패하거나 브레이커가 열려 있으면 문서 없이 답하는 degraded 모드
+    # 후속 질문("그럼 부작용은?")이면 검색 없이 직전 턴 문서를 다시 정렬해서 쓴다
+    followup_key = retrieval_key(session_id, user_id)
+    followup: Optional[str] = None
+    query_vector: Optional[List[float]] = None
+    try:
+        raw_docs, query_vector, followup = _retrieve_or_reuse(normalized_query, followup_key)
+    except Exception as e:
+        record_error("retrieval", e)
+        _degrade(degraded, "retrieval", e)
+        raw_docs = []
+    if followup is not None:
+        with span("followup_rerank"):
+            ranked_docs = rerank_followup(normalized_query, raw_docs)
+    else:
+        with span("rerank"):
+            ranked_docs = rerank_documents(normalized_query, raw_docs)
+        if followup_key and ranked_docs and settings.followup_enabled:
+            FOLLOWUPS.put(followup_key, normalized_query, query_vector, ranked_docs)
+
+    # 모델 캐스케이드: 검색 점수 / 안전 필터 / 이력 길이로 fast ↔ strong 결정
+    model = choose_model(
+        route,
+        budget,
+        documents=ranked_docs,
+        safety_action=safety_action,
+        history_tokens=history_tokens(trimmed_history) + estimate_tokens(history_summary or ""),
+    )
+
+    with span("prompt_build"):
+        system_prompt = build_system_prompt(is_medical_mode=True)
         messages = build_messages(
             system_prompt=system_prompt,
             query=normalized_query,
             history=trimmed_history,
-            documents=None,
-            # ✅ 비의료 모드에서도 이름/기초 정보는 활용
+            history_summary=history_summary,
+            documents=ranked_docs,
             user_profile=user_profile,
+            rag_unavailable="retrieval" in degraded,
         )
-        answer = _call_llm(messages)
+    turn = _Turn(
+        user_id, normalized_query, route, budget, messages, raw_docs, ranked_docs,
+        model=model, degraded=degraded,
+        session_id=turn_session_id, followup=followup,
+    )
+    return turn, None
+
 
+def _finish_turn(
+    turn: _Turn,
+    answer_raw: str,
+    usage_calls: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """LLM 답변 → 2차 판단 / 사용량 집계 / 로그·메트릭 / 응답 payload"""
+    user_id, route = turn.user_id, turn.route
+    record_choice(route, turn.model)
+
+    # ---------- A. 완전 비의료 루트 ----------
+    if route == "non_medical":
+        usage = account_usage(user_id, route, usage_calls)
         debug = build_debug_snapshot(
-            query=normalized_query,
+            query=turn.query,
             route="non_medical_router",
             router_result=route,
             is_medical_final=False,
             raw_docs=[],
             ranked_docs=[],
+            usage=usage,
+            budget=turn.budget,
+            degraded=turn.degraded,
+            model=turn.model.to_dict(),
         )
-        log_info("chat_completed", user_id=user_id, retrieved=0)
-        return build_response_payload(answer, [], debug=debug)
-
-    # ---------- B. 의료/애매 루트 (RAG + LLM) ----------
-    # 여기로 오는 건 "candidate_medical" 뿐
-    raw_docs = retrieve_documents(normalized_query, top_k=settings.retriever_top_k)
-    ranked_docs = rerank_documents(normalized_query, raw_docs)
-
-    system_prompt = build_system_prompt(is_medical_mode=True)
-    messages = build_messages(
-        system_prompt=system_prompt,
-        query=normalized_query,
-        history=trimmed_history,
-        documents=ranked_docs,
-        user_profile=user_profile,
-    )
-    answer_raw = _call_llm(messages)
+        log_info("chat_completed", user_id=user_id, retrieved=0, tokens=usage["total_tokens"])
+        observe_chat_request(route, is_medical_final=False)
+        _save_turn(turn, answer_raw)
+        return build_response_payload(answer_raw, [], debug=debug)
 
+    # ---------- B. 의료/애매 루트 ----------
     # 2차 판단: LLM이 [NON_MEDICAL] 태그로 비의료라고 선언했는지 확인
     is_medical_final = True
-    documents_for_answer: List[Dict[str, Any]] = ranked_docs
+    documents_for_answer: List[Dict[str, Any]] = turn.ranked_docs
 
     answer = answer_raw
     if answer_raw.startswith(NON_MEDICAL_TAG):
@@ -120,19 +478,30 @@ def run_chat_rag(
         # 태그 제거 + 앞 공백 제거
         answer = answer_raw[len(NON_MEDICAL_TAG) :].lstrip()
         documents_for_answer = []  # 최종 비의료 → RAG/출처 완전히 제거
+    elif "retrieval" in turn.degraded:
+        answer = f"{answer}\n\n{DEGRADED_RAG_NOTICE}"
 
+    usage = account_usage(user_id, route, usage_calls)
     debug = build_debug_snapshot(
-        query=normalized_query,
+        query=turn.query,
         route="candidate_medical",
         router_result=route,
         is_medical_final=is_medical_final,
-        raw_docs=raw_docs,
-        ranked_docs=ranked_docs,
+        raw_docs=turn.raw_docs,
+        ranked_docs=turn.ranked_docs,
+        usage=usage,
+        budget=turn.budget,
+        degraded=turn.degraded,
+        model=turn.model.to_dict(),
+        followup=turn.followup,
     )
     log_info(
         "chat_completed",
         user_id=user_id,
-        retrieved=len(ranked_docs) if is_medical_final else 0,
+        retrieved=len(turn.ranked_docs) if is_medical_final else 0,
+        tokens=usage["total_tokens"],
     )
+    observe_chat_request(route, is_medical_final=is_medical_final)
+    _save_turn(turn, answer)
 
     return build_response_payload(answer, documents_for_answer, debug=debug)
@@ -145,18 +145,29 @@ def build_messages(
     history: Optional[List[Dict[str, str]]] = None,
     documents: Optional[List[Dict[str, Any]]] = None,
     user_profile: Optional[Dict[str, Any]] = None,
+    rag_unavailable: bool = False,
+    history_summary: Optional[str] = None,
 ) -> List[Dict[str, str]]:
     """
     공통 messages 구성 함수.
     - history: [{"role": "...", "content": "..."}, ...] (Gradio와 동일 형식)
     - documents: 의료 모드에서만 전달. 비의료 모드면 None/[]. 
     - user_profile: PostgreSQL에서 불러온 사용자 건강 정보 dict
+    - rag_unavailable: 문서 검색이 장애로 빠진 degraded 모드 (참고 문서 없이 답한다는 안내 추가)
+    - history_summary: history 앞쪽(이미 잘려 나간 턴들)의 요약 (llm/history.py)
     """
     messages: List[Dict[str, str]] = [
         {"role": "system", "content": system_prompt},
     ]
 
-    # 1) 기존 히스토리 추가
+    # 1) 이전 대화 요약 + 최근 히스토리 추가
+    if history_summary:
+        messages.append(
+            {
+                "role": "system",
+                "content": f"다음은 이 사용자와 앞서 나눈 대화의 요약이다:\n\n{history_summary}",
+            }
+        )
     if history:
         messages.extend(history)
 
@@ -194,6 +205,18 @@ def build_messages(
             }
         )
 
+    if rag_unavailable:
+        messages.append(
+            {
+                "role": "system",
+                "content": (
+                    "지금은 참고 문서 검색을 사용할 수 없는 상태다. "
+                    "일반적인 건강 상식 수준에서만 설명하고, 구체적인 용량·상호작용·금기는 "
+                    "단정하지 말고 약사나 의사에게 확인하라고 안내해라."
+                ),
+            }
+        )
+
     # 4) 마지막에 사용자 질문
     messages.append({"role": "user", "content": query})
     return messages
@@ -0,0 +1,177 @@
+# ai_service/llm/query_rewrite.py
+"""
+멀티 쿼리 검색용 질문 재작성 (규칙 기반, LLM 호출 없음).
+
+구어체 질문("머리 아플 때 타이레놀 몇 알 먹어요?") 하나로만 kNN 을 돌리면
+문서 쪽 표현(두통, 용법·용량, acetaminophen)과 어긋나서 관련 문서를 놓치기 쉽다.
+원문 + 최대 3개의 재작성을 같이 검색하고 RRF 로 합친다. (llm/retriever.py)
+
+  1) clinical : 구어체 표현 → 임상 용어로 치환      "두통 때 타이레놀 용법·용량 먹어요?"
+  2) entities : 질문에서 뽑은 약·질환·증상 이름      "타이레놀 두통 용법·용량"
+  3) english  : 그 이름들의 영문 표기                "Tylenol acetaminophen headache dosage"
+
+재작성이 원문과 같거나 비면 빠진다. (최소 원문 1개)
+"""
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from .config import settings
+from .lexicon import get_lexicon
+
+# 구어체 표현 → 임상 용어 (긴 표현부터 치환)
+COLLOQUIAL_TO_CLINICAL: Tuple[Tuple[str, str], ...] = (
+    ("머리가 아프", "두통"),
+    ("머리 아프", "두통"),
+    ("머리아프", "두통"),
+    ("머리 아플", "두통"),
+    ("배가 아프", "복통"),
+    ("배 아프", "복통"),
+    ("배아프", "복통"),
+    ("배 아플", "복통"),
+    ("목이 아프", "인후통"),
+    ("목 아프", "인후통"),
+    ("목이 따끔", "인후통"),
+    ("열이 나", "발열"),
+    ("열나", "발열"),
+    ("속이 쓰리", "속쓰림 위산과다"),
+    ("속 쓰리", "속쓰림 위산과다"),
+    ("잠이 안 와", "불면증"),
+    ("잠이 안", "불면증"),
+    ("잠을 못", "불면증"),
+    ("어지러", "어지럼증"),
+    ("토할 것 같", "구역 구토"),
+    ("메스꺼", "구역 구토"),
+    ("울렁거", "구역 구토"),
+    ("콧물이 나", "비염 콧물"),
+    ("코가 막", "코막힘 비염"),
+    ("기침이 나", "기침"),
+    ("피곤", "피로"),
+    ("가려워", "가려움증"),
+    ("가렵", "가려움증"),
+    ("생리통", "월경통"),
+    ("혈압이 높", "고혈압"),
+    ("혈당이 높", "당뇨병 혈당"),
+    ("당 수치", "당뇨병 혈당"),
+    ("콜레스테롤이 높", "고지혈증"),
+    ("살 빼", "비만 체중 감량"),
+    ("살이 쪄", "비만 체중 감량"),
+    ("같이 먹어도", "병용 상호작용"),
+    ("같이 먹으면", "병용 상호작용"),
+    ("함께 먹어도", "병용 상호작용"),
+    ("같이 복용", "병용 상호작용"),
+    ("하루에 몇", "용법·용량"),
+    ("몇 알", "용법·용량"),
+    ("얼마나 먹", "용법·용량"),
+    ("먹으면 안 되", "금기 주의사항"),
+)
+
+# 약·질환·증상 이름 → 영문 표기 (성분명 / 질환명)
+TERM_ENGLISH = {
+    # 약
+    "타이레놀": "Tylenol acetaminophen",
+    "아세트아미노펜": "acetaminophen",
+    "아스피린": "aspirin",
+    "이부프로펜": "ibuprofen",
+    "부루펜": "Brufen ibuprofen",
+    "애드빌": "Advil ibuprofen",
+    "나프록센": "naproxen",
+    "덱시부프로펜": "dexibuprofen",
+    "판콜에이": "Pancol-A cold medicine",
+    "게보린": "Geborin",
+    "겔포스": "Gelfos aluminum phosphate",
+    "리바로": "Livalo pitavastatin",
+    "오메가3": "omega-3",
+    "비타민D": "vitamin D",
+    "메트포르민": "metformin",
+    "와파린": "warfarin",
+    "항히스타민제": "antihistamine",
+    "항생제": "antibiotic",
+    # 증상·질환
+    "두통": "headache",
+    "복통": "abdominal pain",
+    "인후통": "sore throat",
+    "발열": "fever",
+    "속쓰림": "heartburn",
+    "위산과다": "hyperacidity",
+    "불면증": "insomnia",
+    "어지럼증": "dizziness",
+    "구역": "nausea",
+    "구토": "vomiting",
+    "콧물": "rhinorrhea",
+    "코막힘": "nasal congestion",
+    "비염": "rhinitis",
+    "기침": "cough",
+    "피로": "fatigue",
+    "가려움증": "pruritus",
+    "월경통": "dysmenorrhea",
+    "고혈압": "hypertension",
+    "당뇨병": "diabetes mellitus",
+    "고지혈증": "hyperlipidemia",
+    "비만": "obesity",
+    "감기": "common cold",
+    "위염": "gastritis",
+    "역류성 식도염": "gastroesophageal reflux disease",
+    "천식": "asthma",
+    "알레르기": "allergy",
+    "두드러기": "urticaria",
+    "설사": "diarrhea",
+    "변비": "constipation",
+    # 섹션
+    "용법·용량": "dosage",
+    "상호작용": "drug interaction",
+    "부작용": "side effects",
+    "금기": "contraindication",
+}
+# TERM_ENGLISH 중 약·질환이 아니라 문서 섹션을 가리키는 말
+SECTION_TERMS = frozenset(("용법·용량", "상호작용", "부작용", "금기"))
+
+
+def to_clinical(query: str) -> str:
+    out = query
+    for colloquial, clinical in COLLOQUIAL_TO_CLINICAL:
+        if colloquial in out:
+            out = out.replace(colloquial, clinical)
+    return out
+
+
+def extract_entities(text: str) -> List[str]:
+    """
+    TERM_ENGLISH 에 있는 약·질환·증상 이름 + 코퍼스 사전(llm/lexicon.py)에서 찾은 이름을
+    나온 순서대로 (겹치면 긴 이름 우선)
+    """
+    found: List[Tuple[int, str]] = []
+    taken = [False] * len(text)
+    for term in sorted(TERM_ENGLISH, key=len, reverse=True):
+        start = text.find(term)
+        while start >= 0:
+            end = start + len(term)
+            if not any(taken[start:end]):
+                found.append((start, term))
+                for i in range(start, end):
+                    taken[i] = True
+                break
+            start = text.find(term, start + 1)
+    if settings.lexicon_mode != "off":
+        for ent in get_lexicon().detect(text):
+            if not any(taken[ent.start : ent.end]):
+                found.append((ent.start, ent.text))
+    return [term for _, term in sorted(found)]
+
+
+def rewrite_query(query: str, max_queries: int = 4) -> List[str]:
+    """[원문, clinical, entities, english] 중 원문과 다르고 겹치지 않는 것만 max_queries 개까지"""
+    clinical = to_clinical(query)
+    entities = extract_entities(clinical)
+    candidates = [
+        query,
+        clinical,
+        " ".join(entities),
+        " ".join(TERM_ENGLISH[e] for e in entities if e in TERM_ENGLISH),
+    ]
+    out: List[str] = []
+    for q in candidates:
+        q = q.strip()
+        if q and q not in out:
+            out.append(q)
+    return out[: max(1, max_queries)]
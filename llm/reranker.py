@@ -14,7 +14,10 @@ def rerank_documents(
     if not documents:
         return []
 
-    sorted_docs = sorted(documents, key=lambda d: d.get("score", 0.0), reverse=True)
+    # 멀티 쿼리 검색 결과는 RRF 순서(rrf_score)를 유지
+    sorted_docs = sorted(
+        documents, key=lambda d: (d.get("rrf_score", 0.0), d.get("score", 0.0)), reverse=True
+    )
     if top_k is not None:
         sorted_docs = sorted_docs[:top_k]
     return sorted_docs
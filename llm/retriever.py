@@ -1,43 +1,184 @@
 ﻿# ai_service/llm/retriever.py  (또는 utils/retriever.py 실제 위치 기준)
 
-from typing import List, Dict, Any
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from time import perf_counter
+from typing import List, Dict, Any, Optional, Tuple
 
+from .breaker import SEARCH_BREAKER
 from .config import settings
-from .embeddings import embed_text
+from .embeddings import embed_text, embed_texts
 from .opensearch_client import get_opensearch_client
+from .deadline import DeadlineExceeded, deadline_scope, stage_timeout
+from .hedging import hedged
+from .lexicon import Entity, boost_documents, detect_entities, knn_filter
+from .query_rewrite import rewrite_query
+from .singleflight import SingleFlight
+from .telemetry import REGISTRY, span
 
 
-def retrieve_documents(query: str, top_k: int | None = None) -> List[Dict[str, Any]]:
+# 청크 전용 필드 (parent 로 묶을 때 metadata 에서 제외)
+CHUNK_FIELDS = {"parent_id", "chunk_index", "chunk_count", "section"}
+
+_retrieve_flight = SingleFlight("retrieve")
+
+_fanout_executor: Optional[ThreadPoolExecutor] = None
+_fanout_lock = threading.Lock()
+
+MULTI_QUERY_SEARCHES = REGISTRY.counter(
+    "medinote_multi_query_searches_total",
+    "멀티 쿼리 kNN 검색 수 (late: 원문 검색 + 유예 시간 안에 안 끝나서 버림)",
+    ("result",),
+)
+
+
+def collapse_chunks(docs: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """
+    청크 단위 hit 들을 parent 문서 단위로 묶는다.
+    - score: 해당 parent 의 청크 중 최고 점수
+    - content: 매칭된 청크(passage)들만 원문 순서(chunk_index)대로 이어 붙임
+    - parent_id 가 없는 문서(청크 분할 전 인덱스)는 그대로 통과
     """
-    OpenSearch Serverless KNN 검색.
+    grouped: Dict[str, Dict[str, Any]] = {}
+    order: List[str] = []
+
+    for doc in docs:
+        meta = doc.get("metadata", {})
+        parent_id = meta.get("parent_id")
+        if not parent_id:
+            key = f"doc:{doc.get('id')}"
+            if key not in grouped:
+                grouped[key] = doc
+                order.append(key)
+            continue
+
+        passage = {
+            "chunk_index": meta.get("chunk_index", 0),
+            "section": meta.get("section"),
+            "score": doc.get("score", 0.0),
+            "content": doc.get("content", ""),
+        }
+        parent = grouped.get(parent_id)
+        if parent is None:
+            parent = dict(doc)
+            parent["id"] = parent_id
+            parent["metadata"] = {k: v for k, v in meta.items() if k not in CHUNK_FIELDS}
+            parent["passages"] = []
+            grouped[parent_id] = parent
+            order.append(parent_id)
+        parent["passages"].append(passage)
+        parent["score"] = max(parent.get("score", 0.0), passage["score"])
+
+    out: List[Dict[str, Any]] = []
+    for key in order:
+        doc = grouped[key]
+        passages = doc.get("passages")
+        if passages:
+            passages.sort(key=lambda p: p["chunk_index"])
+            doc["content"] = "\n...\n".join(p["content"] for p in passages)
+        out.append(doc)
+
+    out.sort(key=lambda d: d.get("score", 0.0), reverse=True)
+    return out[:top_k]
+
+
+def embed_query(query: str) -> List[float]:
+    with span("embedding", run_type="embedding"):
+        return embed_text(query)
+
+
+def retrieve_documents(
+    query: str,
+    top_k: int | None = None,
+    vector: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    OpenSearch Serverless KNN 검색. vector 를 넘기면(이미 임베딩한 경우) 임베딩을 건너뛴다.
     인덱스에는 다음 필드가 있다고 가정:
       - embedding: float[] (벡터)
       - content: str (본문)
       - title, doc_type, category_top, ... (메타데이터)
       - detail_url: str (출처 URL)
+      - parent_id, chunk_index, section (청크 인덱스인 경우)
     """
     if top_k is None:
         top_k = settings.retriever_top_k
 
-    vector = embed_text(query)
+    # 같은 (정규화된) 질문의 검색이 진행 중이면 결과 공유
+    key = (settings.opensearch_search_index, query, top_k)
+    return _retrieve_flight.do(
+        key,
+        lambda: _retrieve_documents(query, top_k, vector),
+        clone=lambda docs: [dict(d) for d in docs],
+        timeout=settings.embedding_timeout_sec + settings.knn_timeout_sec,
+    )
+
+
+def _retrieve_documents(query: str, top_k: int, vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    if settings.multi_query_enabled:
+        return _retrieve_multi(query, top_k, vector)
+
+    if vector is None:
+        vector = embed_query(query)
     if not vector:
         return []
 
+    # 청크 인덱스에서는 같은 parent 의 청크가 여러 개 걸리므로 넉넉히 가져온 뒤 묶는다
+    fetch_k = top_k * max(1, settings.retriever_chunk_overfetch)
+    entities, filt = _entity_plan(query)
+
     client = get_opensearch_client()
+    # 필터 검색 + 필터 없는 재검색을 합쳐서 kNN 상한 하나 안에 끝낸다
+    with span("knn", run_type="retriever"), deadline_scope(settings.knn_timeout_sec):
+        timeout = stage_timeout(settings.knn_timeout_sec, "knn")
+        docs = _search(client, vector, fetch_k, timeout, filt)
+        if filt is not None and not docs:
+            # 사전에는 있는데 인덱스에 그 이름의 문서가 없음 (keyword 서브필드 없는 옛 인덱스 포함)
+            docs = _search(client, vector, fetch_k, stage_timeout(settings.knn_timeout_sec, "knn"))
+
+    return collapse_chunks(_boost(docs, entities), top_k)
+
+
+def _entity_plan(query: str) -> Tuple[List[Entity], Optional[Dict[str, Any]]]:
+    """질문 속 약·질환 이름 → (엔티티, LEXICON_MODE=filter 면 kNN 필터)"""
+    entities = detect_entities(query)
+    if entities and settings.lexicon_mode == "filter":
+        return entities, knn_filter(entities)
+    return entities, None
+
+
+def _boost(docs: List[Dict[str, Any]], entities: List[Entity]) -> List[Dict[str, Any]]:
+    if settings.lexicon_mode != "boost":
+        return docs
+    return boost_documents(docs, entities, settings.lexicon_boost)
+
+
+def _search(
+    client: Any,
+    vector: List[float],
+    fetch_k: int,
+    timeout: Optional[float],
+    filt: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """kNN 검색 1번 → 청크 단위 문서 리스트. filt 가 있으면 efficient filter (후보 제한)"""
+    spec: Dict[str, Any] = {"vector": vector, "k": fetch_k}
+    if filt is not None:
+        spec["filter"] = filt
     body = {
-        "size": top_k,
-        "query": {
-            "knn": {
-                settings.opensearch_vector_field: {
-                    "vector": vector,
-                    "k": top_k,
-                }
-            }
-        },
+        "size": fetch_k,
+        "query": {"knn": {settings.opensearch_vector_field: spec}},
         "_source": True,
     }
-
-    resp = client.search(index=settings.opensearch_index, body=body)
+    resp = SEARCH_BREAKER.call(
+        lambda: hedged(
+            "knn",
+            lambda: client.search(
+                index=settings.opensearch_search_index, body=body, request_timeout=timeout
+            ),
+            timeout=timeout,
+        )
+    )
     docs: List[Dict[str, Any]] = []
 
     for hit in resp["hits"]["hits"]:
@@ -63,3 +204,105 @@ def retrieve_documents(query: str, top_k: int | None = None) -> List[Dict[str, A
         docs.append(doc)
 
     return docs
+
+
+# =========================
+#  멀티 쿼리 (재작성 → 동시 kNN → RRF)
+# =========================
+def _fanout_pool() -> ThreadPoolExecutor:
+    global _fanout_executor
+    with _fanout_lock:
+        if _fanout_executor is None:
+            _fanout_executor = ThreadPoolExecutor(
+                max_workers=max(4, settings.multi_query_max * 8), thread_name_prefix="multi-query"
+            )
+        return _fanout_executor
+
+
+def rrf_fuse(ranked_lists: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Reciprocal Rank Fusion: 문서 점수 = Σ 1 / (k + 순위).
+    같은 문서는 검색 점수가 가장 높은 쪽을 남기고 (score 는 cosine 기준 그대로) rrf_score 를 붙인다.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+    for docs in ranked_lists:
+        for rank, doc in enumerate(docs, start=1):
+            key = str(doc.get("id"))
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            best = fused.get(key)
+            if best is None or doc.get("score", 0.0) > best.get("score", 0.0):
+                fused[key] = doc
+
+    out: List[Dict[str, Any]] = []
+    for key in sorted(scores, key=lambda d: scores[d], reverse=True)[:top_k]:
+        doc = dict(fused[key])
+        doc["rrf_score"] = round(scores[key], 6)
+        out.append(doc)
+    return out
+
+
+def _gather(futures: List[Future], timeout: Optional[float]) -> List[List[Dict[str, Any]]]:
+    """
+    원문(futures[0]) 검색은 단일 검색과 같은 timeout 까지 기다리고,
+    재작성 검색은 그 뒤 MULTI_QUERY_GRACE_MS 까지만 기다린다. (늦은 건 버림)
+    """
+    start = perf_counter()
+    wait(futures[:1], timeout=timeout)
+    grace = settings.multi_query_grace_ms / 1000
+    if timeout is not None:
+        grace = min(grace, max(0.0, timeout - (perf_counter() - start)))
+    wait(futures[1:], timeout=grace)
+
+    results: List[List[Dict[str, Any]]] = []
+    errors: List[BaseException] = []
+    for f in futures:
+        if not f.done():
+            f.cancel()
+            MULTI_QUERY_SEARCHES.inc(result="late")
+            continue
+        exc = f.exception()
+        if exc is not None:
+            MULTI_QUERY_SEARCHES.inc(result="error")
+            errors.append(exc)
+            continue
+        MULTI_QUERY_SEARCHES.inc(result="ok")
+        results.append(f.result())
+    if not results:
+        raise errors[0] if errors else DeadlineExceeded("knn")
+    return results
+
+
+def _retrieve_multi(query: str, top_k: int, vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    queries = rewrite_query(query, settings.multi_query_max)
+    if len(queries) == 1:
+        with span("embedding", run_type="embedding"):
+            vectors = [vector if vector is not None else embed_text(query)]
+    else:
+        # 재작성 전부 임베딩 API 호출 1번으로 (원문 벡터가 이미 있으면 나머지만)
+        with span("embedding", run_type="embedding"):
+            if vector is None:
+                vectors = embed_texts(queries)
+            else:
+                vectors = [vector] + embed_texts(queries[1:])
+    if not vectors or not vectors[0]:
+        return []
+
+    fetch_k = top_k * max(1, settings.retriever_chunk_overfetch)
+    # 재작성 검색도 원문에서 찾은 약·질환 이름으로 같이 제한
+    entities, filt = _entity_plan(query)
+    client = get_opensearch_client()
+    with span("knn", run_type="retriever"), deadline_scope(settings.knn_timeout_sec):
+        timeout = stage_timeout(settings.knn_timeout_sec, "knn")
+        pool = _fanout_pool()
+        futures = [
+            pool.submit(contextvars.copy_context().run, _search, client, v, fetch_k, timeout, filt)
+            for v in vectors
+            if v
+        ]
+        results = _gather(futures, timeout)
+        if filt is not None and not any(results):
+            results = [_search(client, vectors[0], fetch_k, stage_timeout(settings.knn_timeout_sec, "knn"))]
+
+    ranked_lists = [collapse_chunks(_boost(docs, entities), fetch_k) for docs in results]
+    return rrf_fuse(ranked_lists, top_k, settings.multi_query_rrf_k)
@@ -0,0 +1,365 @@
+# ai_service/llm/session_store.py
+"""
+서버 측 대화 세션 저장소.
+
+클라이언트는 session_id + 새 질문만 보내고, 이력은 서버가 들고 있는다.
+세션에는 턴 목록과 턴별 토큰 수(캐시), 앞쪽 턴의 요약(llm/history.py)이 같이 저장되므로
+요청마다 전체 이력을 다시 세거나 직렬화하지 않는다.
+
+백엔드 (SESSION_STORE):
+  - memory : 프로세스 내 LRU (기본, 워커 1개 / 개발용)
+  - sqlite : 로컬 파일 (SESSION_SQLITE_PATH), 같은 호스트의 여러 워커가 공유
+  - redis  : Redis 호환 서버 (SESSION_REDIS_URL, redis 패키지 필요)
+
+    session = get_session_store().get(session_id)  # session.owned_by(user_id) 가 아니면 miss 로 취급
+    summary, recent = session_history(session_id, session)
+    ...
+    get_session_store().append(session_id, user_id, [user_msg, assistant_msg])
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .history import COMPACTOR, estimate_tokens
+from .telemetry import REGISTRY
+from .utils.preprocess import trim_history
+
+Message = Dict[str, str]
+
+SESSION_OPS = REGISTRY.counter(
+    "medinote_session_store_ops_total", "세션 저장소 호출 수", ("op", "result")
+)
+
+
+class SessionOwnershipError(PermissionError):
+    """다른 사용자의 세션에 쓰려고 할 때"""
+
+
+def _owner(user_id: Optional[str]) -> Optional[str]:
+    return str(user_id) if user_id not in (None, "") else None
+
+
+@dataclass
+class Session:
+    session_id: str
+    user_id: Optional[str] = None
+    turns: List[Message] = field(default_factory=list)
+    token_counts: List[int] = field(default_factory=list)  # turns 와 같은 길이
+    base: int = 0  # turns[0] 의 절대 턴 번호 (오래된 턴을 잘라낸 수)
+    summary: Optional[str] = None
+    summary_upto: int = 0  # 요약에 포함된 절대 턴 번호 (이 앞까지)
+    updated_at: float = 0.0
+
+    @property
+    def total_turns(self) -> int:
+        return self.base + len(self.turns)
+
+    def owned_by(self, user_id: Optional[str]) -> bool:
+        """세션을 만든 사용자와 같은지 (익명 세션은 익명 요청만)"""
+        return _owner(self.user_id) == _owner(user_id)
+
+    def append(self, messages: List[Message], max_turns: int) -> None:
+        for m in messages:
+            self.turns.append({"role": m["role"], "content": m["content"]})
+            # 메시지당 role / 구분자 오버헤드 ~4토큰 (history.history_tokens 와 같은 기준)
+            self.token_counts.append(estimate_tokens(m["content"]) + 4)
+        excess = len(self.turns) - max_turns
+        if excess > 0:
+            del self.turns[:excess]
+            del self.token_counts[:excess]
+            self.base += excess
+        self.updated_at = time.time()
+
+    def apply_summary(self, text: str, expected_upto: int, new_upto: int) -> None:
+        """요약 시작 시점 이후 다른 요약이 먼저 반영됐거나 세션이 초기화됐으면 버린다."""
+        if self.summary_upto == expected_upto and expected_upto < new_upto <= self.total_turns:
+            self.summary = text
+            self.summary_upto = new_upto
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self), ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, raw: str | bytes) -> "Session":
+        return cls(**json.loads(raw))
+
+
+class SessionStore:
+    """
+    get / update / delete 만 구현하면 된다. update 는 세션 단위로 원자적이어야 하고,
+    세션이 없으면 create=True 일 때만 새로 만든다. (없고 create=False 면 None)
+    """
+
+    def __init__(self, max_turns: int, ttl_sec: float):
+        self.max_turns = max_turns
+        self.ttl_sec = ttl_sec
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def update(
+        self,
+        session_id: str,
+        fn: Callable[[Session], None],
+        user_id: Optional[str] = None,
+        create: bool = True,
+    ) -> Optional[Session]:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def append(self, session_id: str, user_id: Optional[str], messages: List[Message]) -> Optional[Session]:
+        """세션 주인이 아니면 SessionOwnershipError (아무것도 쓰지 않음)"""
+
+        def _append(session: Session) -> None:
+            if not session.owned_by(user_id):
+                raise SessionOwnershipError(session_id)
+            session.append(messages, self.max_turns)
+
+        return self.update(session_id, _append, user_id)
+
+    def _expired(self, session: Session, now: float) -> bool:
+        return self.ttl_sec > 0 and now - session.updated_at > self.ttl_sec
+
+
+# =========================
+#  memory (LRU)
+# =========================
+class MemorySessionStore(SessionStore):
+    def __init__(self, max_sessions: int = 10000, max_turns: int = 200, ttl_sec: float = 86400):
+        super().__init__(max_turns, ttl_sec)
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, session_id: str, now: float) -> Optional[Session]:
+        session = self._data.get(session_id)
+        if session is None:
+            return None
+        if self._expired(session, now):
+            del self._data[session_id]
+            return None
+        self._data.move_to_end(session_id)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            session = self._load(session_id, time.time())
+            if session is None:
+                return None
+            # 호출하는 쪽이 락 밖에서 읽으므로 리스트는 복사 (max_turns 로 크기 제한)
+            return replace(session, turns=list(session.turns), token_counts=list(session.token_counts))
+
+    def update(
+        self,
+        session_id: str,
+        fn: Callable[[Session], None],
+        user_id: Optional[str] = None,
+        create: bool = True,
+    ) -> Optional[Session]:
+        with self._lock:
+            session = self._load(session_id, time.time())
+            if session is None:
+                if not create:
+                    return None
+                session = self._data[session_id] = Session(session_id, user_id)
+                while len(self._data) > self.max_sessions:
+                    self._data.popitem(last=False)
+            fn(session)
+            return session
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# =========================
+#  sqlite (로컬 파일)
+# =========================
+class SqliteSessionStore(SessionStore):
+    PRUNE_EVERY = 200  # 쓰기 N번마다 만료 세션 정리
+
+    def __init__(self, path: str, max_turns: int = 200, ttl_sec: float = 86400):
+        super().__init__(max_turns, ttl_sec)
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_session ("
+                " session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite 연결은 스레드 간 공유하지 않는다 (스레드별 1개)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, session_id: str) -> Optional[Session]:
+        row = self._conn().execute(
+            "SELECT data FROM chat_session WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        session = Session.from_json(row[0])
+        return None if self._expired(session, time.time()) else session
+
+    def update(
+        self,
+        session_id: str,
+        fn: Callable[[Session], None],
+        user_id: Optional[str] = None,
+        create: bool = True,
+    ) -> Optional[Session]:
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")  # 워커 간 read-modify-write 직렬화
+        try:
+            row = conn.execute(
+                "SELECT data FROM chat_session WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            session = Session.from_json(row[0]) if row is not None else None
+            if session is None or self._expired(session, now):
+                if not create:
+                    conn.execute("ROLLBACK")
+                    return None
+                session = Session(session_id, user_id)
+            fn(session)
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_session (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, session.to_json(), session.updated_at or now),
+            )
+            self._writes += 1
+            if self.ttl_sec > 0 and self._writes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM chat_session WHERE updated_at < ?", (now - self.ttl_sec,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return session
+
+    def delete(self, session_id: str) -> None:
+        self._conn().execute("DELETE FROM chat_session WHERE session_id = ?", (session_id,))
+
+
+# =========================
+#  redis 호환
+# =========================
+class RedisSessionStore(SessionStore):
+    KEY_PREFIX = "medinote:session:"
+
+    def __init__(self, url: str, max_turns: int = 200, ttl_sec: float = 86400):
+        super().__init__(max_turns, ttl_sec)
+        import redis  # 선택 의존성: SESSION_STORE=redis 일 때만
+
+        self._redis = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def _key(self, session_id: str) -> str:
+        return self.KEY_PREFIX + session_id
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raw = self._redis.get(self._key(session_id))
+        return Session.from_json(raw) if raw is not None else None
+
+    def update(
+        self,
+        session_id: str,
+        fn: Callable[[Session], None],
+        user_id: Optional[str] = None,
+        create: bool = True,
+    ) -> Optional[Session]:
+        key = self._key(session_id)
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)  # 다른 워커가 먼저 쓰면 WatchError → 다시 읽고 재시도
+                    raw = pipe.get(key)
+                    if raw is None and not create:
+                        pipe.unwatch()
+                        return None
+                    session = Session.from_json(raw) if raw is not None else Session(session_id, user_id)
+                    fn(session)
+                    pipe.multi()
+                    if self.ttl_sec > 0:
+                        pipe.set(key, session.to_json(), ex=int(self.ttl_sec))
+                    else:
+                        pipe.set(key, session.to_json())
+                    pipe.execute()
+                    return session
+                except self._watch_error:
+                    continue
+
+    def delete(self, session_id: str) -> None:
+        self._redis.delete(self._key(session_id))
+
+
+def build_session_store(kind: Optional[str] = None) -> SessionStore:
+    kind = (kind or settings.session_store).lower()
+    if kind == "sqlite":
+        return SqliteSessionStore(settings.session_sqlite_path, settings.session_max_turns, settings.session_ttl_sec)
+    if kind == "redis":
+        return RedisSessionStore(settings.session_redis_url, settings.session_max_turns, settings.session_ttl_sec)
+    if kind != "memory":
+        raise ValueError(f"unknown SESSION_STORE: {kind}")
+    return MemorySessionStore(settings.session_max_sessions, settings.session_max_turns, settings.session_ttl_sec)
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """프로세스 내 공유 저장소 (처음 쓸 때 생성)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = build_session_store()
+    return _store
+
+
+def set_session_store(store: Optional[SessionStore]) -> None:
+    """테스트에서 저장소 교체. None 이면 다음 호출 때 설정값으로 다시 생성."""
+    global _store
+    _store = store
+
+
+def session_history(session_id: str, session: Optional[Session]) -> Tuple[Optional[str], List[Message]]:
+    """
+    세션의 (요약, 최근 이력) 뷰. 토큰 수는 세션에 캐시된 값을 쓰고,
+    요약 안 된 턴이 trigger 를 넘으면 백그라운드 요약을 걸어 결과를 세션에 반영한다.
+    """
+    if session is None or not session.turns:
+        return None, []
+
+    start = max(session.summary_upto, session.base)
+    tail = session.turns[start - session.base :]
+    total = session.total_turns
+    if COMPACTOR.should_fold(start, total, sum(session.token_counts[start - session.base :])):
+        upto = total - COMPACTOR.keep_recent
+        folding = session.turns[start - session.base : upto - session.base]
+        expected = session.summary_upto
+        COMPACTOR.submit(
+            f"session:{session_id}",
+            session.summary,
+            folding,
+            lambda text: get_session_store().update(
+                session_id, lambda s: s.apply_summary(text, expected, upto), create=False
+            ),
+        )
+    return session.summary, trim_history(tail)
@@ -0,0 +1,85 @@
+# ai_service/llm/singleflight.py
+"""
+single-flight: 같은 키로 동시에 들어온 호출은 하나만 실제로 실행하고 나머지는 그 결과를 기다린다.
+(뉴스에 약 이름이 나와서 같은 질문이 한꺼번에 몰릴 때 OpenAI / OpenSearch 부하를 평평하게)
+
+    _flight = SingleFlight("embedding")
+    vector = _flight.do((model, text), lambda: _embed(text))
+
+- 완료된 결과는 캐시하지 않는다. (진행 중인 호출끼리만 공유)
+- 리더가 예외를 던지면 기다리던 호출도 같은 예외를 받는다.
+- 리더의 span / 토큰 사용량은 리더 요청에만 기록되고, 팔로워는 "<name>_wait" span 만 남는다.
+- 팔로워는 자기 요청의 데드라인(llm/deadline.py)과 timeout 중 짧은 만큼만 기다리고,
+  넘으면 DeadlineExceeded. (리더 호출은 계속 진행)
+"""
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Dict, Hashable, Optional, TypeVar
+
+from .config import settings
+from .deadline import DeadlineExceeded, stage_timeout
+from .telemetry import REGISTRY, span
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter(
+    "medinote_singleflight_total",
+    "single-flight 호출 수 (leader: 실제 실행, shared: 진행 중 결과 공유, timeout: 기다리다 시간 초과)",
+    ("group", "result"),
+)
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "Future[object]"] = {}
+
+    def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], T],
+        clone: Optional[Callable[[T], T]] = None,
+        timeout: Optional[float] = None,
+    ) -> T:
+        """
+        clone: 팔로워에게 돌려줄 때 적용 (리스트/딕트 결과를 요청끼리 공유하지 않도록)
+        timeout: 팔로워 대기 상한 (스테이지 타임아웃). 현재 데드라인의 남은 시간이 더 짧으면 그 값
+        """
+        if not settings.singleflight_enabled:
+            return fn()
+
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(group=self.name, result="shared")
+            stage = f"{self.name}_wait"
+            with span(stage):
+                try:
+                    result = fut.result(timeout=stage_timeout(timeout, stage))
+                except FutureTimeout:
+                    SINGLEFLIGHT_CALLS.inc(group=self.name, result="timeout")
+                    raise DeadlineExceeded(stage) from None
+            return clone(result) if clone is not None else result  # type: ignore[return-value]
+
+        SINGLEFLIGHT_CALLS.inc(group=self.name, result="leader")
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
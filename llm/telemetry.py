@@ -1,54 +1,163 @@
 ﻿# ai_service/llm/utils/telemetry.py
 
+import atexit
+import bisect
+import functools
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
 from contextlib import contextmanager
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
 
 # =========================================
 #  기본 Python 로거 설정
 # =========================================
+# LOG_FORMAT=text|json, LOG_LEVEL=INFO, LOG_QUEUE_SIZE=10000 (0 이면 동기 StreamHandler)
+#
+# 요청 스레드에서는 LogRecord 를 bounded queue 에 넣기만 하고,
+# 포맷/직렬화/쓰기는 QueueListener 스레드가 한다. 큐가 가득 차면 기다리지 않고 버린다.
 LOGGER_NAME = "ai_service.llm"
+TEXT_LOG_FORMAT = "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s"
 logger = logging.getLogger(LOGGER_NAME)
 
-if not logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "[%(asctime)s] [%(levelname)s] %(name)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+_log_listener: Optional[logging.handlers.QueueListener] = None
+_log_dropped = 0
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    한 줄 JSON 로그. log_info(event, **fields) 로 남긴 레코드는
+    {"ts", "level", "logger", "event", ...fields} 형태로 평탄화한다.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+        }
+        event = getattr(record, "event", None)
+        if event is not None:
+            payload["event"] = event
+            payload.update(getattr(record, "fields", None) or {})
+        else:
+            payload["message"] = record.getMessage()
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    - enqueue: put_nowait, 가득 차면 버리고 드롭 카운터 증가 (요청 스레드가 블록되지 않음)
+    - prepare: 기본 QueueHandler 는 여기서 메시지를 포맷하지만,
+      같은 프로세스 안의 리스너로만 넘기므로 레코드를 그대로 넘겨 포맷을 리스너 스레드로 미룬다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        global _log_dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _log_dropped += 1
+            LOG_DROPPED.inc()
+
+
+def configure_logging(
+    fmt: Optional[str] = None,
+    level: Optional[str] = None,
+    queue_size: Optional[int] = None,
+) -> None:
+    """
+    ai_service.llm 로거 핸들러를 (재)구성한다. 인자가 없으면 LOG_* 환경변수 사용.
+    """
+    global _log_listener
+
+    fmt = (fmt or os.getenv("LOG_FORMAT", "text")).lower()
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    if queue_size is None:
+        queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+    shutdown_logging()
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
 
-# 기본 로그 레벨 (필요하면 .env에서 조정)
-logger.setLevel(logging.INFO)
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_LOG_FORMAT))
+
+    if queue_size > 0:
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        logger.addHandler(_DroppingQueueHandler(log_queue))
+        _log_listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+        _log_listener.start()
+        # 루트 로거에 동기 핸들러가 붙어 있어도 요청 스레드에서 쓰지 않도록
+        logger.propagate = False
+    else:
+        logger.addHandler(stream)
+        logger.propagate = True
+
+    logger.setLevel(getattr(logging, level, logging.INFO))
+
+
+def shutdown_logging() -> None:
+    """리스너 스레드를 멈추고 큐에 남은 로그를 모두 쓴다. (graceful shutdown / atexit)"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def dropped_log_count() -> int:
+    return _log_dropped
+
+
+if not logger.handlers:
+    configure_logging()
+    atexit.register(shutdown_logging)
 
 # =========================================
 #  LangSmith 설정 (옵션)
 # =========================================
-try:
-    # langsmith 가 설치되어 있을 때만 사용
-    from langsmith import Client
-    from langsmith.run_helpers import trace as ls_trace  # context manager
-    from langsmith.run_trees import configure as ls_configure
-except Exception:  # ImportError 등
-    Client = None
-    ls_trace = None
-    ls_configure = None
+# 환경변수(.env 포함) 확인 + SDK import + Client 생성은 첫 span / trace_context 에서 1번.
+# (langsmith 는 import 가 무겁고 Client 는 네트워크 설정까지 만든다.
+#  .env 는 config.load_env() 로 그때 읽으므로 import 시점에 환경변수를 보면 안 된다)
+ls_trace: Optional[Callable[..., Any]] = None
+_langsmith_lock = threading.Lock()
+_langsmith_ready = False
 
 
-def _init_langsmith() -> bool:
+def _langsmith_requested() -> bool:
     """
-    LANGSMITH_* 환경변수를 기반으로 LangSmith 트레이싱 초기화.
+    LANGSMITH_* 환경변수만으로 트레이싱을 켤지 판단.
     - LANGSMITH_API_KEY 가 없으면 비활성화
     - LANGSMITH_TRACING 이 'true'/'1' 일 때만 실제 전송
     """
-    if Client is None or ls_configure is None:
-        logger.info("LangSmith SDK not installed. Tracing disabled.")
+    if not os.getenv("LANGSMITH_API_KEY"):
+        logger.info("LANGSMITH_API_KEY not set. Tracing disabled.")
         return False
+    return os.getenv("LANGSMITH_TRACING", "").lower() in {"1", "true", "yes", "y"}
 
-    api_key = os.getenv("LANGSMITH_API_KEY")
-    if not api_key:
-        logger.info("LANGSMITH_API_KEY not set. Tracing disabled.")
+
+def _init_langsmith() -> bool:
+    """
+    LangSmith SDK 를 import 하고 전역 설정. 성공하면 ls_trace 를 채운다.
+    """
+    global ls_trace
+    try:
+        # langsmith 가 설치되어 있을 때만 사용
+        from langsmith import Client
+        from langsmith.run_helpers import trace  # context manager
+        from langsmith.run_trees import configure as ls_configure
+    except Exception:  # ImportError 등
+        logger.info("LangSmith SDK not installed. Tracing disabled.")
         return False
 
     endpoint = os.getenv("LANGSMITH_ENDPOINT")  # 선택
@@ -57,8 +166,6 @@ def _init_langsmith() -> bool:
         or os.getenv("LANGCHAIN_PROJECT")
         or "medinote"
     )
-    enabled_env = os.getenv("LANGSMITH_TRACING", "").lower()
-    enabled = enabled_env in {"1", "true", "yes", "y"}
 
     client_kwargs: Dict[str, Any] = {}
     if endpoint:
@@ -69,21 +176,35 @@ def _init_langsmith() -> bool:
     # 전역 설정  :contentReference[oaicite:0]{index=0}
     ls_configure(
         client=client,
-        enabled=enabled,
+        enabled=True,
         project_name=project,
         tags=["medinote", os.getenv("APP_ENV", "local")],
         metadata={},
     )
 
-    logger.info(
-        "LangSmith tracing initialized (enabled=%s, project=%s)",
-        enabled,
-        project,
-    )
-    return enabled
+    logger.info("LangSmith tracing initialized (project=%s)", project)
+    ls_trace = trace
+    return True
+
+
+def _langsmith_trace() -> Optional[Callable[..., Any]]:
+    """트레이싱이 켜져 있으면 ls_trace (처음 호출 때 .env 를 읽고 판단·초기화), 아니면 None"""
+    global LANGSMITH_ENABLED, _langsmith_ready
+    if LANGSMITH_ENABLED is False:
+        return None
+    if not _langsmith_ready:
+        with _langsmith_lock:
+            if not _langsmith_ready:
+                from .config import load_env
 
+                load_env()
+                LANGSMITH_ENABLED = _langsmith_requested() and _init_langsmith()
+                _langsmith_ready = True
+    return ls_trace if LANGSMITH_ENABLED else None
 
-LANGSMITH_ENABLED: bool = _init_langsmith()
+
+# None = 아직 판단 전 (첫 _langsmith_trace() 호출에서 True / False 로 정해짐)
+LANGSMITH_ENABLED: Optional[bool] = None
 
 # =========================================
 #  공통 로깅 헬퍼
@@ -91,20 +212,422 @@ LANGSMITH_ENABLED: bool = _init_langsmith()
 
 
 def log_debug(event: str, **kwargs: Any) -> None:
-    logger.debug("%s | %s", event, kwargs)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s | %s", event, kwargs, extra={"event": event, "fields": kwargs})
 
 
 def log_info(event: str, **kwargs: Any) -> None:
-    logger.info("%s | %s", event, kwargs)
+    # 레벨 체크는 캐시되어 있어 싸다. 포맷/직렬화는 리스너 스레드에서.
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("%s | %s", event, kwargs, extra={"event": event, "fields": kwargs})
 
 
 def build_debug_snapshot(**kwargs: Any) -> Dict[str, Any]:
     """
     orchestrator 에서 응답에 같이 내려줄 디버그 정보 스냅샷.
+    collect_timings() 안에서 호출되면 스테이지별 소요시간(timings_ms)도 같이 넣는다.
     """
+    if "timings_ms" not in kwargs:
+        timings = _current_timings.get()
+        if timings is not None:
+            kwargs["timings_ms"] = timings.as_ms()
     return kwargs
 
 
+# =========================================
+#  스테이지 타이밍 span
+# =========================================
+
+class _Timings:
+    """요청 1건의 span 이름 → 누적 ns"""
+
+    __slots__ = ("start_ns", "spans")
+
+    def __init__(self) -> None:
+        self.start_ns = perf_counter_ns()
+        self.spans: Dict[str, int] = {}
+
+    def add(self, name: str, elapsed_ns: int) -> None:
+        self.spans[name] = self.spans.get(name, 0) + elapsed_ns
+
+    def as_ms(self) -> Dict[str, float]:
+        out = {k: round(v / 1e6, 3) for k, v in self.spans.items()}
+        out["total"] = round((perf_counter_ns() - self.start_ns) / 1e6, 3)
+        return out
+
+
+_current_timings: ContextVar[Optional[_Timings]] = ContextVar("medinote_timings", default=None)
+
+
+@contextmanager
+def collect_timings() -> Iterator[_Timings]:
+    """
+    이 블록 안에서 열린 span 들의 소요시간을 모은다. (요청 단위로 한 번)
+
+        with collect_timings():
+            ...
+            debug = build_debug_snapshot(...)   # timings_ms 자동 포함
+    """
+    timings = _Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+class span:
+    """
+    스테이지 소요시간 측정.
+
+        with span("embedding"):
+            vector = embed_text(query)
+
+    - collect_timings() 밖이고 LangSmith 도 꺼져 있으면 ContextVar 조회 1번만 하고 끝
+    - LangSmith 활성화 시 같은 이름의 child run 으로도 기록
+    """
+
+    __slots__ = ("name", "run_type", "_timings", "_start", "_ls_cm")
+
+    def __init__(self, name: str, run_type: str = "chain"):
+        self.name = name
+        self.run_type = run_type
+
+    def __enter__(self) -> "span":
+        self._timings = _current_timings.get()
+        self._ls_cm = None
+        trace = _langsmith_trace() if LANGSMITH_ENABLED is not False else None
+        if trace is not None:
+            self._ls_cm = trace(name=self.name, run_type=self.run_type)
+            self._ls_cm.__enter__()
+        self._start = perf_counter_ns() if self._timings is not None else 0
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._timings is not None:
+            self._timings.add(self.name, perf_counter_ns() - self._start)
+        if self._ls_cm is not None:
+            self._ls_cm.__exit__(exc_type, exc, tb)
+
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def timed(name: str, run_type: str = "chain") -> Callable[[F], F]:
+    """span 의 데코레이터 버전: @timed("rerank")"""
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name, run_type):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def add_timing(name: str, elapsed_ns: int) -> None:
+    """span 으로 감싸기 어려운 구간(예: 스트리밍 첫 토큰까지)을 직접 기록"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(name, elapsed_ns)
+
+
+# =========================================
+#  인-프로세스 메트릭 (Prometheus text format)
+# =========================================
+# 쓰기 경로에 락이 없도록, 메트릭마다 스레드별 shard 에 기록하고
+# scrape(render) 할 때만 shard 들을 합친다. 락은 shard 등록/scrape 시에만 잡음.
+
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape_label(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshot(self) -> List[Dict[LabelValues, Any]]:
+        with self._lock:
+            shards = list(self._shards)
+        # list(dict.items()) 는 GIL 안에서 한 번에 복사됨
+        return [dict(list(s.items())) for s in shards]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._label_values(labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = self._label_values(labels)
+        return sum(s.get(key, 0.0) for s in self._snapshot())
+
+    def render(self) -> List[str]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for key, v in shard.items():
+                totals[key] = totals.get(key, 0.0) + v
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in sorted(totals.items())
+        ]
+
+
+class Histogram(_Metric):
+    """
+    고정 버킷 히스토그램. shard 값: [버킷별 count..., +Inf count, sum]
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._label_values(labels)
+        row = shard.get(key)
+        if row is None:
+            row = shard[key] = [0.0] * (len(self.buckets) + 2)
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def _merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot():
+            for key, row in shard.items():
+                acc = merged.setdefault(key, [0.0] * len(row))
+                for i, v in enumerate(list(row)):
+                    acc[i] += v
+        return merged
+
+    def count(self, **labels: Any) -> float:
+        row = self._merged().get(self._label_values(labels))
+        return sum(row[:-1]) if row else 0.0
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        for key, row in sorted(self._merged().items()):
+            cumulative = 0.0
+            for bound, c in zip(list(self.buckets) + [float("inf")], row[:-1]):
+                cumulative += c
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(row[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """현재값 메트릭 (큐 길이 등). 값이 하나라 shard 없이 락 하나로 처리."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._label_values(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._label_values(labels), 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}"
+            for key, v in sorted(list(self._values.items()))
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls: type, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS_MS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.type_name}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CHAT_REQUESTS = REGISTRY.counter(
+    "medinote_chat_requests_total", "채팅 요청 수", ("route", "is_medical_final")
+)
+CHAT_LATENCY = REGISTRY.histogram(
+    "medinote_chat_request_latency_ms", "채팅 요청 전체 지연시간(ms)", ("route", "is_medical_final")
+)
+STAGE_LATENCY = REGISTRY.histogram(
+    "medinote_stage_latency_ms", "스테이지별 지연시간(ms)", ("stage", "route")
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "medinote_cache_requests_total", "캐시 조회 수 (result=hit/miss)", ("cache", "result")
+)
+TOKENS = REGISTRY.counter(
+    "medinote_tokens_total", "LLM/임베딩 토큰 사용량", ("kind", "model", "route")
+)
+ERRORS = REGISTRY.counter(
+    "medinote_errors_total", "스테이지별 오류 수", ("stage", "error")
+)
+LOG_DROPPED = REGISTRY.counter(
+    "medinote_log_dropped_total", "로그 큐가 가득 차서 버린 로그 레코드 수"
+)
+
+
+def observe_chat_request(route: str, is_medical_final: bool) -> None:
+    """
+    요청 1건이 끝날 때 호출: 전체/스테이지 지연시간과 요청 수를 기록.
+    스테이지 값은 collect_timings() 로 모은 span 을 그대로 사용.
+    """
+    medical = "true" if is_medical_final else "false"
+    CHAT_REQUESTS.inc(route=route, is_medical_final=medical)
+
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    for stage, elapsed_ns in list(timings.spans.items()):
+        STAGE_LATENCY.observe(elapsed_ns / 1e6, stage=stage, route=route)
+    CHAT_LATENCY.observe(
+        (perf_counter_ns() - timings.start_ns) / 1e6, route=route, is_medical_final=medical
+    )
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_error(stage: str, error: BaseException | str) -> None:
+    name = error if isinstance(error, str) else type(error).__name__
+    ERRORS.inc(stage=stage, error=name)
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0") -> Any:
+    """
+    /metrics 만 응답하는 작은 HTTP 서버를 데몬 스레드로 띄운다.
+    (Gradio 처럼 라우트를 직접 붙이기 어려운 서빙 프로세스용)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((addr, port), _Handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info("Prometheus metrics server started on %s:%s/metrics", addr, port)
+    return server
+
+
 # =========================================
 #  LangSmith trace context
 # =========================================
@@ -131,8 +654,9 @@ def trace_context(
                 result = run_chat_flow(query=query, ...)
                 return result
     """
-    if LANGSMITH_ENABLED and ls_trace is not None:
-        with ls_trace(
+    trace = _langsmith_trace()
+    if trace is not None:
+        with trace(
             name=name,
             run_type=run_type,
             inputs=inputs,
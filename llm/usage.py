@@ -0,0 +1,232 @@
+# ai_service/llm/usage.py
+"""
+토큰 사용량 집계 + 예산 가드.
+
+- record_usage(): chat / embedding 호출마다 resp.usage 를 현재 요청 수집기에 기록
+- UsageLedger: user_id / route 별 최근 N초 롤링 윈도우 합계
+- check_token_budget(): 사용자별 / 전체 예산을 넘으면 "downgrade" 또는 "reject"
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Literal, Optional, Tuple
+
+from .config import settings
+from .telemetry import REGISTRY, TOKENS
+
+BudgetDecision = Literal["allow", "downgrade", "reject"]
+
+BUDGET_DECISIONS = REGISTRY.counter(
+    "medinote_token_budget_decisions_total", "토큰 예산 가드 판정 수", ("decision",)
+)
+
+_current_usage: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar(
+    "medinote_usage", default=None
+)
+
+
+def _tokens_from(usage: Any) -> Dict[str, int]:
+    """openai 응답의 usage 객체 → dict (없는 필드는 0)"""
+    if usage is None:
+        return {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "total_tokens": 0}
+
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+    total = getattr(usage, "total_tokens", 0) or prompt + completion
+    return {
+        "prompt_tokens": int(prompt),
+        "completion_tokens": int(completion),
+        "cached_tokens": int(cached),
+        "total_tokens": int(total),
+    }
+
+
+@contextmanager
+def collect_usage() -> Iterator[List[Dict[str, Any]]]:
+    """이 블록 안의 chat / embedding 호출 사용량을 모은다. (요청 단위)"""
+    calls: List[Dict[str, Any]] = []
+    token = _current_usage.set(calls)
+    try:
+        yield calls
+    finally:
+        _current_usage.reset(token)
+
+
+def record_usage(kind: str, model: str, usage: Any) -> Dict[str, Any]:
+    """
+    kind: "chat" / "embedding"
+    요청 수집기 밖에서 호출되면(스크립트 등) 메트릭만 기록.
+    """
+    entry: Dict[str, Any] = {"kind": kind, "model": model, **_tokens_from(usage)}
+    calls = _current_usage.get()
+    if calls is not None:
+        calls.append(entry)
+    else:
+        TOKENS.inc(entry["total_tokens"], kind=kind, model=model, route="")
+    return entry
+
+
+def summarize_usage(calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "cached_tokens": 0,
+        "total_tokens": 0,
+    }
+    for c in calls:
+        for k in summary:
+            summary[k] += c.get(k, 0)
+    summary["calls"] = list(calls)
+    return summary
+
+
+# =========================
+#  롤링 윈도우 집계
+# =========================
+class _Window:
+    __slots__ = ("events", "total")
+
+    def __init__(self) -> None:
+        self.events: Deque[Tuple[float, int]] = deque()
+        self.total = 0
+
+    def add(self, ts: float, tokens: int) -> None:
+        self.events.append((ts, tokens))
+        self.total += tokens
+
+    def prune(self, cutoff: float) -> int:
+        events = self.events
+        while events and events[0][0] < cutoff:
+            self.total -= events.popleft()[1]
+        return self.total
+
+
+class UsageLedger:
+    """
+    최근 window_sec 동안의 토큰 합계를 user_id / route / (user_id, route) / 전체 기준으로 유지.
+    """
+
+    def __init__(self, window_sec: float):
+        self.window_sec = window_sec
+        self._windows: Dict[Tuple[str, ...], _Window] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _sweep(self, now: float) -> None:
+        """모든 키의 만료 이벤트 제거 + 빈 키 삭제 (lock 안에서 호출)"""
+        cutoff = now - self.window_sec
+        for key, window in list(self._windows.items()):
+            window.prune(cutoff)
+            if not window.events:
+                del self._windows[key]
+        self._last_sweep = now
+
+    def add(self, user_id: Optional[str], route: str, tokens: int, now: Optional[float] = None) -> None:
+        """
+        예산을 안 쓰는 기본 설정에서는 total() 이 불리지 않으므로 여기서 정리한다:
+        건드린 키는 매번 prune, 다시 오지 않는 사용자 키는 window_sec 마다 전체 sweep 으로 삭제.
+        """
+        if tokens <= 0:
+            return
+        now = time.time() if now is None else now
+        uid = str(user_id or "anonymous")
+        keys = [("global",), ("user", uid), ("route", route), ("user_route", uid, route)]
+        cutoff = now - self.window_sec
+        with self._lock:
+            if now - self._last_sweep >= self.window_sec:
+                self._sweep(now)
+            for key in keys:
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = _Window()
+                window.prune(cutoff)
+                window.add(now, tokens)
+
+    def total(
+        self,
+        user_id: Optional[str] = None,
+        route: Optional[str] = None,
+        now: Optional[float] = None,
+    ) -> int:
+        if user_id is not None and route is not None:
+            key: Tuple[str, ...] = ("user_route", str(user_id), route)
+        elif user_id is not None:
+            key = ("user", str(user_id))
+        elif route is not None:
+            key = ("route", route)
+        else:
+            key = ("global",)
+
+        now = time.time() if now is None else now
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return 0
+            total = window.prune(now - self.window_sec)
+            if not window.events:
+                del self._windows[key]
+            return total
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """{"global": n, "by_user": {...}, "by_route": {...}, "by_user_route": {"uid|route": n}}"""
+        now = time.time() if now is None else now
+        out: Dict[str, Any] = {"global": 0, "by_user": {}, "by_route": {}, "by_user_route": {}}
+        with self._lock:
+            self._sweep(now)
+            for key, window in self._windows.items():
+                total = window.total
+                if key[0] == "global":
+                    out["global"] = total
+                elif key[0] == "user":
+                    out["by_user"][key[1]] = total
+                elif key[0] == "route":
+                    out["by_route"][key[1]] = total
+                else:
+                    out["by_user_route"][f"{key[1]}|{key[2]}"] = total
+        return out
+
+
+LEDGER = UsageLedger(settings.token_budget_window_sec)
+
+
+def account_usage(user_id: Optional[str], route: str, calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    요청이 끝날 때 호출: 메트릭 + 롤링 집계에 반영하고 debug 용 요약을 돌려준다.
+    """
+    for c in calls:
+        TOKENS.inc(c["prompt_tokens"], kind=f"{c['kind']}_prompt", model=c["model"], route=route)
+        if c["completion_tokens"]:
+            TOKENS.inc(c["completion_tokens"], kind=f"{c['kind']}_completion", model=c["model"], route=route)
+        if c["cached_tokens"]:
+            TOKENS.inc(c["cached_tokens"], kind=f"{c['kind']}_cached", model=c["model"], route=route)
+
+    summary = summarize_usage(calls)
+    LEDGER.add(user_id, route, summary["total_tokens"])
+    return summary
+
+
+def check_token_budget(user_id: Optional[str]) -> BudgetDecision:
+    """
+    사용자별 / 전체 예산(최근 token_budget_window_sec 초) 확인.
+    예산이 0 이면 제한 없음.
+    """
+    over = False
+    if settings.token_budget_per_user > 0 and user_id:
+        over = LEDGER.total(user_id=str(user_id)) >= settings.token_budget_per_user
+    if not over and settings.token_budget_global > 0:
+        over = LEDGER.total() >= settings.token_budget_global
+
+    decision: BudgetDecision = "allow"
+    if over:
+        decision = "reject" if settings.token_budget_action == "reject" else "downgrade"
+    BUDGET_DECISIONS.inc(decision=decision)
+    return decision
@@ -1,34 +1,78 @@
 ﻿# ai_service/llm/utils/formatter.py
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
 
+from ..config import settings
 
-def format_citations(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+DEBUG_LEVELS = ("off", "ids", "full")
+# debug 에서 문서 리스트로 취급하는 키
+DEBUG_DOC_KEYS = ("raw_docs", "ranked_docs")
+
+
+def _parse_fields(fields: Optional[Sequence[str] | str]) -> List[str]:
+    if fields is None:
+        fields = settings.citation_fields
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return [f.strip() for f in fields if f.strip()]
+
+
+def format_citations(
+    documents: List[Dict[str, Any]],
+    fields: Optional[Sequence[str] | str] = None,
+) -> List[Dict[str, Any]]:
     """
     프론트/메인 API에 내려줄 수 있는 citation 형식으로 축약.
     detail_url 도 포함.
+    fields: 내려줄 필드 화이트리스트 (기본: settings.citation_fields)
     """
+    wanted = _parse_fields(fields)
     citations = []
     for idx, doc in enumerate(documents, start=1):
-        citations.append(
-            {
-                "rank": idx,
-                "id": doc.get("id"),
-                "title": doc.get("title"),
-                "doc_type": doc.get("doc_type"),
-                "score": doc.get("score"),
-                "detail_url": doc.get("detail_url")  # 🔥 추가됨
-                or doc.get("metadata", {}).get("detail_url"),
-                "metadata": doc.get("metadata", {}),
-            }
-        )
+        full = {
+            "rank": idx,
+            "id": doc.get("id"),
+            "title": doc.get("title"),
+            "doc_type": doc.get("doc_type"),
+            "score": doc.get("score"),
+            "detail_url": doc.get("detail_url")  # 🔥 추가됨
+            or doc.get("metadata", {}).get("detail_url"),
+            "metadata": doc.get("metadata", {}),
+        }
+        citations.append({k: full[k] for k in wanted if k in full})
     return citations
 
 
+def shape_debug(debug: Dict[str, Any] | None, level: Optional[str] = None) -> Dict[str, Any]:
+    """
+    debug 를 응답 레벨에 맞게 줄인다.
+    - off  : {}
+    - ids  : 문서 리스트(raw_docs / ranked_docs)는 id·score 만, 나머지 값은 그대로
+    - full : 그대로
+    """
+    level = (level or settings.response_debug_level).lower()
+    if not debug or level == "off":
+        return {}
+    if level == "full":
+        return debug
+
+    shaped = dict(debug)
+    for key in DEBUG_DOC_KEYS:
+        docs = shaped.get(key)
+        if isinstance(docs, list):
+            shaped[key] = [{"id": d.get("id"), "score": d.get("score")} for d in docs]
+    return shaped
+
+
 def build_response_payload(
     answer: str,
     documents: List[Dict[str, Any]],
     debug: Dict[str, Any] | None = None,
+    debug_level: Optional[str] = None,
+    citation_fields: Optional[Sequence[str] | str] = None,
 ) -> Dict[str, Any]:
+    """
+    debug_level / citation_fields 를 안 주면 settings.response_debug_level / citation_fields 사용.
+    """
 
     # 🔥 top-1(가장 관련도 높은 문서) 출처 URL
     top_url = None
@@ -46,6 +90,6 @@ def build_response_payload(
     return {
         "answer": final_answer,
         "source_url": top_url,     # 🔥 추가됨 (프론트가 따로 쓸 수 있음)
-        "citations": format_citations(documents),
-        "debug": debug or {},
+        "citations": format_citations(documents, citation_fields),
+        "debug": shape_debug(debug, debug_level),
     }
@@ -1,27 +1,35 @@
 # ai_service/llm/utils/user_profile.py
 from __future__ import annotations
 
+import math
 import os
-from typing import Any, Dict, List
-
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from typing import Any, Dict, List, Optional
 
 from ..config import settings  # 이미 있는 config 재사용
 
 
-def get_db_conn():
+def get_db_conn(timeout_sec: Optional[float] = None):
+    """
+    timeout_sec: 연결 타임아웃 + 쿼리(statement) 타임아웃. None 이면 서버/드라이버 기본값.
+    """
+    import psycopg2  # DB 를 쓰는 요청에서만 로드
+
+    kwargs: Dict[str, Any] = {}
+    if timeout_sec:
+        kwargs["connect_timeout"] = max(1, math.ceil(timeout_sec))
+        kwargs["options"] = f"-c statement_timeout={int(timeout_sec * 1000)}"
     conn = psycopg2.connect(
         host=os.getenv("DB_HOST", "localhost"),
         port=int(os.getenv("DB_PORT", "5432")),
         dbname=os.getenv("DB_NAME", "medinote"),
         user=os.getenv("DB_USER", "postgres"),
         password=os.getenv("DB_PASSWORD", ""),
+        **kwargs,
     )
     return conn
 
 
-def load_user_profile(user_id: int) -> Dict[str, Any]:
+def load_user_profile(user_id: int, timeout_sec: Optional[float] = None) -> Dict[str, Any]:
     """
     user_id 기준으로:
       - app_user (기본 정보)
@@ -29,7 +37,9 @@ def load_user_profile(user_id: int) -> Dict[str, Any]:
       - user_allergy (알레르기)
     를 한 번에 읽어와 dict로 반환.
     """
-    conn = get_db_conn()
+    from psycopg2.extras import RealDictCursor
+
+    conn = get_db_conn(timeout_sec)
     try:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             # 1) 기본 정보
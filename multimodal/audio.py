@@ -0,0 +1,257 @@
+# ai_service/multimodal/audio.py
+"""
+STT 전처리용 오디오 유틸 (PCM 디코딩 / 정규화 / 인코딩 / 무음 구간 분할).
+
+- WAV 는 표준 라이브러리(wave)로 바로 읽는다.
+- 그 외 형식(m4a / mp3 / webm ...)은 pydub + ffmpeg 가 있을 때만 디코딩 (없으면 AudioDecodeError)
+- 업로드 전 정규화: 모노 → 16kHz → 앞뒤 무음 제거 → (ffmpeg 가 있으면) opus 로 압축, 없으면 16bit WAV
+  44.1kHz 스테레오 WAV 기준 WAV 로도 ~1/5, opus 면 ~1/50 크기
+"""
+from __future__ import annotations
+
+import io
+import shutil
+import wave
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+FRAME_MS = 20  # 에너지(무음) 판단 프레임 길이
+# 무음 기준은 silence_db 와 (클립 최대 음량 - SILENCE_REL_DB) 중 낮은 쪽
+# → 작게 녹음된 음성(-45 dBFS 등)이 통째로 무음으로 잘리지 않게
+SILENCE_REL_DB = 30.0
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+@dataclass
+class PcmAudio:
+    samples: np.ndarray  # int16, (n,) 모노 또는 (n, channels)
+    sample_rate: int
+
+    @property
+    def channels(self) -> int:
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate if self.sample_rate else 0.0
+
+    def slice(self, start_sec: float, end_sec: float) -> "PcmAudio":
+        a = max(0, int(round(start_sec * self.sample_rate)))
+        b = min(len(self.samples), int(round(end_sec * self.sample_rate)))
+        return PcmAudio(self.samples[a:b], self.sample_rate)
+
+    def mono(self) -> np.ndarray:
+        """float32 모노 (-1 ~ 1)"""
+        x = self.samples.astype(np.float32) / 32768.0
+        return x if x.ndim == 1 else x.mean(axis=1)
+
+
+def _decode_wav(data: bytes) -> PcmAudio:
+    with wave.open(io.BytesIO(data), "rb") as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 2:
+        samples = np.frombuffer(raw, dtype="<i2")
+    elif width == 1:  # 8bit 는 unsigned
+        samples = ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8).astype(np.int16)
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = (b[:, 2].astype(np.int8).astype(np.int16) << 8) | b[:, 1].astype(np.int16)
+    elif width == 4:
+        samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise AudioDecodeError(f"지원하지 않는 WAV 샘플 폭: {width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels)
+    return PcmAudio(samples.astype(np.int16, copy=False), rate)
+
+
+def _decode_with_pydub(data: bytes, filename: str) -> PcmAudio:
+    try:
+        from pydub import AudioSegment  # 선택 의존성 (ffmpeg 필요)
+    except ImportError as e:
+        raise AudioDecodeError("WAV 외 형식은 pydub + ffmpeg 가 필요합니다.") from e
+    fmt = filename.rsplit(".", 1)[-1].lower() if "." in filename else None
+    try:
+        seg = AudioSegment.from_file(io.BytesIO(data), format=fmt).set_sample_width(2)
+    except Exception as e:
+        raise AudioDecodeError(f"오디오 디코딩 실패: {e}") from e
+    samples = np.array(seg.get_array_of_samples(), dtype=np.int16)
+    if seg.channels > 1:
+        samples = samples.reshape(-1, seg.channels)
+    return PcmAudio(samples, seg.frame_rate)
+
+
+def decode_audio(data: bytes, filename: str = "audio.wav") -> PcmAudio:
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _decode_wav(data)
+        except (wave.Error, EOFError) as e:
+            raise AudioDecodeError(f"WAV 디코딩 실패: {e}") from e
+    return _decode_with_pydub(data, filename)
+
+
+def encode_wav(audio: PcmAudio) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(audio.channels)
+        w.setsampwidth(2)
+        w.setframerate(audio.sample_rate)
+        w.writeframes(np.ascontiguousarray(audio.samples, dtype="<i2").tobytes())
+    return buf.getvalue()
+
+
+def frame_db(audio: PcmAudio, frame_ms: int = FRAME_MS) -> np.ndarray:
+    """프레임별 RMS (dBFS). 무음은 -100 근처"""
+    x = audio.mono()
+    size = max(1, audio.sample_rate * frame_ms // 1000)
+    n = len(x) // size
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    rms = np.sqrt(np.mean(x[: n * size].reshape(n, size) ** 2, axis=1))
+    return 20 * np.log10(np.maximum(rms, 1e-5))
+
+
+def silence_threshold(db: np.ndarray, silence_db: float, relative_db: float = SILENCE_REL_DB) -> float:
+    """클립 기준 무음 dBFS: 절대 기준(silence_db)과 최대 프레임보다 relative_db 낮은 값 중 낮은 쪽"""
+    if db.size == 0:
+        return silence_db
+    return min(silence_db, float(db.max()) - relative_db)
+
+
+def _quietest(db: np.ndarray, lo: float, hi: float, silence_db: float, frame_ms: int) -> Optional[float]:
+    """[lo, hi) 초 구간에서 가장 조용한 프레임의 중앙 시각. 무음 기준보다 크면 None"""
+    a, b = int(lo * 1000 // frame_ms), int(hi * 1000 // frame_ms)
+    window = db[max(0, a) : max(0, b)]
+    if window.size == 0:
+        return None
+    # 무음이 여러 프레임 이어지면 끝 쪽(경계에 가까운 쪽)을 고른다
+    i = int(window.size - 1 - np.argmin(window[::-1]))
+    if window[i] > silence_db:
+        return None
+    return (a + i + 0.5) * frame_ms / 1000
+
+
+def plan_chunks(
+    audio: PcmAudio,
+    chunk_sec: float,
+    overlap_sec: float,
+    search_sec: float = 0.0,
+    silence_db: float = -40.0,
+) -> List[Tuple[float, float, bool]]:
+    """
+    [(시작, 끝, 앞 청크와 겹치는지)] 목록 (초).
+    경계 직전 search_sec 안에 무음 프레임이 있으면 거기서 자르고 (겹침 없음, False),
+    없으면 chunk_sec 위치에서 자르고 다음 청크를 overlap_sec 만큼 앞에서 시작한다. (True)
+    """
+    duration = audio.duration
+    if chunk_sec <= 0 or duration <= chunk_sec:
+        return [(0.0, duration, False)]
+    db = frame_db(audio) if search_sec > 0 else None
+    if db is not None:
+        silence_db = silence_threshold(db, silence_db)
+    overlap_sec = min(overlap_sec, chunk_sec / 2)
+
+    chunks: List[Tuple[float, float, bool]] = []
+    start, overlapped = 0.0, False
+    while True:
+        target = start + chunk_sec
+        if target >= duration:
+            chunks.append((start, duration, overlapped))
+            return chunks
+        cut = None
+        if db is not None:
+            cut = _quietest(db, max(start + chunk_sec / 2, target - search_sec), target, silence_db, FRAME_MS)
+        if cut is not None:
+            chunks.append((start, cut, overlapped))
+            start, overlapped = cut, False
+        else:
+            chunks.append((start, target, overlapped))
+            start, overlapped = target - overlap_sec, overlap_sec > 0
+
+
+# =========================
+#  업로드 전 정규화
+# =========================
+def _to_int16(x: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(x * 32768.0), -32768, 32767).astype(np.int16)
+
+
+def to_mono(audio: PcmAudio) -> PcmAudio:
+    if audio.channels == 1:
+        return audio
+    return PcmAudio(_to_int16(audio.mono()), audio.sample_rate)
+
+
+def resample(audio: PcmAudio, rate: int, taps: int = 63) -> PcmAudio:
+    """모노 입력 기준. 다운샘플이면 windowed-sinc 저역통과(앨리어싱 방지) 후 선형 보간"""
+    if audio.sample_rate == rate or len(audio.samples) == 0:
+        return audio
+    x = audio.mono()
+    ratio = rate / audio.sample_rate
+    if ratio < 1:
+        cutoff = 0.5 * ratio * 0.9  # 새 나이퀴스트의 90% (원래 샘플레이트 기준 cycles/sample)
+        n = np.arange(taps) - (taps - 1) / 2
+        h = np.sinc(2 * cutoff * n) * np.hamming(taps)
+        x = np.convolve(x, (h / h.sum()).astype(np.float32), mode="same")
+    n_out = int(round(len(x) * ratio))
+    y = np.interp(np.arange(n_out) / ratio, np.arange(len(x)), x)
+    return PcmAudio(_to_int16(y), rate)
+
+
+def trim_silence(audio: PcmAudio, silence_db: float = -40.0, pad_sec: float = 0.2) -> PcmAudio:
+    """
+    앞뒤 무음 제거 (pad_sec 만큼 여유). 무음 기준은 클립 음량에 맞춘다. (silence_threshold)
+    음성 프레임을 하나도 못 찾으면 자르지 않고 그대로 돌려준다. (판단은 STT 에 맡김)
+    """
+    db = frame_db(audio)
+    voiced = np.flatnonzero(db > silence_threshold(db, silence_db))
+    if voiced.size == 0:
+        return audio
+    start = voiced[0] * FRAME_MS / 1000 - pad_sec
+    end = (voiced[-1] + 1) * FRAME_MS / 1000 + pad_sec
+    return audio.slice(max(0.0, start), min(audio.duration, end))
+
+
+def normalize_for_stt(
+    audio: PcmAudio,
+    sample_rate: int = 16000,
+    silence_db: float = -40.0,
+    pad_sec: float = 0.2,
+) -> PcmAudio:
+    """모노 → sample_rate → 앞뒤 무음 제거"""
+    return trim_silence(resample(to_mono(audio), sample_rate), silence_db, pad_sec)
+
+
+@lru_cache()
+def _ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def encode_compact(audio: PcmAudio, fmt: str = "ogg", bitrate: str = "24k") -> Tuple[bytes, str]:
+    """
+    (인코딩된 바이트, 확장자). fmt="ogg" 는 opus 코덱.
+    ffmpeg / pydub 가 없거나 인코딩에 실패하면 16bit WAV.
+    """
+    if fmt != "wav" and _ffmpeg_available():
+        try:
+            from pydub import AudioSegment
+
+            seg = AudioSegment(
+                data=np.ascontiguousarray(audio.samples, dtype="<i2").tobytes(),
+                sample_width=2,
+                frame_rate=audio.sample_rate,
+                channels=audio.channels,
+            )
+            buf = io.BytesIO()
+            seg.export(buf, format=fmt, codec="libopus" if fmt == "ogg" else None, bitrate=bitrate)
+            return buf.getvalue(), fmt
+        except Exception:
+            pass
+    return encode_wav(audio), "wav"
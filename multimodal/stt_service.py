@@ -1,29 +1,252 @@
 ﻿# ai_service/llm/multimodal/stt_service.py
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional
 
-from openai import OpenAI
+from llm.embeddings import get_openai_client  # 같은 클라이언트 재사용
+from llm.telemetry import REGISTRY, log_info
 
-from ..config import settings
-from ..embeddings import get_openai_client  # 같은 클라이언트 재사용
+if TYPE_CHECKING:
+    from openai import OpenAI
 
+    from .audio import PcmAudio
 
-def transcribe_audio_bytes(
+# env.example 의 STT_MODEL 사용 (없으면 gpt-4o-transcribe)
+STT_MODEL = os.getenv("STT_MODEL", "gpt-4o-transcribe")
+
+# 긴 음성: 이 길이(초)를 넘으면 청크로 나눠서 동시에 전사 (0 이면 항상 한 번에 업로드)
+STT_LONG_AUDIO_SEC = float(os.getenv("STT_LONG_AUDIO_SEC", "60"))
+STT_CHUNK_SEC = float(os.getenv("STT_CHUNK_SEC", "30"))
+# 무음에서 못 자를 때 청크끼리 겹치는 길이 (경계에서 잘린 단어 보존, 겹친 부분은 이어 붙일 때 제거)
+STT_CHUNK_OVERLAP_SEC = float(os.getenv("STT_CHUNK_OVERLAP_SEC", "1.5"))
+# 청크 경계 직전 몇 초 안에서 무음을 찾을지 / 무음 기준 (dBFS, 조용한 녹음은 클립 음량 기준으로 낮춤)
+STT_SILENCE_SEARCH_SEC = float(os.getenv("STT_SILENCE_SEARCH_SEC", "3"))
+STT_SILENCE_DB = float(os.getenv("STT_SILENCE_DB", "-40"))
+STT_MAX_PARALLEL = int(os.getenv("STT_MAX_PARALLEL", "4"))
+# 겹친 구간 중복 제거 시 비교할 최대 / 최소 단어 수 (1단어 일치는 "네 네" 같은 실제 반복일 수 있어 제거 안 함)
+STT_OVERLAP_MAX_WORDS = int(os.getenv("STT_OVERLAP_MAX_WORDS", "20"))
+STT_OVERLAP_MIN_WORDS = int(os.getenv("STT_OVERLAP_MIN_WORDS", "2"))
+
+# 업로드 전 정규화: 모노 / STT_SAMPLE_RATE 로 변환, 앞뒤 무음 제거 후 STT_UPLOAD_FORMAT 으로 인코딩
+STT_NORMALIZE = os.getenv("STT_NORMALIZE", "true").lower() in {"1", "true", "yes"}
+STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", "16000"))
+STT_TRIM_PAD_SEC = float(os.getenv("STT_TRIM_PAD_SEC", "0.2"))
+STT_UPLOAD_FORMAT = os.getenv("STT_UPLOAD_FORMAT", "ogg")  # ogg(opus, ffmpeg 필요) / wav
+# 같은 파일(내용 해시) 재업로드 시 전사 결과 재사용 (0 이면 캐시 안 함)
+STT_CACHE_SIZE = int(os.getenv("STT_CACHE_SIZE", "256"))
+
+_WORD_NORMALIZE = re.compile(r"[^\w]+")
+
+STT_CACHE = REGISTRY.counter("medinote_stt_cache_total", "STT 전사 캐시 조회 결과", ("result",))
+
+
+class TranscriptCache:
+    """입력 바이트 해시 → 전사 결과 (LRU)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(audio_bytes: bytes, language: Optional[str]) -> str:
+        h = hashlib.sha256(audio_bytes)
+        h.update(f"\x00{STT_MODEL}\x00{language or ''}".encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            text = self._data.get(key)
+            if text is not None:
+                self._data.move_to_end(key)
+        STT_CACHE.inc(result="hit" if text is not None else "miss")
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = text
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+TRANSCRIPTS = TranscriptCache(STT_CACHE_SIZE)
+
+
+def _transcribe_once(
     audio_bytes: bytes,
     filename: str = "audio.wav",
     language: Optional[str] = "ko",
 ) -> str:
-    """
-    OpenAI Whisper 기반 STT.
-    - 프론트/메인 API에서 업로드 받은 파일 바이트를 넘겨주면 됨.
-    """
     client: OpenAI = get_openai_client()
     file_obj = BytesIO(audio_bytes)
     file_obj.name = filename  # openai 라이브러리가 확장자로 형식 추론할 수 있게
 
     resp = client.audio.transcriptions.create(
-        model="gpt-4o-transcribe",  # 또는 "whisper-1" 등, 실제 사용할 모델명으로 변경
+        model=STT_MODEL,
         file=file_obj,
         language=language,
     )
     return resp.text
+
+
+def transcribe_audio_bytes(
+    audio_bytes: bytes,
+    filename: str = "audio.wav",
+    language: Optional[str] = "ko",
+) -> str:
+    """
+    OpenAI Whisper 기반 STT.
+    - 프론트/메인 API에서 업로드 받은 파일 바이트를 넘겨주면 됨.
+    - 업로드 전에 모노 16kHz 로 줄이고 앞뒤 무음을 자른 뒤 압축한다. (STT_NORMALIZE)
+    - STT_LONG_AUDIO_SEC 보다 긴 음성은 청크로 나눠 동시에 전사한 뒤 이어 붙인다.
+    - 같은 파일을 다시 올리면 캐시된 결과를 돌려준다.
+    """
+    key = TranscriptCache.key(audio_bytes, language)
+    cached = TRANSCRIPTS.get(key)
+    if cached is not None:
+        return cached
+    text = " ".join(p for p in _iter_pieces(audio_bytes, filename, language) if p)
+    if text:  # 빈 결과는 캐시하지 않는다 (일시적인 실패/오판을 고정하지 않게)
+        TRANSCRIPTS.put(key, text)
+    return text
+
+
+def iter_transcribe_audio(
+    audio_bytes: bytes,
+    filename: str = "audio.wav",
+    language: Optional[str] = "ko",
+) -> Iterator[str]:
+    """
+    부분 전사 결과를 앞에서부터 순서대로 내보내는 제너레이터.
+    (청크는 동시에 전사하고, 앞 청크가 끝나는 대로 겹친 부분을 뺀 텍스트를 yield)
+    짧은 음성이면 전체 결과 1개. 끝까지 다 읽으면 결과를 캐시에 넣는다.
+    """
+    key = TranscriptCache.key(audio_bytes, language)
+    cached = TRANSCRIPTS.get(key)
+    if cached is not None:
+        yield cached
+        return
+    pieces: List[str] = []
+    for piece in _iter_pieces(audio_bytes, filename, language):
+        pieces.append(piece)
+        yield piece
+    text = " ".join(p for p in pieces if p)
+    if text:
+        TRANSCRIPTS.put(key, text)
+
+
+def _iter_pieces(audio_bytes: bytes, filename: str, language: Optional[str]) -> Iterator[str]:
+    audio = _prepare_audio(audio_bytes, filename)
+    if audio is None:
+        # 디코딩할 수 없는 형식이면 예전처럼 통째로 보낸다
+        yield _transcribe_once(audio_bytes, filename, language)
+        return
+    if audio.duration == 0:
+        yield ""  # 빈 파일
+        return
+    if STT_LONG_AUDIO_SEC > 0 and STT_CHUNK_SEC > 0 and audio.duration > STT_LONG_AUDIO_SEC:
+        yield from _iter_chunks(audio, language)
+        return
+    if not STT_NORMALIZE:
+        yield _transcribe_once(audio_bytes, filename, language)
+        return
+    from .audio import encode_compact
+
+    data, ext = encode_compact(audio, STT_UPLOAD_FORMAT)
+    log_info(
+        "stt_normalized",
+        in_bytes=len(audio_bytes), out_bytes=len(data), format=ext, duration=round(audio.duration, 1),
+    )
+    yield _transcribe_once(data, f"audio.{ext}", language)
+
+
+def _prepare_audio(audio_bytes: bytes, filename: str) -> Optional[PcmAudio]:
+    """디코딩 (+ STT_NORMALIZE 면 모노 / 리샘플 / 무음 제거). 디코딩이 필요 없거나 실패하면 None"""
+    long_mode = STT_LONG_AUDIO_SEC > 0 and STT_CHUNK_SEC > 0
+    if not STT_NORMALIZE and not long_mode:
+        return None
+    from .audio import AudioDecodeError, decode_audio, normalize_for_stt
+
+    try:
+        audio = decode_audio(audio_bytes, filename)
+    except AudioDecodeError as e:
+        log_info("stt_decode_skipped", filename=filename, error=str(e))
+        return None
+    if STT_NORMALIZE:
+        audio = normalize_for_stt(audio, STT_SAMPLE_RATE, STT_SILENCE_DB, STT_TRIM_PAD_SEC)
+    return audio
+
+
+def _transcribe_span(audio: PcmAudio, start: float, end: float, index: int, language: Optional[str]) -> str:
+    from .audio import encode_compact, encode_wav
+
+    chunk = audio.slice(start, end)
+    if STT_NORMALIZE:
+        data, ext = encode_compact(chunk, STT_UPLOAD_FORMAT)
+    else:
+        data, ext = encode_wav(chunk), "wav"
+    return _transcribe_once(data, f"chunk_{index}.{ext}", language)
+
+
+def _iter_chunks(audio: PcmAudio, language: Optional[str]) -> Iterator[str]:
+    from .audio import plan_chunks
+
+    spans = plan_chunks(audio, STT_CHUNK_SEC, STT_CHUNK_OVERLAP_SEC, STT_SILENCE_SEARCH_SEC, STT_SILENCE_DB)
+    log_info("stt_chunked", duration=round(audio.duration, 1), chunks=len(spans))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(STT_MAX_PARALLEL, len(spans)))) as pool:
+        # 청크 인코딩도 워커에서 (ffmpeg 인코딩이 순차로 밀리지 않게)
+        futures = [
+            pool.submit(_transcribe_span, audio, start, end, i, language)
+            for i, (start, end, _) in enumerate(spans)
+        ]
+        try:
+            previous = ""
+            for future, (_, _, overlapped) in zip(futures, spans):
+                text = future.result().strip()
+                # 무음에서 자른 경계는 겹친 오디오가 없으므로 중복 제거도 하지 않는다
+                piece = merge_overlap(previous, text) if overlapped else text
+                previous = text
+                yield piece
+        finally:
+            # 소비하던 쪽이 중간에 멈추면 아직 시작 안 한 청크는 취소
+            for future in futures:
+                future.cancel()
+
+
+def _words(text: str) -> List[str]:
+    return [_WORD_NORMALIZE.sub("", w).lower() for w in text.split()]
+
+
+def merge_overlap(
+    previous: str, text: str, max_words: Optional[int] = None, min_words: Optional[int] = None
+) -> str:
+    """
+    text 앞부분이 previous 끝부분과 같은 단어들이면 (겹친 구간을 두 청크가 모두 전사한 것) 제거.
+    구두점 / 대소문자는 무시하고 가장 긴 일치를 찾는다. min_words 단어 미만의 일치는 그대로 둔다.
+    """
+    if not previous or not text:
+        return text
+    limit = STT_OVERLAP_MAX_WORDS if max_words is None else max_words
+    least = max(1, STT_OVERLAP_MIN_WORDS if min_words is None else min_words)
+    prev_words, words = _words(previous), _words(text)
+    for k in range(min(limit, len(prev_words), len(words)), least - 1, -1):
+        if prev_words[-k:] == words[:k] and any(prev_words[-k:]):
+            return " ".join(text.split()[k:])
+    return text
@@ -0,0 +1,389 @@
+# rag/bulk_ingester.py
+"""
+JSONL → OpenSearch `_bulk` 병렬 적재 엔진.
+
+- 배치는 문서 개수가 아니라 바이트 크기(max_batch_bytes) 기준으로 자른다.
+- 리더 스레드가 bounded queue 에 배치를 넣고, N개의 워커가 동시에 전송한다.
+  (큐가 가득 차면 리더가 멈춤 → 메모리 사용량이 일정하게 유지됨)
+- 실패한 문서만 골라서 지수 백오프로 재시도한다. (429 / 5xx 만 재시도)
+- Serverless 는 _id 를 지정할 수 없어 같은 문서를 다시 보내면 중복 적재된다.
+  그래서 요청 전체가 실패했을 때는 서버가 확실히 거절한 429 만 다시 보내고,
+  타임아웃 / 502·503·504 / 연결 오류처럼 일부가 이미 적재됐을 수 있는 경우는 DLQ 로 넘긴다.
+- 재시도 불가 / 재시도 초과 문서는 dead-letter 파일에 원본 라인 그대로 저장.
+- Serverless 는 429 로 강하게 throttle 하므로,
+  429 가 나면 동시성을 절반으로 줄이고 성공이 이어지면 1씩 늘린다. (AIMD)
+"""
+
+import json
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 재시도 의미가 있는 HTTP 상태 코드 (bulk 응답의 문서별 status 기준)
+RETRYABLE_STATUS = {429, 502, 503, 504}
+# 요청 전체가 실패했을 때 다시 보내도 되는 상태 코드: 서버가 아무 문서도 처리하지 않은 경우만
+RESEND_SAFE_STATUS = {429}
+
+DEFAULT_MAX_BATCH_BYTES = 5 * 1024 * 1024  # Serverless bulk 요청 한도(10MB)보다 여유 있게
+DEFAULT_MAX_BATCH_DOCS = 1000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_BACKOFF_BASE = 0.5  # 초
+DEFAULT_BACKOFF_MAX = 30.0  # 초
+
+
+@dataclass
+class IngestStats:
+    docs_sent: int = 0
+    docs_ok: int = 0
+    docs_failed: int = 0
+    docs_retried: int = 0
+    bytes_sent: int = 0
+    batches: int = 0
+    throttled: int = 0
+    errors_by_type: Dict[str, int] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return max(end - self.started_at, 1e-9)
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs_ok / self.elapsed
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes_sent / self.elapsed / (1024 * 1024)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "docs_ok": self.docs_ok,
+            "docs_failed": self.docs_failed,
+            "docs_retried": self.docs_retried,
+            "batches": self.batches,
+            "throttled": self.throttled,
+            "elapsed_sec": round(self.elapsed, 2),
+            "docs_per_sec": round(self.docs_per_sec, 1),
+            "mb_per_sec": round(self.mb_per_sec, 2),
+            "errors_by_type": dict(self.errors_by_type),
+        }
+
+
+class AdaptiveLimiter:
+    """
+    동시 전송 개수 제한 (AIMD).
+    - on_throttle(): 429 발생 → limit 절반
+    - on_success(): 연속 성공이 limit 번 쌓이면 limit + 1 (max_limit 까지)
+    """
+
+    def __init__(self, max_limit: int, initial: Optional[int] = None):
+        self.max_limit = max(1, max_limit)
+        self.limit = min(self.max_limit, initial or self.max_limit)
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify()
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+
+def iter_doc_lines(path: Path) -> Iterator[bytes]:
+    """
+    JSONL 파일에서 문서 라인을 그대로(bytes) 꺼낸다.
+    이미 JSON 이므로 다시 파싱/직렬화하지 않는다.
+    """
+    with path.open("rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+
+def iter_batches(
+    lines: Iterator[bytes],
+    action_line: bytes,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    max_batch_docs: int = DEFAULT_MAX_BATCH_DOCS,
+) -> Iterator[List[bytes]]:
+    """
+    (action + doc) 페이로드 크기가 max_batch_bytes 를 넘지 않도록 문서 라인을 묶는다.
+    한 문서가 단독으로 한도를 넘으면 그 문서 하나만 담긴 배치로 보낸다.
+    """
+    batch: List[bytes] = []
+    size = 0
+    per_doc_overhead = len(action_line) + 2  # 줄바꿈 2개
+
+    for line in lines:
+        doc_size = len(line) + per_doc_overhead
+        if batch and (size + doc_size > max_batch_bytes or len(batch) >= max_batch_docs):
+            yield batch
+            batch, size = [], 0
+        batch.append(line)
+        size += doc_size
+
+    if batch:
+        yield batch
+
+
+def build_payload(docs: List[bytes], action_line: bytes) -> bytes:
+    parts: List[bytes] = []
+    for doc in docs:
+        parts.append(action_line)
+        parts.append(doc)
+    return b"\n".join(parts) + b"\n"
+
+
+def _status_of(exc: Exception) -> Any:
+    return getattr(exc, "status_code", None)
+
+
+class BulkIngester:
+    """
+    사용 예시:
+
+        ingester = BulkIngester(client, index_name="medinote_20250101000000")
+        stats = ingester.ingest_file(Path("rag/data/embedded_all.jsonl"))
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        index_name: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+        max_batch_docs: int = DEFAULT_MAX_BATCH_DOCS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        dead_letter_path: Optional[Path] = None,
+        queue_size: Optional[int] = None,
+        progress_every: int = 20,
+    ):
+        self.client = client
+        self.index_name = index_name
+        self.concurrency = max(1, concurrency)
+        self.max_batch_bytes = max_batch_bytes
+        self.max_batch_docs = max_batch_docs
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_path = dead_letter_path
+        self.queue_size = queue_size or self.concurrency * 2
+        self.progress_every = progress_every
+
+        # Serverless: _id 지정 금지 → index 액션만 사용
+        self.action_line = json.dumps({"index": {"_index": index_name}}).encode("utf-8")
+        self.limiter = AdaptiveLimiter(self.concurrency)
+        self.stats = IngestStats()
+        self._stats_lock = threading.Lock()
+        self._dlq_lock = threading.Lock()
+        self._dlq_file = None
+
+    # -------------------------
+    #  전송 / 재시도
+    # -------------------------
+    def _send(self, docs: List[bytes]) -> Dict[str, Any]:
+        payload = build_payload(docs, self.action_line)
+        self.limiter.acquire()
+        try:
+            resp = self.client.transport.perform_request(
+                method="POST",
+                url=f"/{self.index_name}/_bulk",
+                body=payload,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+        finally:
+            self.limiter.release()
+        with self._stats_lock:
+            self.stats.bytes_sent += len(payload)
+            self.stats.docs_sent += len(docs)
+        return resp
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter: [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _split_failures(
+        self, docs: List[bytes], resp: Dict[str, Any]
+    ) -> Tuple[int, List[bytes], List[Tuple[bytes, Dict[str, Any]]]]:
+        """
+        bulk 응답 items 를 보고 (성공 수, 재시도 대상, 영구 실패) 로 나눈다.
+        """
+        if not resp.get("errors"):
+            return len(docs), [], []
+
+        ok = 0
+        retry: List[bytes] = []
+        fatal: List[Tuple[bytes, Dict[str, Any]]] = []
+        for doc, item in zip(docs, resp.get("items", [])):
+            _, result = next(iter(item.items()))
+            status = result.get("status", 200)
+            if "error" not in result and status < 300:
+                ok += 1
+            elif status in RETRYABLE_STATUS:
+                retry.append(doc)
+            else:
+                fatal.append((doc, result.get("error") or {"type": f"http_{status}"}))
+        return ok, retry, fatal
+
+    def _process_batch(self, docs: List[bytes]) -> None:
+        pending = docs
+        attempt = 0
+
+        while pending:
+            try:
+                resp = self._send(pending)
+            except Exception as e:
+                status = _status_of(e)
+                # 타임아웃('TIMEOUT') / 게이트웨이 오류 / 연결 오류('N/A') 는 서버가 일부를 이미 적재했을 수 있다.
+                # _id 가 없어 다시 보내면 중복되므로 재시도하지 않고 DLQ 로 넘긴다. (나중에 확인 후 재적재)
+                retryable = status in RESEND_SAFE_STATUS
+                if status == 429:
+                    self._on_throttle()
+                if not retryable or attempt >= self.max_retries:
+                    err = {"type": type(e).__name__, "reason": str(e)[:200]}
+                    self._dead_letter([(d, err) for d in pending])
+                    return
+                attempt += 1
+                self._count_retry(len(pending))
+                time.sleep(self._backoff(attempt))
+                continue
+
+            ok, retry, fatal = self._split_failures(pending, resp)
+            with self._stats_lock:
+                self.stats.docs_ok += ok
+            if fatal:
+                self._dead_letter(fatal)
+
+            if not retry:
+                self.limiter.on_success()
+                return
+
+            # 일부 문서가 429 → 동시성 줄이고 실패분만 다시 보냄
+            self._on_throttle()
+            if attempt >= self.max_retries:
+                self._dead_letter([(d, {"type": "retries_exhausted"}) for d in retry])
+                return
+            attempt += 1
+            self._count_retry(len(retry))
+            time.sleep(self._backoff(attempt))
+            pending = retry
+
+    def _on_throttle(self) -> None:
+        self.limiter.on_throttle()
+        with self._stats_lock:
+            self.stats.throttled += 1
+
+    def _count_retry(self, n: int) -> None:
+        with self._stats_lock:
+            self.stats.docs_retried += n
+
+    def _dead_letter(self, failed: List[Tuple[bytes, Dict[str, Any]]]) -> None:
+        with self._stats_lock:
+            self.stats.docs_failed += len(failed)
+            for _, err in failed:
+                etype = err.get("type") or "unknown"
+                self.stats.errors_by_type[etype] = self.stats.errors_by_type.get(etype, 0) + 1
+
+        if self._dlq_file is None:
+            return
+        with self._dlq_lock:
+            # 원본 문서 라인 그대로 저장 → 그대로 다시 ingest 가능
+            for doc, _ in failed:
+                self._dlq_file.write(doc + b"\n")
+            self._dlq_file.flush()
+
+    # -------------------------
+    #  워커 / 진행 상황
+    # -------------------------
+    def _worker(self, q: "queue.Queue[Optional[List[bytes]]]") -> None:
+        while True:
+            batch = q.get()
+            try:
+                if batch is None:
+                    return
+                self._process_batch(batch)
+                with self._stats_lock:
+                    self.stats.batches += 1
+                    batches = self.stats.batches
+                if self.progress_every and batches % self.progress_every == 0:
+                    self._print_progress()
+            except Exception as e:  # 워커가 죽으면 큐가 막히므로 전부 DLQ 처리
+                if batch:
+                    err = {"type": type(e).__name__, "reason": str(e)[:200]}
+                    self._dead_letter([(d, err) for d in batch])
+            finally:
+                q.task_done()
+
+    def _print_progress(self) -> None:
+        s = self.stats
+        print(
+            f"🚀 {s.batches} 배치 / {s.docs_ok}개 적재 "
+            f"({s.docs_per_sec:.1f} docs/s, {s.mb_per_sec:.2f} MB/s, "
+            f"동시성 {self.limiter.limit}, 실패 {s.docs_failed})"
+        )
+
+    def ingest_lines(self, lines: Iterator[bytes]) -> IngestStats:
+        self.stats = IngestStats()
+        q: "queue.Queue[Optional[List[bytes]]]" = queue.Queue(maxsize=self.queue_size)
+
+        if self.dead_letter_path is not None:
+            self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+            self._dlq_file = self.dead_letter_path.open("ab")
+
+        workers = [
+            threading.Thread(target=self._worker, args=(q,), daemon=True)
+            for _ in range(self.concurrency)
+        ]
+        for w in workers:
+            w.start()
+
+        try:
+            for batch in iter_batches(
+                lines, self.action_line, self.max_batch_bytes, self.max_batch_docs
+            ):
+                q.put(batch)  # 큐가 가득 차면 여기서 대기 (backpressure)
+        finally:
+            for _ in workers:
+                q.put(None)
+            for w in workers:
+                w.join()
+            self.stats.finished_at = time.perf_counter()
+            if self._dlq_file is not None:
+                self._dlq_file.close()
+                self._dlq_file = None
+
+        return self.stats
+
+    def ingest_file(self, path: Path) -> IngestStats:
+        if not path.exists():
+            raise FileNotFoundError(f"파일 없음: {path}")
+        return self.ingest_lines(iter_doc_lines(path))
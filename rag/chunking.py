@@ -0,0 +1,215 @@
+# rag/chunking.py
+"""
+문서 → 청크 분할.
+
+- 긴 의약품/질병 문서를 통째로 임베딩하면 벡터가 희석되고 입력 한도를 넘기므로
+  content 를 섹션(효능·효과 / 용법·용량 / 주의사항 ...) 단위로 먼저 나누고,
+  토큰 기준 윈도우(overlap 포함)로 다시 자른다.
+- 각 청크는 parent_id / chunk_index / section 을 가지고,
+  리트리버가 검색 결과를 parent 문서 단위로 다시 묶는다. (llm/retriever.py)
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+CHUNK_TOKENS = 400   # 청크 하나의 최대 토큰 수
+CHUNK_OVERLAP = 60   # 윈도우 간 겹치는 토큰 수
+
+CONTENT_FIELD = "content"
+VECTOR_FIELD = "embedding"
+
+# 모든 청크 임베딩 텍스트 앞에 붙이는 식별용 필드 (약/질병 이름)
+HEADER_FIELDS = [
+    "title",
+    "drug_name_kor",
+    "drug_name_eng",
+    "disease_name_kor",
+    "disease_name_eng",
+]
+
+SECTION_KEYWORDS = (
+    "효능", "효과", "용법", "용량", "주의", "경고", "금기", "부작용", "이상반응",
+    "상호작용", "저장", "보관", "성분", "원인", "증상", "진단", "치료", "예방",
+    "정의", "개요", "합병증", "경과", "식이", "생활",
+)
+
+# 【효능·효과】 / [용법·용량] / ■ 주의사항 / 1. 원인 / 증상: 같은 짧은 헤더 라인
+_BRACKET_HEADER = re.compile(r"^\s*[\[【<〈]\s*([^\]】>〉]{1,30})\s*[\]】>〉]\s*$")
+_BULLET_HEADER = re.compile(r"^\s*(?:[■□●○◆◇▶▷※]|\d{1,2}[.)])\s*([^\n]{1,30}?)\s*:?\s*$")
+_COLON_HEADER = re.compile(r"^\s*([^\n:]{1,20})\s*:\s*$")
+
+
+@lru_cache()
+def _get_encoder():
+    """text-embedding-3 계열과 같은 cl100k_base. tiktoken 이 없으면 None."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def _encode(text: str) -> List[Any]:
+    enc = _get_encoder()
+    if enc is not None:
+        return enc.encode(text)
+    # tiktoken 미설치 시: 한글은 글자당 ~1토큰이라 글자 단위로 근사
+    return list(text)
+
+
+def _char_offsets(tokens: List[Any]) -> Tuple[str, List[int], List[int]]:
+    """
+    (디코딩한 텍스트, 토큰 i 앞의 글자 경계 - 내림, 올림).
+    한글 한 글자가 바이트 토큰 여러 개로 쪼개질 수 있어서, 글자 중간에서 시작하는 토큰은
+    내림이면 그 글자 앞, 올림이면 그 글자 뒤 경계가 된다.
+    """
+    enc = _get_encoder()
+    if enc is None:
+        offsets = list(range(len(tokens)))
+        return "".join(tokens), offsets, offsets
+    text, floor = enc.decode_with_offsets(tokens)
+    # UTF-8 연속 바이트(0x80~0xBF)로 시작하는 토큰 = 글자 중간
+    ceil = [
+        off + 1 if 0x80 <= b[0] < 0xC0 else off
+        for off, b in zip(floor, enc.decode_tokens_bytes(tokens))
+    ]
+    return text, list(floor), ceil
+
+
+def count_tokens(text: str) -> int:
+    return len(_encode(text))
+
+
+def _section_title(line: str) -> str | None:
+    for pattern in (_BRACKET_HEADER, _BULLET_HEADER, _COLON_HEADER):
+        m = pattern.match(line)
+        if m:
+            title = m.group(1).strip()
+            if pattern is _BRACKET_HEADER or any(k in title for k in SECTION_KEYWORDS):
+                return title
+    return None
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    본문을 (섹션명, 섹션 본문) 리스트로 나눈다.
+    헤더가 없는 앞부분은 섹션명 "" 로 둔다.
+    """
+    sections: List[Tuple[str, str]] = []
+    current_title = ""
+    current_lines: List[str] = []
+
+    for line in text.splitlines():
+        title = _section_title(line)
+        if title is not None:
+            if any(l.strip() for l in current_lines):
+                sections.append((current_title, "\n".join(current_lines).strip()))
+            current_title, current_lines = title, []
+        else:
+            current_lines.append(line)
+
+    if any(l.strip() for l in current_lines):
+        sections.append((current_title, "\n".join(current_lines).strip()))
+    return sections
+
+
+def _windows(text: str, max_tokens: int, overlap: int) -> List[str]:
+    tokens = _encode(text)
+    if len(tokens) <= max_tokens:
+        return [text]
+
+    # 토큰 조각을 그대로 디코딩하면 윈도우 경계의 글자가 깨지므로(U+FFFD)
+    # 토큰 위치 → 글자 경계로 바꿔서 원문을 자른다. 잘린 글자는 빼고(시작은 올림, 끝은 내림)
+    # 겹침 구간이 있으니 이웃 윈도우에 온전히 들어간다.
+    decoded, floor, ceil = _char_offsets(tokens)
+    step = max(1, max_tokens - overlap)
+    out = []
+    for start in range(0, len(tokens), step):
+        end = start + max_tokens
+        piece = decoded[ceil[start] : floor[end] if end < len(tokens) else len(decoded)].strip()
+        if piece:
+            out.append(piece)
+        if end >= len(tokens):
+            break
+    return out
+
+
+def split_text(
+    text: str, max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP
+) -> List[Tuple[str, str]]:
+    """
+    섹션 경계를 우선 존중하면서 토큰 한도 안으로 자른 (섹션명, 텍스트) 리스트.
+    - 짧은 섹션들은 한도 안에서 이어 붙임
+    - 한도를 넘는 섹션은 overlap 있는 윈도우로 분할
+    """
+    pieces: List[Tuple[str, str]] = []
+    buf_title, buf_text, buf_tokens = "", "", 0
+
+    for title, body in split_sections(text):
+        block = f"{title}\n{body}" if title else body
+        block_tokens = count_tokens(block)
+
+        if buf_text and buf_tokens + block_tokens <= max_tokens:
+            buf_text += "\n\n" + block
+            buf_tokens += block_tokens
+            continue
+
+        if buf_text:
+            pieces.append((buf_title, buf_text))
+            buf_title, buf_text, buf_tokens = "", "", 0
+
+        if block_tokens <= max_tokens:
+            buf_title, buf_text, buf_tokens = title, block, block_tokens
+        else:
+            pieces.extend((title, w) for w in _windows(block, max_tokens, overlap))
+
+    if buf_text:
+        pieces.append((buf_title, buf_text))
+    return pieces
+
+
+def chunk_document(
+    doc: Dict[str, Any], max_tokens: int = CHUNK_TOKENS, overlap: int = CHUNK_OVERLAP
+) -> List[Dict[str, Any]]:
+    """
+    원본 문서 1개 → 청크 문서 N개.
+    content 외 메타데이터는 그대로 복사하고, id 는 "<parent_id>#<n>" 형태.
+    """
+    parent_id = str(doc.get("id", ""))
+    base = {k: v for k, v in doc.items() if k not in {CONTENT_FIELD, VECTOR_FIELD}}
+    pieces = split_text(str(doc.get(CONTENT_FIELD) or ""), max_tokens, overlap)
+    if not pieces:
+        pieces = [("", "")]
+
+    chunks = []
+    for i, (section, text) in enumerate(pieces):
+        chunk = dict(base)
+        chunk.update(
+            {
+                "id": f"{parent_id}#{i}",
+                "parent_id": parent_id,
+                "chunk_index": i,
+                "chunk_count": len(pieces),
+                "section": section or None,
+                CONTENT_FIELD: text,
+            }
+        )
+        chunks.append(chunk)
+    return chunks
+
+
+def build_chunk_text_to_embed(chunk: Dict[str, Any]) -> str:
+    """
+    청크 임베딩용 텍스트: 약/질병 이름 헤더 + 섹션명 + 청크 본문.
+    이름이 모든 청크에 들어가야 "타이레놀 부작용" 같은 질의가 해당 청크에 붙는다.
+    """
+    parts = [str(chunk[k]) for k in HEADER_FIELDS if chunk.get(k)]
+    if chunk.get("section"):
+        parts.append(str(chunk["section"]))
+    if chunk.get(CONTENT_FIELD):
+        parts.append(str(chunk[CONTENT_FIELD]))
+    if not parts:
+        parts.append(str(chunk.get("id", "")))
+    return "\n".join(parts)
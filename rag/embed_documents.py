@@ -2,6 +2,9 @@
 """
 merged_all.jsonl 전체를 임베딩해서
 embedded_all.jsonl 로 저장하는 스크립트
+
+CHUNKING=True 이면 문서를 청크 단위로 나눠서(rag/chunking.py) 청크마다 임베딩한다.
+출력 한 줄 = 청크 1개 (parent_id 로 원본 문서를 가리킴)
 """
 
 import json
@@ -10,6 +13,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from rag.chunking import build_chunk_text_to_embed, chunk_document
+
 
 # =========================
 # 경로 & 환경 변수 로드
@@ -33,6 +38,9 @@ EMBED_MODEL = "text-embedding-3-large"
 # MAX_DOCS = None 이면 전체 처리, 숫자를 넣으면 앞에서 그 개수만 처리
 MAX_DOCS = None   # ✅ 전체 데이터 돌리려면 None, 테스트는 100 이런 식으로 바꿔도 됨
 
+# 청크 분할 사용 여부 (False 면 예전처럼 문서 통째로 임베딩)
+CHUNKING = True
+
 
 def build_text_to_embed(doc: dict) -> str:
     """
@@ -77,6 +85,17 @@ def embed_text(text: str):
     return resp.data[0].embedding
 
 
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """
+    여러 텍스트를 한 번의 요청으로 임베딩 (청크들은 한 문서 단위로 묶어서 보냄).
+    """
+    resp = client.embeddings.create(
+        model=EMBED_MODEL,
+        input=texts,
+    )
+    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+
 def main():
     if not INPUT_PATH.exists():
         raise FileNotFoundError(f"입력 파일을 찾을 수 없습니다: {INPUT_PATH}")
@@ -86,6 +105,7 @@ def main():
     print(f"🔢 최대 문서 수: {MAX_DOCS if MAX_DOCS is not None else '전체'}")
 
     processed = 0
+    chunk_total = 0
     with INPUT_PATH.open("r", encoding="utf-8") as f_in, \
          OUTPUT_PATH.open("w", encoding="utf-8") as f_out:
 
@@ -99,17 +119,32 @@ def main():
 
             doc = json.loads(line)
 
-            text = build_text_to_embed(doc)
-            print(f"[{idx+1}] 임베딩 생성 중... (길이 {len(text)} 글자)")
+            if not CHUNKING:
+                text = build_text_to_embed(doc)
+                print(f"[{idx+1}] 임베딩 생성 중... (길이 {len(text)} 글자)")
+
+                embedding = embed_text(text)
+                doc["embedding"] = embedding  # 벡터 필드 추가
+
+                # 새 JSONL로 저장
+                f_out.write(json.dumps(doc, ensure_ascii=False) + "\n")
+                processed += 1
+                continue
 
-            embedding = embed_text(text)
-            doc["embedding"] = embedding  # 벡터 필드 추가
+            chunks = chunk_document(doc)
+            texts = [build_chunk_text_to_embed(c) for c in chunks]
+            print(f"[{idx+1}] 임베딩 생성 중... (청크 {len(chunks)}개)")
 
-            # 새 JSONL로 저장
-            f_out.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            for chunk, embedding in zip(chunks, embed_texts(texts)):
+                chunk["embedding"] = embedding
+                f_out.write(json.dumps(chunk, ensure_ascii=False) + "\n")
             processed += 1
+            chunk_total += len(chunks)
 
-    print(f"✅ 완료! {processed}개 문서를 {OUTPUT_PATH.name} 에 저장했습니다.")
+    if CHUNKING:
+        print(f"✅ 완료! {processed}개 문서 → {chunk_total}개 청크를 {OUTPUT_PATH.name} 에 저장했습니다.")
+    else:
+        print(f"✅ 완료! {processed}개 문서를 {OUTPUT_PATH.name} 에 저장했습니다.")
 
 
 if __name__ == "__main__":
@@ -1,13 +1,54 @@
 ﻿# rag/index_creator.py
+"""
+블루/그린 인덱스 빌드.
 
+1) 스키마로 새 버전 인덱스 생성: medinote_<YYYYmmddHHMMSS>
+2) embedded_all.jsonl 을 새 인덱스에 bulk 적재
+3) 문서 수가 검색에 반영될 때까지 기다린 뒤 검증 쿼리 세트(validation_queries.jsonl) 실행
+4) 통과하면 읽기 alias 를 새 인덱스로 원자적으로 교체 (_aliases actions 한 번에)
+5) 교체 직후 alias 로 스모크 쿼리 → 실패하면 이전 인덱스로 롤백
+
+    python -m rag.index_creator build            # 1~5 전체
+    python -m rag.index_creator create           # 빈 인덱스만 생성
+    python -m rag.index_creator swap <index>     # alias 수동 교체
+    python -m rag.index_creator rollback <index> # alias 를 지정 인덱스로 되돌림
+    python -m rag.index_creator status           # alias 가 가리키는 인덱스 확인
+"""
+
+import argparse
 import json
+import time
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 from opensearchpy.exceptions import NotFoundError
+from llm.config import settings
 from llm.opensearch_client import get_opensearch_client
 
 SCHEMA_PATH = Path(__file__).parent / "schema" / "opensearch_schema.json"
-INDEX_NAME = "medinote_v1"
+VALIDATION_QUERIES_PATH = Path(__file__).parent / "validation_queries.jsonl"
+
+# Serverless 는 bulk 응답 후에도 검색 반영까지 수 초~수십 초 걸림 → 문서 수가 안정될 때까지 기다린 뒤 검증
+COUNT_WAIT_TIMEOUT_SEC = 120.0
+COUNT_POLL_INTERVAL_SEC = 5.0
+COUNT_STABLE_POLLS = 3  # 같은 값이 연속 몇 번 나오면 반영이 끝났다고 본다
+
+INDEX_PREFIX = "medinote"
+# build / swap / rollback 이 관리하는 alias (OPENSEARCH_READ_ALIAS 가 비어 있으면 "medinote").
+# 리트리버는 OPENSEARCH_READ_ALIAS 를 설정해야 이 alias 를 읽는다.
+READ_ALIAS = settings.opensearch_read_alias or INDEX_PREFIX
+
+
+def build_index_name(now: Optional[datetime] = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    return f"{INDEX_PREFIX}_{now.strftime('%Y%m%d%H%M%S')}"
+
+
+def load_schema() -> Dict[str, Any]:
+    # BOM 허용
+    with SCHEMA_PATH.open("r", encoding="utf-8-sig") as f:
+        return json.load(f)
 
 
 def index_exists(client, index_name: str) -> bool:
@@ -19,28 +60,230 @@ def index_exists(client, index_name: str) -> bool:
         return False
 
 
-def create_index():
-    client = get_opensearch_client()
-
-    # BOM 허용
-    with SCHEMA_PATH.open("r", encoding="utf-8-sig") as f:
-        body = json.load(f)
+def create_index(index_name: Optional[str] = None, client=None) -> str:
+    client = client or get_opensearch_client()
+    index_name = index_name or build_index_name()
+    body = load_schema()
 
-    if index_exists(client, INDEX_NAME):
-        print(f"⚠ 인덱스 이미 존재: {INDEX_NAME}")
-        return
+    if index_exists(client, index_name):
+        print(f"⚠ 인덱스 이미 존재: {index_name}")
+        return index_name
 
-    print(f"📌 인덱스 생성 시도: {INDEX_NAME}")
+    print(f"📌 인덱스 생성 시도: {index_name}")
 
     # PUT /{index_name}
-    resp = client.transport.perform_request(
-        "PUT",
-        f"/{INDEX_NAME}",
-        body=body
-    )
+    resp = client.transport.perform_request("PUT", f"/{index_name}", body=body)
 
     print("✅ 인덱스 생성 완료:", resp)
+    return index_name
+
+
+# =========================
+#  alias 관리
+# =========================
+def get_alias_targets(client, alias: str = READ_ALIAS) -> List[str]:
+    """alias 가 현재 가리키는 인덱스 목록 (없으면 [])"""
+    try:
+        resp = client.transport.perform_request("GET", f"/_alias/{alias}")
+    except NotFoundError:
+        return []
+    return sorted(resp.keys())
+
+
+def swap_alias(client, new_index: str, alias: str = READ_ALIAS) -> List[str]:
+    """
+    alias 를 new_index 로 원자적으로 교체.
+    remove/add 를 한 번의 _aliases 요청에 담아야 중간에 빈 alias 상태가 생기지 않는다.
+    반환값: 교체 전 alias 가 가리키던 인덱스 목록 (롤백용)
+    """
+    previous = get_alias_targets(client, alias)
+    actions: List[Dict[str, Any]] = [
+        {"remove": {"index": old, "alias": alias}} for old in previous if old != new_index
+    ]
+    actions.append({"add": {"index": new_index, "alias": alias}})
+
+    client.transport.perform_request("POST", "/_aliases", body={"actions": actions})
+    print(f"🔀 alias '{alias}': {previous or '(없음)'} → {new_index}")
+    return previous
+
+
+def rollback_alias(client, previous: List[str], alias: str = READ_ALIAS) -> None:
+    """swap_alias 이전 상태로 alias 를 되돌린다."""
+    current = get_alias_targets(client, alias)
+    actions: List[Dict[str, Any]] = [
+        {"remove": {"index": idx, "alias": alias}} for idx in current if idx not in previous
+    ]
+    actions += [{"add": {"index": idx, "alias": alias}} for idx in previous if idx not in current]
+    if not actions:
+        return
+
+    client.transport.perform_request("POST", "/_aliases", body={"actions": actions})
+    print(f"↩ alias '{alias}' 롤백: {current} → {previous}")
+
+
+# =========================
+#  검증
+# =========================
+def load_validation_queries(path: Path = VALIDATION_QUERIES_PATH) -> List[Dict[str, Any]]:
+    """
+    한 줄에 하나:
+      {"query": "타이레놀 최대 복용량", "min_hits": 1, "expect_ids": ["drug_123"]}
+    expect_ids 는 선택. 지정하면 top-k 안에 하나라도 들어와야 통과.
+    """
+    if not path.exists():
+        return []
+    queries = []
+    with path.open("r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def count_docs(client, index_name: str) -> int:
+    body = {"size": 0, "track_total_hits": True, "query": {"match_all": {}}}
+    resp = client.search(index=index_name, body=body)
+    total = resp["hits"]["total"]
+    return total["value"] if isinstance(total, dict) else int(total)
+
+
+def wait_for_count(
+    client,
+    index_name: str,
+    expected: int,
+    timeout: float = COUNT_WAIT_TIMEOUT_SEC,
+    interval: float = COUNT_POLL_INTERVAL_SEC,
+    stable_polls: int = COUNT_STABLE_POLLS,
+) -> int:
+    """
+    문서 수가 expected 에 도달하거나, stable_polls 번 연속 그대로이거나, timeout 이 지날 때까지 폴링.
+    마지막으로 읽은 문서 수를 돌려준다.
+    """
+    deadline = time.monotonic() + timeout
+    last, same = -1, 0
+    while True:
+        actual = count_docs(client, index_name)
+        if actual >= expected:
+            return actual
+        same = same + 1 if actual == last else 1
+        last = actual
+        # 0 건이 이어지는 건 아직 반영 전일 가능성이 커서 안정으로 보지 않음
+        if actual > 0 and same >= stable_polls:
+            return actual
+        if time.monotonic() + interval > deadline:
+            return actual
+        print(f"⏳ 검색 반영 대기: {actual} / {expected}")
+        time.sleep(interval)
+
+
+def run_validation(
+    client,
+    index_name: str,
+    queries: List[Dict[str, Any]],
+    expected_docs: Optional[int] = None,
+    top_k: int = 5,
+) -> bool:
+    from llm.embeddings import embed_text
+
+    ok = True
+
+    if expected_docs is not None:
+        # 반영이 끝난 뒤에 판정해야 문서 수 / 검증 쿼리 결과가 의미 있음
+        actual = wait_for_count(client, index_name, expected_docs)
+        # 반영이 끝나도 일부 문서가 늦을 수 있어서 99% 이상이면 통과
+        if actual < expected_docs * 0.99:
+            print(f"❌ 문서 수 부족: {actual} / {expected_docs}")
+            ok = False
+        else:
+            print(f"✅ 문서 수 확인: {actual} / {expected_docs}")
+
+    for q in queries:
+        vector = embed_text(q["query"])
+        body = {
+            "size": top_k,
+            "query": {"knn": {settings.opensearch_vector_field: {"vector": vector, "k": top_k}}},
+            "_source": ["id", "title"],
+        }
+        hits = client.search(index=index_name, body=body)["hits"]["hits"]
+        ids = [h.get("_source", {}).get("id") or h.get("_id") for h in hits]
+
+        passed = len(hits) >= q.get("min_hits", 1)
+        expect_ids = q.get("expect_ids")
+        if passed and expect_ids:
+            passed = any(i in ids for i in expect_ids)
+
+        mark = "✅" if passed else "❌"
+        print(f"{mark} 검증 쿼리: {q['query']} → {len(hits)}건 {ids[:3]}")
+        ok = ok and passed
+
+    return ok
+
+
+# =========================
+#  블루/그린 전체 플로우
+# =========================
+def blue_green_build(input_path: Optional[Path] = None, alias: str = READ_ALIAS) -> Optional[str]:
+    from rag.ingest_jsonl import INPUT_PATH, bulk_ingest
+
+    client = get_opensearch_client()
+    input_path = input_path or INPUT_PATH
+
+    new_index = create_index(client=client)
+    stats = bulk_ingest(index_name=new_index, input_path=input_path)
+    if stats.docs_ok == 0:
+        print(f"❌ 적재된 문서가 없음 → alias 교체 중단 (새 인덱스 {new_index} 는 남겨둠)")
+        return None
+
+    queries = load_validation_queries()
+    if not run_validation(client, new_index, queries, expected_docs=stats.docs_ok):
+        print(f"❌ 검증 실패 → alias 교체 중단 (새 인덱스 {new_index} 는 남겨둠)")
+        return None
+
+    previous = swap_alias(client, new_index, alias)
+
+    # alias 경유 스모크 쿼리 (라우팅/권한 문제 확인). 예외(403 / 임베딩 실패 등)도 실패로 보고 롤백
+    try:
+        smoke_ok = run_validation(client, alias, queries[:1])
+    except Exception as e:
+        print(f"❌ alias 스모크 쿼리 오류: {type(e).__name__}: {e}")
+        smoke_ok = False
+    if not smoke_ok:
+        print("❌ alias 스모크 쿼리 실패 → 롤백")
+        rollback_alias(client, previous, alias)
+        return None
+
+    print(f"🎉 블루/그린 교체 완료: {alias} → {new_index} (이전: {previous or '없음'})")
+    return new_index
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MediNote 인덱스 블루/그린 관리")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="새 인덱스 생성 → 적재 → 검증 → alias 교체")
+    p_build.add_argument("--input", type=Path, default=None)
+    sub.add_parser("create", help="빈 버전 인덱스만 생성")
+    p_swap = sub.add_parser("swap", help="alias 를 지정 인덱스로 교체")
+    p_swap.add_argument("index")
+    p_rollback = sub.add_parser("rollback", help="alias 를 지정 인덱스로 되돌림")
+    p_rollback.add_argument("index")
+    sub.add_parser("status", help="alias 가 가리키는 인덱스 출력")
+
+    args = parser.parse_args(argv)
+    client = get_opensearch_client()
+
+    if args.command == "build":
+        blue_green_build(args.input)
+    elif args.command == "create":
+        create_index(client=client)
+    elif args.command == "swap":
+        swap_alias(client, args.index)
+    elif args.command == "rollback":
+        rollback_alias(client, [args.index])
+    elif args.command == "status":
+        print(f"alias '{READ_ALIAS}' → {get_alias_targets(client) or '(없음)'}")
 
 
 if __name__ == "__main__":
-    create_index()
+    main()
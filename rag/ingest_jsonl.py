@@ -1,9 +1,19 @@
 ﻿# rag/ingest_jsonl.py
-import json
+"""
+embedded_all.jsonl → OpenSearch 적재 스크립트.
+실제 전송/재시도/동시성 제어는 rag/bulk_ingester.py 의 BulkIngester 가 담당.
+
+    python -m rag.ingest_jsonl
+"""
+import os
 from pathlib import Path
+
+from llm.config import settings
 from llm.opensearch_client import get_opensearch_client
+from rag.bulk_ingester import BulkIngester
 
-INDEX_NAME = "medinote_v3"
+# 블루/그린 빌드에서는 rag/index_creator.py 가 새 인덱스 이름을 넘겨줌
+INDEX_NAME = os.getenv("INGEST_INDEX", settings.opensearch_index)
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
@@ -11,73 +21,41 @@ DATA_DIR = BASE_DIR / "data"
 # ✅ 전체 임베딩 결과 파일
 INPUT_PATH = DATA_DIR / "embedded_all.jsonl"
 
-# 한 번에 bulk로 보낼 문서 개수
-BATCH_SIZE = 500  # 500~1000 선이면 적당
-
-
-def bulk_ingest():
-    client = get_opensearch_client()
-
-    print(f"📄 입력 파일: {INPUT_PATH}")
-
-    if not INPUT_PATH.exists():
-        raise FileNotFoundError(f"파일 없음: {INPUT_PATH}")
+# 재시도까지 실패한 문서 (원본 라인 그대로 → 이 파일을 다시 INPUT 으로 넣으면 재적재)
+DEAD_LETTER_PATH = DATA_DIR / "failed_docs.jsonl"
 
-    with INPUT_PATH.open("r", encoding="utf-8") as f:
-        batch_actions = []
-        count = 0
-        batch_count = 0
+# 동시 bulk 요청 수 (429가 나면 엔진이 알아서 줄였다가 다시 늘림)
+CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
 
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
+# 한 번에 보낼 bulk 페이로드 크기 (MB)
+MAX_BATCH_MB = float(os.getenv("INGEST_MAX_BATCH_MB", "5"))
 
-            doc = json.loads(line)
 
-            # 서버리스: _id 사용 금지. 그냥 index만.
-            action = {
-                "index": {
-                    "_index": INDEX_NAME
-                }
-            }
-
-            batch_actions.append(json.dumps(action))
-            batch_actions.append(json.dumps(doc, ensure_ascii=False))
-            count += 1
-
-            # 배치 사이즈에 도달하면 한번 전송
-            if len(batch_actions) >= BATCH_SIZE * 2:
-                batch_count += 1
-                print(f"🚀 배치 {batch_count} 업로드 중... (누적 {count}개 문서)")
-
-                payload = "\n".join(batch_actions) + "\n"
-                resp = client.transport.perform_request(
-                    method="POST",
-                    url=f"/{INDEX_NAME}/_bulk",
-                    body=payload,
-                    headers={"Content-Type": "application/json"}
-                )
-
-                if resp.get("errors"):
-                    print("⚠ 일부 문서에서 오류 발생:", resp)
-                batch_actions = []
-
-        # 남은 문서 flush
-        if batch_actions:
-            batch_count += 1
-            print(f"🚀 마지막 배치 {batch_count} 업로드 중... (총 {count}개 문서)")
-            payload = "\n".join(batch_actions) + "\n"
-            resp = client.transport.perform_request(
-                method="POST",
-                url=f"/{INDEX_NAME}/_bulk",
-                body=payload,
-                headers={"Content-Type": "application/json"}
-            )
-            if resp.get("errors"):
-                print("⚠ 일부 문서에서 오류 발생:", resp)
+def bulk_ingest(index_name: str = INDEX_NAME, input_path: Path = INPUT_PATH):
+    client = get_opensearch_client()
 
-    print(f"✅ 전체 업로드 완료! 총 {count}개 문서 적재")
+    print(f"📄 입력 파일: {input_path}")
+    print(f"📌 대상 인덱스: {index_name} (동시성 최대 {CONCURRENCY}, 배치 {MAX_BATCH_MB}MB)")
+
+    ingester = BulkIngester(
+        client,
+        index_name=index_name,
+        concurrency=CONCURRENCY,
+        max_batch_bytes=int(MAX_BATCH_MB * 1024 * 1024),
+        dead_letter_path=DEAD_LETTER_PATH,
+    )
+    stats = ingester.ingest_file(input_path)
+    summary = stats.summary()
+
+    print(
+        f"✅ 업로드 완료! {summary['docs_ok']}개 적재 "
+        f"({summary['docs_per_sec']} docs/s, {summary['mb_per_sec']} MB/s, "
+        f"{summary['elapsed_sec']}초)"
+    )
+    if stats.docs_failed:
+        print(f"⚠ 실패 {stats.docs_failed}개 → {DEAD_LETTER_PATH} 에 저장됨")
+        print(f"  오류 유형: {summary['errors_by_type']}")
+    return stats
 
 
 if __name__ == "__main__":
@@ -0,0 +1,69 @@
+# tests/test_admission.py
+import threading
+import time
+
+import pytest
+
+from llm.admission import AdmissionController, AdmissionRejected, UserRateLimiter
+
+
+def test_user_token_bucket_refills():
+    limiter = UserRateLimiter(rate=1.0, burst=2)
+    assert limiter.check("u1", now=0.0) == 0
+    assert limiter.check("u1", now=0.0) == 0
+    assert limiter.check("u1", now=0.0) == pytest.approx(1.0)
+    assert limiter.check("u2", now=0.0) == 0  # 사용자별로 따로
+    assert limiter.check("u1", now=1.0) == 0
+
+
+def test_queue_full_and_timeout_rejections():
+    ctl = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout_sec=0.1)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with ctl.admit():
+            entered.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(1)
+
+    results = {}
+
+    def waiter():
+        try:
+            with ctl.admit():
+                results["waiter"] = "admitted"
+        except AdmissionRejected as e:
+            results["waiter"] = e.reason
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    time.sleep(0.02)
+
+    # 대기열(1칸)이 이미 찼으므로 바로 거절
+    with pytest.raises(AdmissionRejected) as exc:
+        with ctl.admit():
+            pass
+    assert exc.value.reason == "queue_full"
+
+    t.join()
+    assert results["waiter"] == "queue_timeout"
+    release.set()
+    holder.join()
+
+    # 처리시간(EWMA)이 SLO 보다 길면 기다리지 않고 바로 거절
+    release.clear()
+    entered.clear()
+    holder = threading.Thread(target=hold)
+    holder.start()
+    entered.wait(1)
+    with pytest.raises(AdmissionRejected) as exc:
+        with ctl.admit():
+            pass
+    assert exc.value.reason == "queue_deadline"
+    release.set()
+    holder.join()
+    assert ctl.stats()["active"] == 0
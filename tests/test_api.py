@@ -0,0 +1,77 @@
+# tests/test_api.py
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.chat_latency import synthetic_corpus
+from benchmarks.fakes import FakeOpenAI
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.embeddings import set_openai_client
+from llm.opensearch_client import set_opensearch_client
+
+
+@pytest.fixture()
+def client():
+    from api.main import app
+
+    sources, vectors = synthetic_corpus()
+    set_openai_client(FakeOpenAI())
+    set_opensearch_client(LocalOpenSearchClient(sources, vectors))
+    try:
+        with TestClient(app) as c:
+            yield c
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_health_and_ready(client):
+    assert client.get("/healthz").json() == {"status": "ok"}
+    ready = client.get("/readyz")
+    assert ready.status_code == 200
+    assert ready.json()["warmup"] == {"openai": "ok", "opensearch": "ok"}
+
+
+def test_chat_json_and_stream_return_same_answer(client):
+    req = {"query": "타이레놀 하루 최대 복용량이 궁금해요", "history": []}
+    payload = client.post("/v1/chat", json=req).json()
+    assert payload["answer"].startswith("(fake answer")
+    assert payload["citations"]
+
+    resp = client.post("/v1/chat/stream", json=req)
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(resp.text)
+    assert events[-1][0] == "done"
+    streamed = "".join(d["text"] for name, d in events if name == "delta")
+    assert events[-1][1]["answer"].startswith(streamed)
+    assert events[-1][1]["debug"]["usage"]["completion_tokens"] > 0
+
+
+def test_stream_strips_non_medical_tag(client):
+    set_openai_client(FakeOpenAI(answer_prefix="[NON_MEDICAL] "))
+    events = _sse_events(client.post("/v1/chat/stream", json={"query": "타이레놀 먹어도 되나요"}).text)
+    streamed = "".join(d["text"] for name, d in events if name == "delta")
+    assert streamed.startswith("(fake answer")
+    assert events[-1][1]["citations"] == []
+
+
+def test_stt_rejects_oversized_upload(client, monkeypatch):
+    import api.main
+
+    monkeypatch.setattr(api.main, "STT_MAX_BYTES", 10)
+    # Content-Length 가 한도 + 여유를 넘으면 본문을 읽기 전에 거절
+    big = client.post("/v1/stt", files={"file": ("a.wav", b"x" * (api.main.STT_FORM_OVERHEAD_BYTES + 100))})
+    assert big.status_code == 413
+    # 여유 안쪽이면 파일을 한도 + 1 바이트까지만 읽고 거절
+    small = client.post("/v1/stt", files={"file": ("a.wav", b"x" * 100)})
+    assert small.status_code == 413
+    assert "10 bytes" in small.json()["detail"]
@@ -0,0 +1,66 @@
+# tests/test_breaker.py
+import time
+
+import pytest
+
+from llm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+def _fail():
+    raise ConnectionError("throttled")
+
+
+def test_breaker_opens_on_error_rate_and_recovers_via_half_open():
+    b = CircuitBreaker("t", window_sec=10, min_calls=4, error_rate=0.5, open_sec=0.05, half_open_probes=1)
+    b.call(lambda: 1)
+    b.call(lambda: 1)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            b.call(_fail)
+    assert b.state == OPEN
+
+    # open 동안은 호출하지 않고 바로 거절
+    called = []
+    with pytest.raises(CircuitOpen):
+        b.call(lambda: called.append(1))
+    assert not called
+
+    time.sleep(0.06)
+    assert b.state == HALF_OPEN
+    with pytest.raises(ConnectionError):
+        b.call(_fail)  # probe 실패 → 다시 open
+    assert b.state == OPEN
+
+    time.sleep(0.06)
+    assert b.call(lambda: "ok") == "ok"  # probe 성공 → closed
+    assert b.state == CLOSED
+
+
+def test_breaker_opens_on_slow_calls():
+    b = CircuitBreaker("t_slow", min_calls=3, slow_call_ms=5, slow_rate=0.6, open_sec=10)
+    for _ in range(3):
+        b.call(lambda: time.sleep(0.01))
+    assert b.state == OPEN
+
+
+def test_chat_degrades_to_no_rag_when_search_fails():
+    from benchmarks.fakes import FakeOpenAI
+    from llm.embeddings import set_openai_client
+    from llm.opensearch_client import set_opensearch_client
+    from llm.orchestrator import DEGRADED_RAG_NOTICE, run_chat_rag
+
+    class DownSearch:
+        def search(self, **_):
+            raise ConnectionError("503 Service Unavailable")
+
+    set_openai_client(FakeOpenAI())
+    set_opensearch_client(DownSearch())
+    try:
+        result = run_chat_rag("타이레놀 복용량 알려주세요", history=[])
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+    assert result["debug"]["degraded"] == ["retrieval"]
+    assert result["citations"] == []
+    assert result["answer"].endswith(DEGRADED_RAG_NOTICE)
@@ -0,0 +1,110 @@
+# tests/test_bulk_ingester.py
+import json
+import threading
+
+from rag.bulk_ingester import BulkIngester, build_payload, iter_batches
+
+
+class FakeTransport:
+    """
+    _bulk 요청을 흉내내는 가짜 transport.
+    - throttle_every 번째 문서마다 첫 시도에서 429 를 돌려줌
+    - "bad" 필드가 있는 문서는 항상 400(mapper_parsing_exception)
+    """
+
+    def __init__(self, throttle_every: int = 3):
+        self.throttle_every = throttle_every
+        self.seen = set()
+        self.indexed = []
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def perform_request(self, method, url, body=None, headers=None):
+        lines = body.decode("utf-8").strip().split("\n")
+        docs = [json.loads(l) for l in lines[1::2]]
+        items = []
+        with self._lock:
+            self.calls += 1
+            for doc in docs:
+                if doc.get("bad"):
+                    items.append({"index": {"status": 400, "error": {"type": "mapper_parsing_exception"}}})
+                elif doc["n"] % self.throttle_every == 0 and doc["n"] not in self.seen:
+                    self.seen.add(doc["n"])
+                    items.append({"index": {"status": 429, "error": {"type": "too_many_requests"}}})
+                else:
+                    self.indexed.append(doc["n"])
+                    items.append({"index": {"status": 201}})
+        return {"errors": any("error" in i["index"] for i in items), "items": items}
+
+
+class FakeClient:
+    def __init__(self, transport):
+        self.transport = transport
+
+
+def _lines(n, bad=()):
+    for i in range(n):
+        doc = {"n": i, "content": "x" * 50}
+        if i in bad:
+            doc["bad"] = True
+        yield json.dumps(doc).encode("utf-8")
+
+
+def test_iter_batches_respects_byte_limit():
+    action = b'{"index":{"_index":"t"}}'
+    batches = list(iter_batches(_lines(50), action, max_batch_bytes=400))
+    assert sum(len(b) for b in batches) == 50
+    for b in batches:
+        assert len(build_payload(b, action)) <= 400 or len(b) == 1
+
+
+def test_ingest_retries_only_failed_items_and_dead_letters(tmp_path):
+    transport = FakeTransport(throttle_every=3)
+    dlq = tmp_path / "dlq.jsonl"
+    ingester = BulkIngester(
+        FakeClient(transport),
+        index_name="t",
+        concurrency=3,
+        max_batch_bytes=600,
+        backoff_base=0.001,
+        dead_letter_path=dlq,
+        progress_every=0,
+    )
+    stats = ingester.ingest_lines(_lines(40, bad={7, 11}))
+
+    assert stats.docs_ok == 38
+    assert stats.docs_failed == 2
+    assert stats.throttled > 0
+    # 재시도된 문서가 중복 적재되지 않아야 함
+    assert sorted(transport.indexed) == [i for i in range(40) if i not in (7, 11)]
+    failed = [json.loads(l)["n"] for l in dlq.read_text().splitlines()]
+    assert sorted(failed) == [7, 11]
+    assert stats.errors_by_type == {"mapper_parsing_exception": 2}
+
+
+class _TimeoutAfterIndexing(FakeTransport):
+    """첫 요청은 문서를 적재한 뒤 타임아웃(opensearch-py ConnectionTimeout 과 같은 status_code)."""
+
+    def perform_request(self, method, url, body=None, headers=None):
+        resp = super().perform_request(method, url, body, headers)
+        if self.calls == 1:
+            err = TimeoutError("read timed out")
+            err.status_code = "TIMEOUT"
+            raise err
+        return resp
+
+
+def test_ambiguous_timeout_is_dead_lettered_not_resent(tmp_path):
+    transport = _TimeoutAfterIndexing()
+    transport.seen.update(range(5))  # 429 없이 전부 적재
+    dlq = tmp_path / "dlq.jsonl"
+    ingester = BulkIngester(
+        FakeClient(transport), index_name="t", backoff_base=0.001, dead_letter_path=dlq, progress_every=0
+    )
+    stats = ingester.ingest_lines(_lines(5))
+
+    # 다시 보내면 이미 적재된 문서가 중복된다
+    assert transport.calls == 1
+    assert sorted(transport.indexed) == [0, 1, 2, 3, 4]
+    assert stats.docs_failed == 5
+    assert len(dlq.read_text().splitlines()) == 5
@@ -0,0 +1,89 @@
+# tests/test_cascade.py
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.chat_latency import synthetic_corpus
+from benchmarks.fakes import FakeOpenAI
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.cascade import FAST, LOW_CONFIDENCE_TAG, STRONG, choose_model, needs_escalation
+from llm.config import settings
+from llm.embeddings import set_openai_client
+from llm.opensearch_client import set_opensearch_client
+from llm.orchestrator import run_chat_rag
+
+
+@pytest.fixture(autouse=True)
+def cascade_settings(monkeypatch):
+    monkeypatch.setattr(settings, "cascade_enabled", True)
+    monkeypatch.setattr(settings, "cascade_self_check", True)
+    monkeypatch.setattr(settings, "openai_model_fast", "fast-model")
+    monkeypatch.setattr(settings, "openai_model_strong", "strong-model")
+    monkeypatch.setattr(settings, "cascade_min_top_score", 0.5)
+    monkeypatch.setattr(settings, "cascade_history_tokens", 1000)
+
+
+def test_choose_model_signals():
+    good = [{"id": "a", "score": 0.9}]
+    assert choose_model("non_medical").tier == FAST
+    simple = choose_model("candidate_medical", documents=good)
+    assert (simple.model, simple.self_check) == ("fast-model", True)
+
+    assert choose_model("candidate_medical", documents=[{"score": 0.2}]).reasons == ["low_retrieval"]
+    assert choose_model("candidate_medical", documents=[]).tier == STRONG
+    assert choose_model("candidate_medical", documents=good, safety_action="soft_warn").reasons == ["safety"]
+    assert choose_model("candidate_medical", documents=good, history_tokens=5000).reasons == ["long_history"]
+    # 예산 downgrade 가 캐스케이드보다 우선
+    assert choose_model("candidate_medical", budget="downgrade", documents=[]).tier == "downgrade"
+
+
+def test_needs_escalation_strips_tag():
+    assert needs_escalation(f"잘 모르겠어요. {LOW_CONFIDENCE_TAG}\n") == (True, "잘 모르겠어요.")
+    assert needs_escalation("확실해요.") == (False, "확실해요.")
+    # 태그 뒤에 뭔가 더 붙거나 모양이 조금 달라도 잡고, 항상 떼어낸다
+    assert needs_escalation(f"잘 모르겠어요 {LOW_CONFIDENCE_TAG}.\n\n출처: 약학정보원") == (
+        True, "잘 모르겠어요.\n\n출처: 약학정보원",
+    )
+    assert needs_escalation("복용량은 1정입니다. [low_confidence ]\n※ 의사와 상담하세요.") == (
+        True, "복용량은 1정입니다.\n※ 의사와 상담하세요.",
+    )
+
+
+class _UnsureFastModel(FakeOpenAI):
+    """fast 모델은 항상 [LOW_CONFIDENCE] 를 붙이는 가짜 클라이언트"""
+
+    def __init__(self):
+        super().__init__()
+        self.models = []
+        inner = self.chat.completions
+
+        def create(model, messages, **kw):
+            self.models.append(model)
+            resp = inner.create(model=model, messages=messages, **kw)
+            if model == "fast-model":
+                resp.choices[0].message.content += f" {LOW_CONFIDENCE_TAG}"
+            return resp
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+
+def test_low_confidence_answer_escalates_to_strong_model(monkeypatch):
+    monkeypatch.setattr(settings, "cascade_min_top_score", 0.0)  # 검색 신호로는 올리지 않게
+    sources, vectors = synthetic_corpus()
+    client = _UnsureFastModel()
+    set_openai_client(client)
+    set_opensearch_client(LocalOpenSearchClient(sources, vectors))
+    try:
+        payload = run_chat_rag("타이레놀 하루 최대 복용량이 궁금해요")
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+    assert client.models == ["fast-model", "strong-model"]
+    assert LOW_CONFIDENCE_TAG not in payload["answer"]
+    assert payload["debug"]["model"] == {
+        "model": "strong-model",
+        "tier": "strong",
+        "reasons": ["low_confidence"],
+    }
+    assert "llm_escalation" in payload["debug"]["timings_ms"]
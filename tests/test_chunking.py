@@ -0,0 +1,68 @@
+# tests/test_chunking.py
+from rag.chunking import build_chunk_text_to_embed, chunk_document, count_tokens, split_sections
+from llm.retriever import collapse_chunks
+
+MONOGRAPH = """타이레놀정 500mg 은 해열진통제이다.
+【효능·효과】
+감기로 인한 발열 및 동통, 두통, 치통, 근육통의 완화
+【용법·용량】
+만 12세 이상: 1회 1~2정씩 1일 3~4회 필요시 복용한다.
+■ 주의사항
+""" + ("매일 세 잔 이상 정기적으로 술을 마시는 사람은 간손상이 유발될 수 있다. " * 60)
+
+
+def test_split_sections_detects_headers():
+    titles = [t for t, _ in split_sections(MONOGRAPH)]
+    assert titles == ["", "효능·효과", "용법·용량", "주의사항"]
+
+
+def test_chunk_document_respects_token_limit_and_parent():
+    doc = {"id": "drug_1", "title": "타이레놀정", "drug_name_kor": "타이레놀", "content": MONOGRAPH, "embedding": [0.1]}
+    chunks = chunk_document(doc, max_tokens=120, overlap=20)
+
+    assert len(chunks) > 2
+    assert all(c["parent_id"] == "drug_1" for c in chunks)
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert all(count_tokens(c["content"]) <= 120 for c in chunks)
+    assert all("embedding" not in c for c in chunks)
+    # 짧은 앞쪽 섹션들은 하나로 합쳐지고, 긴 주의사항은 윈도우로 잘림
+    assert chunks[-1]["section"] == "주의사항"
+    assert build_chunk_text_to_embed(chunks[-1]).startswith("타이레놀정\n타이레놀\n주의사항")
+
+
+def test_collapse_chunks_groups_by_parent():
+    def hit(cid, parent, idx, score):
+        return {
+            "id": cid,
+            "score": score,
+            "content": f"passage {idx}",
+            "metadata": {"parent_id": parent, "chunk_index": idx, "title": parent},
+        }
+
+    docs = [hit("a#2", "a", 2, 0.9), hit("b#0", "b", 0, 0.8), hit("a#0", "a", 0, 0.7)]
+    docs.append({"id": "legacy", "score": 0.75, "content": "whole", "metadata": {}})
+
+    out = collapse_chunks(docs, top_k=2)
+    assert [d["id"] for d in out] == ["a", "b"]
+    assert out[0]["content"] == "passage 0\n...\npassage 2"
+    assert out[0]["score"] == 0.9
+    assert "parent_id" not in out[0]["metadata"]
+
+
+def test_windows_cut_at_character_boundaries(monkeypatch):
+    import tiktoken
+
+    from rag import chunking
+
+    # cl100k 는 오프라인에서 못 받으므로 바이트 단위 BPE (한글 1글자 = 3토큰) 로 같은 경계 문제를 재현
+    byte_level = tiktoken.Encoding(
+        "byte_level", pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={}
+    )
+    monkeypatch.setattr(chunking, "_get_encoder", lambda: byte_level)
+
+    text = "간손상이 유발될 수 있다. " * 20
+    windows = chunking._windows(text, max_tokens=50, overlap=10)
+    assert len(windows) > 3
+    assert all("�" not in w for w in windows)
+    assert all(w in text for w in windows)
+    assert all(count_tokens(w) <= 50 for w in windows)
@@ -0,0 +1,41 @@
+# tests/test_deadline.py
+import time
+
+import pytest
+
+from llm.config import settings
+from llm.deadline import DeadlineExceeded, deadline_scope, remaining, stage_timeout
+from llm.hedging import HEDGES, hedged
+
+
+def test_stage_timeout_is_capped_by_request_deadline():
+    assert stage_timeout(3.0) == 3.0  # 데드라인 없으면 상한 그대로
+    with deadline_scope(1.0):
+        assert stage_timeout(3.0) <= 1.0
+        with deadline_scope(10.0):  # 안쪽이 더 길어도 바깥 데드라인 유지
+            assert remaining() <= 1.0
+    with deadline_scope(0.01):
+        time.sleep(0.02)
+        with pytest.raises(DeadlineExceeded):
+            stage_timeout(3.0, "knn")
+
+
+def test_hedged_request_wins_over_slow_primary(monkeypatch):
+    monkeypatch.setattr(settings, "hedge_enabled", True)
+    monkeypatch.setattr(settings, "hedge_delay_ms", 20.0)
+    calls = []
+
+    def search():
+        calls.append(1)
+        # 첫 요청만 느림
+        time.sleep(0.5 if len(calls) == 1 else 0.0)
+        return len(calls)
+
+    before = HEDGES.value(stage="test_knn", result="won")
+    start = time.perf_counter()
+    assert hedged("test_knn", search, timeout=2.0) == 2
+    assert time.perf_counter() - start < 0.3
+    assert HEDGES.value(stage="test_knn", result="won") - before == 1
+
+    with pytest.raises(DeadlineExceeded):
+        hedged("test_knn_slow", lambda: time.sleep(0.3), timeout=0.05)
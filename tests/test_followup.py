@@ -0,0 +1,88 @@
+# tests/test_followup.py
+import pytest
+
+from benchmarks.chat_latency import synthetic_corpus
+from benchmarks.fakes import FakeOpenAI
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.config import settings
+from llm.embeddings import set_openai_client
+from llm.followup import FOLLOWUPS, LastRetrieval, detect_followup, rerank_followup
+from llm.opensearch_client import set_opensearch_client
+from llm.orchestrator import run_chat_rag
+from llm.session_store import MemorySessionStore, set_session_store
+
+DOCS = [
+    {"id": "a", "title": "타이레놀 효능·효과", "content": "타이레놀은 해열·진통에 쓴다.", "score": 0.9},
+    {"id": "b", "title": "타이레놀 부작용", "content": "타이레놀 부작용으로 간 손상이 있다.", "score": 0.8},
+]
+
+
+@pytest.fixture(autouse=True)
+def followup_settings(monkeypatch):
+    monkeypatch.setattr(settings, "followup_enabled", True)
+    monkeypatch.setattr(settings, "followup_similarity", 0.85)
+    monkeypatch.setattr(settings, "followup_min_overlap", 0.5)
+    FOLLOWUPS.clear()
+    yield
+    FOLLOWUPS.clear()
+
+
+def test_detect_followup_heuristics_and_similarity():
+    last = LastRetrieval("타이레놀 효능이 뭐예요?", [1.0, 0.0], DOCS, 0.0)
+    assert detect_followup("그럼 부작용은?", last) == "anaphora"
+    assert detect_followup("그 약 먹어도 돼요?", last) == "anaphora"
+    assert detect_followup("부작용은?", last) == "ellipsis"
+    # 캐시 문서에 없는 새 약 이름은 생략형이어도 새로 검색
+    assert detect_followup("아스피린은?", last) is None
+    assert detect_followup("아스피린 복용법 알려주세요", last, [0.0, 1.0]) is None
+    assert detect_followup("타이레놀 효능 알려줘요", last, [0.99, 0.05]) == "similar"
+    assert detect_followup("그럼 부작용은?", None) is None
+
+
+def test_connective_with_new_drug_name_is_not_followup():
+    last = LastRetrieval("타이레놀 효능이 뭐예요?", [1.0, 0.0], DOCS, 0.0)
+    assert detect_followup("근데 와파린이랑 아스피린 같이 먹어도 돼?", last) is None
+    assert detect_followup("그리고 고혈압약은 언제 먹어요?", last) is None
+    assert detect_followup("또 이부프로펜 복용량은?", last) is None
+    # 지시어가 있어도 새 약 이름이면 새로 검색, 직전 약 이름이면 재사용
+    assert detect_followup("그럼 아스피린은요?", last) is None
+    assert detect_followup("그럼 타이레놀 부작용은?", last) == "anaphora"
+    assert detect_followup("타이레놀이랑 이부프로펜 비교", last, [0.99, 0.05]) is None
+
+
+def test_rerank_followup_prefers_overlap_without_touching_scores():
+    ranked = rerank_followup("부작용은?", DOCS)
+    assert [d["id"] for d in ranked] == ["b", "a"]
+    assert [d["score"] for d in ranked] == [0.8, 0.9]
+
+
+class _CountingClient(LocalOpenSearchClient):
+    searches = 0
+
+    def search(self, *args, **kwargs):
+        type(self).searches += 1
+        return super().search(*args, **kwargs)
+
+
+def test_followup_turn_reuses_previous_retrieval():
+    sources, vectors = synthetic_corpus()
+    client = _CountingClient(sources, vectors)
+    _CountingClient.searches = 0
+    set_openai_client(FakeOpenAI())
+    set_opensearch_client(client)
+    set_session_store(MemorySessionStore())
+    try:
+        first = run_chat_rag("타이레놀 용법·용량이 궁금해요", session_id="s-follow")
+        second = run_chat_rag("그럼 부작용은?", session_id="s-follow")
+        # 익명 요청은 이어지는 대화를 알 수 없으므로 항상 새로 검색
+        run_chat_rag("그럼 부작용은?")
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+        set_session_store(None)
+
+    assert _CountingClient.searches == 2
+    assert first["debug"]["followup"] is None
+    assert second["debug"]["followup"] == "anaphora"
+    assert "followup_rerank" in second["debug"]["timings_ms"]
+    assert {d["id"] for d in second["debug"]["ranked_docs"]} == {d["id"] for d in first["debug"]["ranked_docs"]}
@@ -0,0 +1,31 @@
+# tests/test_formatter.py
+from llm.utils.formatter import build_response_payload
+
+DOCS = [
+    {
+        "id": "drug_1",
+        "title": "타이레놀정",
+        "doc_type": "drug",
+        "score": 0.91,
+        "content": "아세트아미노펜 " * 200,
+        "metadata": {"detail_url": "https://example.com/1", "raw": "x" * 1000},
+    }
+]
+DEBUG = {"query": "q", "raw_docs": DOCS, "ranked_docs": DOCS, "timings_ms": {"total": 1.0}}
+
+
+def test_citation_whitelist_and_ids_debug_level():
+    payload = build_response_payload(
+        "답변", DOCS, debug=DEBUG, debug_level="ids", citation_fields="rank,id,detail_url"
+    )
+    assert payload["citations"] == [{"rank": 1, "id": "drug_1", "detail_url": "https://example.com/1"}]
+    assert payload["debug"]["ranked_docs"] == [{"id": "drug_1", "score": 0.91}]
+    assert payload["debug"]["timings_ms"] == {"total": 1.0}
+    # 원본 debug 는 건드리지 않는다
+    assert DEBUG["raw_docs"][0]["content"]
+
+
+def test_debug_level_off_and_full():
+    assert build_response_payload("a", DOCS, debug=DEBUG, debug_level="off")["debug"] == {}
+    full = build_response_payload("a", DOCS, debug=DEBUG, debug_level="full")["debug"]
+    assert full["raw_docs"][0]["content"] == DOCS[0]["content"]
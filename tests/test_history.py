@@ -0,0 +1,83 @@
+# tests/test_history.py
+import threading
+
+from llm.history import HistoryCompactor, history_tokens
+from llm.prompts import build_messages
+
+
+def _conversation(turns: int):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"{i}번째 질문: 타이레놀이랑 같이 먹어도 되나요? " * 5})
+        history.append({"role": "assistant", "content": f"{i}번째 답변: 복용 간격을 지켜 주세요. " * 5})
+    return history
+
+
+class _FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, previous, turns):
+        self.calls.append((previous, len(turns)))
+        return f"{previous or ''}+{len(turns)}"
+
+
+def test_long_history_is_folded_in_background_and_reused():
+    summarize = _FakeSummarizer()
+    compactor = HistoryCompactor(summarize, trigger_tokens=300, keep_recent=4)
+    history = _conversation(6)  # 12 턴
+    assert history_tokens(history) > 300
+
+    # 첫 턴: 요약이 아직 없으므로 요약 없이 trim 된 이력, 백그라운드로 앞 8턴 요약 예약
+    summary, recent = compactor.compact("s1", history)
+    assert summary is None and recent
+    compactor.flush(timeout=5)
+    assert summarize.calls == [(None, 8)]
+
+    # 다음 턴: 캐시된 요약 + 요약 이후 턴만, 새로 밀려난 2턴만 기존 요약에 이어서 요약
+    history += _conversation(1)
+    summary, recent = compactor.compact("s1", history)
+    assert summary == "+8"
+    assert recent == history[8:]
+    compactor.flush(timeout=5)
+    assert summarize.calls == [(None, 8), ("+8", 2)]
+    assert compactor.compact("s1", history)[0] == "+8+2"
+
+
+def test_summary_is_dropped_when_session_history_changes():
+    compactor = HistoryCompactor(_FakeSummarizer(), trigger_tokens=300, keep_recent=4)
+    history = _conversation(6)
+    compactor.compact("s1", history)
+    compactor.flush(timeout=5)
+    assert compactor.compact("s1", history)[0] is not None
+
+    other = _conversation(6)
+    other[0] = {"role": "user", "content": "완전히 다른 대화"}
+    assert compactor.compact("s1", other)[0] is None
+
+
+def test_short_history_skips_summary_and_one_job_per_session():
+    release = threading.Event()
+
+    def slow(previous, turns):
+        release.wait(5)
+        return "요약"
+
+    compactor = HistoryCompactor(slow, trigger_tokens=300, keep_recent=4)
+    assert compactor.compact("s1", _conversation(1)) == (None, _conversation(1))
+
+    history = _conversation(6)
+    compactor.compact("s1", history)
+    compactor.compact("s1", history)  # 진행 중이면 다시 예약하지 않음
+    assert len(compactor._pending) == 1
+    release.set()
+    compactor.flush(timeout=5)
+    assert not compactor._pending
+
+
+def test_summary_goes_before_recent_history_in_prompt():
+    messages = build_messages(
+        "system", "질문", history=[{"role": "user", "content": "최근"}], history_summary="요약본"
+    )
+    assert [m["role"] for m in messages] == ["system", "system", "user", "user"]
+    assert "요약본" in messages[1]["content"]
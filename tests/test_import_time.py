@@ -0,0 +1,33 @@
+# tests/test_import_time.py
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.import_time import ROOT, profile_import, summarize
+
+# 지연 import 전 llm.orchestrator 는 ~1.3s (대부분 openai / opensearchpy). 지금은 ~0.15s.
+# CI 머신 편차를 감안해 넉넉하게 잡되, SDK 가 다시 import 시점에 끌려오면 걸리는 수준.
+IMPORT_BUDGET_MS = 800
+
+
+@pytest.mark.parametrize("module", ["llm.orchestrator", "llm.graph_orchestrator"])
+def test_chat_modules_do_not_import_heavy_sdks(module):
+    summary = summarize(module, profile_import(module))
+    assert summary["heavy_loaded"] == [], summary["top"][:10]
+
+
+def test_orchestrator_import_time_budget():
+    best = min(summarize("llm.orchestrator", profile_import("llm.orchestrator"))["total_ms"] for _ in range(2))
+    assert best < IMPORT_BUDGET_MS
+
+
+def test_openai_sdk_loads_on_first_client_build():
+    code = (
+        "import sys, llm.embeddings as e\n"
+        "assert 'openai' not in sys.modules\n"
+        "e._build_openai_client()\n"
+        "assert 'openai' in sys.modules\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr[-2000:]
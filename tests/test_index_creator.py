@@ -0,0 +1,89 @@
+# tests/test_index_creator.py
+from types import SimpleNamespace
+
+import pytest
+from opensearchpy.exceptions import NotFoundError
+
+import rag.ingest_jsonl
+from benchmarks.chat_latency import synthetic_corpus
+from benchmarks.fakes import FakeOpenAI
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.config import settings
+from llm.embeddings import set_openai_client
+from rag import index_creator
+
+
+class _AliasClient(LocalOpenSearchClient):
+    """_alias 조회 / _aliases 교체만 흉내. fail_alias 로 alias 경유 검색이 실패하게 할 수 있다."""
+
+    def __init__(self, sources, vectors, aliases):
+        super().__init__(sources, vectors)
+        self.aliases = aliases  # alias → {index}
+        self.fail_alias = None
+        self.transport = SimpleNamespace(perform_request=self._request)
+
+    def _request(self, method, path, body=None):
+        if method == "GET" and path.startswith("/_alias/"):
+            targets = self.aliases.get(path[len("/_alias/"):])
+            if not targets:
+                raise NotFoundError(404, "alias_not_found")
+            return {idx: {"aliases": {}} for idx in targets}
+        if method == "POST" and path == "/_aliases":
+            for action in body["actions"]:
+                (op, spec), = action.items()
+                targets = self.aliases.setdefault(spec["alias"], set())
+                (targets.add if op == "add" else targets.discard)(spec["index"])
+            return {"acknowledged": True}
+        raise AssertionError(f"unexpected request {method} {path}")
+
+    def search(self, index="", body=None, **kw):
+        if index == self.fail_alias:
+            raise PermissionError("403 Forbidden")
+        return super().search(index=index, body=body, **kw)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    sources, vectors = synthetic_corpus()
+    c = _AliasClient(sources, vectors, {"medinote": {"medinote_old"}})
+    monkeypatch.setattr(index_creator, "get_opensearch_client", lambda: c)
+    monkeypatch.setattr(index_creator, "create_index", lambda client=None: "medinote_new")
+    monkeypatch.setattr(
+        rag.ingest_jsonl, "bulk_ingest", lambda index_name, input_path: SimpleNamespace(docs_ok=len(sources))
+    )
+    monkeypatch.setattr(index_creator, "load_validation_queries", lambda: [{"query": "타이레놀 용법", "min_hits": 1}])
+    set_openai_client(FakeOpenAI())
+    yield c
+    set_openai_client(None)
+
+
+def test_retriever_reads_index_until_alias_is_configured(monkeypatch):
+    monkeypatch.setattr(settings, "opensearch_read_alias", "")
+    assert settings.opensearch_search_index == settings.opensearch_index
+    monkeypatch.setattr(settings, "opensearch_read_alias", index_creator.READ_ALIAS)
+    assert settings.opensearch_search_index == index_creator.READ_ALIAS
+
+
+def test_blue_green_swaps_alias(client):
+    assert index_creator.blue_green_build(alias="medinote") == "medinote_new"
+    assert client.aliases["medinote"] == {"medinote_new"}
+
+
+def test_blue_green_rolls_back_when_smoke_query_raises(client):
+    client.fail_alias = "medinote"
+    assert index_creator.blue_green_build(alias="medinote") is None
+    assert client.aliases["medinote"] == {"medinote_old"}
+
+
+def test_validation_waits_for_docs_to_become_searchable(monkeypatch):
+    counts = iter([0, 40, 100])
+    monkeypatch.setattr(index_creator, "count_docs", lambda client, index_name: next(counts))
+    monkeypatch.setattr(index_creator.time, "sleep", lambda sec: None)
+    assert index_creator.run_validation(None, "medinote_new", [], expected_docs=100)
+
+
+def test_wait_for_count_stops_when_count_is_stable(monkeypatch):
+    counts = iter([0, 0, 95, 95, 95, 100])
+    monkeypatch.setattr(index_creator, "count_docs", lambda client, index_name: next(counts))
+    monkeypatch.setattr(index_creator.time, "sleep", lambda sec: None)
+    assert index_creator.wait_for_count(None, "medinote_new", 100) == 95
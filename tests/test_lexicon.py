@@ -0,0 +1,140 @@
+# tests/test_lexicon.py
+import json
+import time
+
+import pytest
+
+from benchmarks.fakes import FakeOpenAI, hash_embedding
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.config import settings
+from llm.embeddings import set_openai_client
+from llm.lexicon import Lexicon, base_names, build_entries, knn_filter, load_lexicon, set_lexicon
+from llm.opensearch_client import set_opensearch_client
+from llm.retriever import retrieve_documents
+
+CORPUS = [
+    {"id": "d1", "doc_type": "drug", "drug_name_kor": "타이레놀정500밀리그람", "drug_name_eng": "Tylenol Tab. 500mg",
+     "content": "해열 진통제. 하루 최대 4g."},
+    {"id": "d2", "doc_type": "drug", "drug_name_kor": "아스피린프로텍트정100밀리그램", "content": "항혈소판제."},
+    {"id": "s1", "doc_type": "disease", "disease_name_kor": "편두통", "disease_name_eng": "Migraine",
+     "content": "한쪽 머리가 욱신거리는 두통."},
+]
+
+
+@pytest.fixture
+def lexicon():
+    lex = Lexicon(build_entries(CORPUS))
+    set_lexicon(lex)
+    yield lex
+    set_lexicon(None)
+
+
+def test_base_names_strip_strength_and_form():
+    assert base_names("drug_name_kor", "타이레놀정500밀리그람") == ["타이레놀정500밀리그람", "타이레놀"]
+    assert base_names("drug_name_eng", "Tylenol Tab. 500mg") == ["tylenoltab.500mg", "tylenol"]
+    assert base_names("disease_name_kor", "편두통") == ["편두통"]
+
+
+def test_detect_longest_match_with_positions(lexicon):
+    query = "타이레놀 먹으면 편 두통에도 좋나요? tylenol"
+    ents = lexicon.detect(query)
+    assert [(e.text, e.kind) for e in ents] == [("타이레놀", "drug"), ("편 두통", "disease"), ("tylenol", "drug")]
+    assert query[ents[1].start : ents[1].end] == "편 두통"
+    assert lexicon.detect("감기에 좋은 차") == []
+
+    filt = knn_filter(ents[:1])
+    assert filt == {
+        "bool": {
+            "should": [{"terms": {"drug_name_kor.keyword": ["타이레놀정500밀리그람"]}}],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+def test_detect_requires_word_boundaries():
+    lex = Lexicon([
+        {"key": "감기", "field": "disease_name_kor", "value": "감기"},
+        {"key": "소화", "field": "drug_name_kor", "value": "소화정"},
+        {"key": "tylenol", "field": "drug_name_eng", "value": "Tylenol"},
+    ])
+    # 다른 단어 안에 걸친 짧은 이름은 무시
+    assert lex.detect("소화불량이 심해요") == []
+    assert lex.detect("독감기운이 있어요") == []
+    assert lex.detect("감기약 추천") == []
+    assert lex.detect("tylenolx") == []
+    # 조사 / 공백 / 기호 / 다른 문자 체계 경계는 허용
+    assert [e.text for e in lex.detect("감기에 좋은 약, 소화가 안 돼요")] == ["감기", "소화"]
+    assert [e.text for e in lex.detect("Tylenol이랑 감기")] == ["Tylenol", "감기"]
+
+
+def test_load_lexicon_missing_file_is_empty(tmp_path):
+    assert len(load_lexicon(str(tmp_path / "none.json"))) == 0
+    path = tmp_path / "lexicon.json"
+    path.write_text(json.dumps({"version": 1, "entries": build_entries(CORPUS)}, ensure_ascii=False), encoding="utf-8")
+    assert len(load_lexicon(str(path))) == len(Lexicon(build_entries(CORPUS)))
+
+
+class _Client(LocalOpenSearchClient):
+    def __init__(self, sources, vectors):
+        super().__init__(sources, vectors)
+        self.filters = []
+
+        self.timeouts = []
+        self.filter_delay = 0.0
+
+    def search(self, *args, **kwargs):
+        filt = kwargs["body"]["query"]["knn"]["embedding"].get("filter")
+        self.filters.append(filt)
+        self.timeouts.append(kwargs.get("request_timeout"))
+        if filt is not None and self.filter_delay:
+            time.sleep(self.filter_delay)
+        return super().search(*args, **kwargs)
+
+
+def _retrieve(query, mode, monkeypatch, filter_delay=0.0):
+    monkeypatch.setattr(settings, "lexicon_mode", mode)
+    monkeypatch.setattr(settings, "multi_query_enabled", False)
+    fake = FakeOpenAI()
+    sources = [{k: v for k, v in d.items()} for d in CORPUS]
+    client = _Client(sources, [hash_embedding(d["content"], fake.dim) for d in CORPUS])
+    client.filter_delay = filter_delay
+    set_openai_client(fake)
+    set_opensearch_client(client)
+    try:
+        return retrieve_documents(query, top_k=3), client
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+
+def test_filter_mode_restricts_candidates_and_falls_back(lexicon, monkeypatch):
+    docs, client = _retrieve("타이레놀 최대 용량은?", "filter", monkeypatch)
+    assert [d["id"] for d in docs] == ["d1"]
+    assert client.filters[0] is not None and len(client.filters) == 1
+
+    # 사전에 없는 이름이면 필터 없이 검색
+    docs, client = _retrieve("감기약 추천", "filter", monkeypatch)
+    assert client.filters == [None] and len(docs) == 3
+
+
+def test_boost_mode_moves_matching_doc_up(lexicon, monkeypatch):
+    plain, _ = _retrieve("아스피린프로텍트 먹어도 되나요", "off", monkeypatch)
+    boosted, client = _retrieve("아스피린프로텍트 먹어도 되나요", "boost", monkeypatch)
+    assert client.filters == [None]
+    top = next(d for d in boosted if d["id"] == "d2")
+    assert top.get("entity_match") is True
+    base = next(d for d in plain if d["id"] == "d2")
+    assert top["score"] == pytest.approx(base["score"] * (1 + settings.lexicon_boost))
+
+
+def test_filter_fallback_shares_one_knn_timeout(monkeypatch):
+    # 사전에는 있지만 코퍼스에 없는 이름 → 필터 검색 결과가 비어서 필터 없이 다시 검색
+    set_lexicon(Lexicon([{"key": "없는약", "field": "drug_name_kor", "value": "없는약정"}]))
+    monkeypatch.setattr(settings, "knn_timeout_sec", 1.0)
+    try:
+        docs, client = _retrieve("없는약 부작용", "filter", monkeypatch, filter_delay=0.3)
+    finally:
+        set_lexicon(None)
+    assert client.filters[0] is not None and client.filters[1] is None and docs
+    # 재검색은 필터 검색이 쓴 시간을 뺀 나머지 안에서만
+    assert client.timeouts[1] <= 1.0 - 0.3 + 0.05
@@ -0,0 +1,102 @@
+# tests/test_multi_query.py
+import time
+
+import pytest
+
+from benchmarks.chat_latency import synthetic_corpus
+from benchmarks.fakes import FakeOpenAI, hash_embedding
+from benchmarks.local_index import LocalOpenSearchClient
+from llm.config import settings
+from llm.embeddings import set_openai_client
+from llm.opensearch_client import set_opensearch_client
+from llm.query_rewrite import rewrite_query
+from llm.retriever import retrieve_documents, rrf_fuse
+
+QUERY = "머리 아플 때 타이레놀 몇 알 먹어요?"
+
+
+@pytest.fixture(autouse=True)
+def multi_query(monkeypatch):
+    monkeypatch.setattr(settings, "multi_query_enabled", True)
+    monkeypatch.setattr(settings, "multi_query_max", 4)
+    monkeypatch.setattr(settings, "multi_query_grace_ms", 30)
+    monkeypatch.setattr(settings, "hedge_enabled", False)
+
+
+def test_rewrite_query_clinical_entities_english():
+    assert rewrite_query(QUERY) == [
+        QUERY,
+        "두통 때 타이레놀 용법·용량 먹어요?",
+        "두통 타이레놀 용법·용량",
+        "headache Tylenol acetaminophen dosage",
+    ]
+    assert rewrite_query(QUERY, max_queries=2) == rewrite_query(QUERY)[:2]
+    # 바꿀 게 없으면 원문만
+    assert rewrite_query("안녕하세요") == ["안녕하세요"]
+
+
+def test_rrf_fuse_rewards_docs_found_by_several_queries():
+    a = [{"id": "x", "score": 0.9}, {"id": "y", "score": 0.8}]
+    b = [{"id": "y", "score": 0.85}, {"id": "z", "score": 0.7}]
+    fused = rrf_fuse([a, b], top_k=2)
+    assert [d["id"] for d in fused] == ["y", "x"]
+    assert fused[0]["score"] == 0.85 and fused[0]["rrf_score"] > fused[1]["rrf_score"]
+
+
+class _Client(LocalOpenSearchClient):
+    """slow_except 벡터가 아닌 검색은 delay 초 지연"""
+
+    def __init__(self, sources, vectors, slow_except=None, delay=0.0):
+        super().__init__(sources, vectors)
+        self.calls = 0
+        self.slow_except = slow_except
+        self.delay = delay
+
+    def search(self, *args, **kwargs):
+        self.calls += 1
+        vector = kwargs["body"]["query"]["knn"]["embedding"]["vector"]
+        if self.slow_except is not None and vector != self.slow_except:
+            time.sleep(self.delay)
+        return super().search(*args, **kwargs)
+
+
+class _CountingOpenAI(FakeOpenAI):
+    def __init__(self):
+        super().__init__()
+        self.embed_calls = 0
+        inner = self.embeddings.create
+
+        def create(model, input, **kw):
+            self.embed_calls += 1
+            return inner(model=model, input=input, **kw)
+
+        self.embeddings.create = create
+
+
+def _run(client, openai):
+    set_openai_client(openai)
+    set_opensearch_client(client)
+    try:
+        return retrieve_documents(QUERY, top_k=5)
+    finally:
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+
+def test_fanout_embeds_once_and_searches_concurrently():
+    sources, vectors = synthetic_corpus()
+    client, openai = _Client(sources, vectors), _CountingOpenAI()
+    docs = _run(client, openai)
+    assert openai.embed_calls == 1
+    assert client.calls == 4
+    assert len(docs) == 5 and all("rrf_score" in d for d in docs)
+
+
+def test_slow_rewrites_are_dropped_after_grace():
+    sources, vectors = synthetic_corpus()
+    original = [float(x) for x in hash_embedding(QUERY, FakeOpenAI().dim)]
+    client = _Client(sources, vectors, slow_except=original, delay=0.5)
+    start = time.perf_counter()
+    docs = _run(client, FakeOpenAI())
+    assert time.perf_counter() - start < 0.4
+    assert len(docs) == 5
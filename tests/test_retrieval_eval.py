@@ -0,0 +1,73 @@
+# tests/test_retrieval_eval.py
+import json
+
+import pytest
+
+from benchmarks.fakes import hash_embedding
+from benchmarks.local_index import load_corpus
+from benchmarks.retrieval_eval import (
+    CachedEmbeddingClient,
+    EmbeddingCache,
+    LocalOpenSearchClient,
+    compare_to_baseline,
+    evaluate,
+    ndcg_at_k,
+    reciprocal_rank,
+    recall_at_k,
+)
+
+CORPUS = [
+    {"id": "drug_tylenol", "title": "타이레놀정 아세트아미노펜 해열진통제"},
+    {"id": "drug_aspirin", "title": "아스피린 프로텍트 혈전 예방"},
+    {"id": "drug_ibuprofen", "title": "이부프로펜 소염진통제 부루펜"},
+    {"id": "disease_gerd", "title": "역류성 식도염 속쓰림 위산 역류"},
+    {"id": "disease_diabetes", "title": "당뇨병 혈당 인슐린"},
+]
+
+GOLDEN = [
+    {"query": "타이레놀 아세트아미노펜", "relevant_ids": ["drug_tylenol"]},
+    {"query": "역류성 식도염 속쓰림", "relevant_ids": ["disease_gerd"]},
+    {"query": "당뇨병 혈당", "relevant_ids": ["disease_diabetes"]},
+]
+
+
+def test_metrics():
+    assert recall_at_k(["a", "b", "c"], ["b", "z"], 2) == 0.5
+    assert reciprocal_rank(["a", "b", "c"], ["c"]) == pytest.approx(1 / 3)
+    assert ndcg_at_k(["a", "b"], {"a": 1.0}, 2) == 1.0
+    assert ndcg_at_k(["b", "a"], {"a": 1.0}, 2) < 1.0
+    assert compare_to_baseline({"mrr": 0.5}, {"mrr": 0.6}, 0.05) == ["mrr: 0.6000 → 0.5000"]
+
+
+def test_evaluate_offline_is_deterministic(tmp_path):
+    corpus_path = tmp_path / "corpus.jsonl"
+    with corpus_path.open("w", encoding="utf-8") as f:
+        for doc in CORPUS:
+            row = dict(doc, content=doc["title"], embedding=hash_embedding(doc["title"]))
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    sources, vectors = load_corpus(corpus_path)
+    client = LocalOpenSearchClient(sources, vectors)
+    cache = EmbeddingCache(tmp_path / "cache.json")
+    embedder = CachedEmbeddingClient(cache, hash_embedding)
+
+    first = evaluate(client, GOLDEN, embedder, ks=[1, 3])
+    cache.save()
+    assert first["metrics"]["recall@3"] == 1.0
+    assert first["metrics"]["mrr"] > 0.5
+    assert cache.misses == len(GOLDEN)
+
+    # 두 번째 실행은 캐시만 사용 → 결과 동일
+    cache2 = EmbeddingCache(tmp_path / "cache.json")
+    second = evaluate(client, GOLDEN, CachedEmbeddingClient(cache2, lambda t: pytest.fail("cache miss")), ks=[1, 3])
+    assert second["metrics"] == first["metrics"]
+    assert cache2.hits == len(GOLDEN)
+
+
+def test_offline_vectors_are_not_served_to_live_runs(tmp_path):
+    offline = EmbeddingCache(tmp_path / "cache.json", embedder="offline-hash-8")
+    offline.get_or_compute("m", "타이레놀", lambda t: [0.0] * 8)
+    offline.save()
+    live = EmbeddingCache(tmp_path / "cache.json", embedder="live")
+    assert live.get_or_compute("m", "타이레놀", lambda t: [1.0] * 8) == [1.0] * 8
+    assert live.misses == 1
@@ -0,0 +1,147 @@
+# tests/test_session_store.py
+import time
+
+import pytest
+
+from llm import history as history_mod
+from llm.session_store import (
+    MemorySessionStore,
+    SessionOwnershipError,
+    SqliteSessionStore,
+    session_history,
+    set_session_store,
+)
+
+
+def _turn(i):
+    return [
+        {"role": "user", "content": f"{i}번째 질문: 혈압약을 아침에 먹어야 하나요? " * 4},
+        {"role": "assistant", "content": f"{i}번째 답변: 처방받은 시간에 맞춰 드세요. " * 4},
+    ]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore(max_sessions=2, max_turns=6, ttl_sec=60)
+    return SqliteSessionStore(str(tmp_path / "sessions.sqlite3"), max_turns=6, ttl_sec=60)
+
+
+def test_append_caches_token_counts_and_bounds_turns(store):
+    assert store.get("s1") is None
+    for i in range(4):
+        store.append("s1", "u1", _turn(i))
+    session = store.get("s1")
+    assert session.user_id == "u1"
+    assert len(session.turns) == 6 and session.base == 2  # 오래된 1턴(2메시지) 잘림
+    assert session.turns[0]["content"].startswith("1번째 질문")
+    assert len(session.token_counts) == 6 and all(n > 0 for n in session.token_counts)
+
+    # 요약 반영은 시작 시점 상태가 그대로일 때만, 없는 세션은 만들지 않는다
+    store.update("s1", lambda s: s.apply_summary("요약", 0, 4))
+    store.update("s1", lambda s: s.apply_summary("늦게 온 요약", 0, 6))
+    assert store.get("s1").summary == "요약"
+    assert store.update("nope", lambda s: s.apply_summary("x", 0, 2), create=False) is None
+    assert store.get("nope") is None
+
+
+def test_append_rejects_other_users_session(store):
+    store.append("s1", "u1", _turn(0))
+    with pytest.raises(SessionOwnershipError):
+        store.append("s1", "u2", _turn(1))
+    with pytest.raises(SessionOwnershipError):
+        store.append("s1", None, _turn(1))
+    session = store.get("s1")
+    assert len(session.turns) == 2
+    assert session.owned_by("u1") and not session.owned_by("u2")
+
+
+def test_memory_store_is_lru_and_expires():
+    store = MemorySessionStore(max_sessions=2, max_turns=10, ttl_sec=60)
+    for sid in ("a", "b"):
+        store.append(sid, None, _turn(0))
+    store.get("a")  # a 최근 사용 → b 가 밀려남
+    store.append("c", None, _turn(0))
+    assert store.get("b") is None and store.get("a") is not None
+
+    store.update("a", lambda s: setattr(s, "updated_at", time.time() - 120))
+    assert store.get("a") is None
+
+
+def test_session_history_folds_in_background(monkeypatch):
+    store = MemorySessionStore(max_turns=100)
+    set_session_store(store)
+    monkeypatch.setattr(history_mod.COMPACTOR, "summarize", lambda prev, turns: f"{prev or ''}+{len(turns)}")
+    monkeypatch.setattr(history_mod.COMPACTOR, "trigger_tokens", 200)
+    monkeypatch.setattr(history_mod.COMPACTOR, "keep_recent", 2)
+    try:
+        for i in range(5):
+            store.append("s1", None, _turn(i))
+        summary, recent = session_history("s1", store.get("s1"))
+        assert summary is None and recent
+        history_mod.COMPACTOR.flush(timeout=5)
+
+        summary, recent = session_history("s1", store.get("s1"))
+        assert summary == "+8"
+        assert recent == store.get("s1").turns[8:]
+    finally:
+        set_session_store(None)
+
+
+def test_chat_api_keeps_history_server_side():
+    from fastapi.testclient import TestClient
+
+    from api.main import app
+    from benchmarks.chat_latency import synthetic_corpus
+    from benchmarks.fakes import FakeOpenAI
+    from benchmarks.local_index import LocalOpenSearchClient
+    from llm.embeddings import set_openai_client
+    from llm.opensearch_client import set_opensearch_client
+
+    store = MemorySessionStore()
+    set_session_store(store)
+    sources, vectors = synthetic_corpus()
+    set_openai_client(FakeOpenAI())
+    set_opensearch_client(LocalOpenSearchClient(sources, vectors))
+    try:
+        with TestClient(app) as c:
+            for q in ("타이레놀 복용량이 궁금해요", "술 마신 다음 날도 괜찮나요?"):
+                assert c.post("/v1/chat", json={"query": q, "session_id": "abc"}).status_code == 200
+            # history 를 같이 보내면 클라이언트 이력 모드 (저장하지 않음)
+            c.post("/v1/chat", json={"query": "감기약", "session_id": "abc", "history": []})
+        turns = store.get("abc").turns
+        assert [t["role"] for t in turns] == ["user", "assistant"] * 2
+        assert turns[2]["content"] == "술 마신 다음 날도 괜찮나요?"
+    finally:
+        set_session_store(None)
+        set_openai_client(None)
+        set_opensearch_client(None)
+
+
+def test_chat_ignores_session_owned_by_another_user():
+    from benchmarks.fakes import FakeOpenAI
+    from llm.embeddings import set_openai_client
+    from llm.orchestrator import run_chat_rag
+
+    store = MemorySessionStore()
+    set_session_store(store)
+    fake = FakeOpenAI()
+    prompts = []
+    inner = fake.chat.completions.create
+
+    def create(model, messages, **kw):
+        prompts.append(" ".join(str(m.get("content", "")) for m in messages))
+        return inner(model=model, messages=messages, **kw)
+
+    fake.chat.completions.create = create
+    set_openai_client(fake)
+    try:
+        run_chat_rag("안녕하세요, 저는 우울증 약을 먹고 있어요", user_id="owner", session_id="shared")
+        run_chat_rag("안녕하세요", user_id="intruder", session_id="shared")
+    finally:
+        set_session_store(None)
+        set_openai_client(None)
+
+    # 다른 사용자의 이력은 프롬프트에 들어가지 않고, 그 세션에 턴이 추가되지도 않는다
+    assert "우울증" not in prompts[-1]
+    assert len(store.get("shared").turns) == 2
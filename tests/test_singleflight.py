@@ -0,0 +1,66 @@
+# tests/test_singleflight.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from llm.deadline import DeadlineExceeded, deadline_scope
+from llm.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+    start = threading.Barrier(8)
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return ["doc"]
+
+    def worker(_):
+        start.wait()
+        return flight.do("same-query", slow, clone=list)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(worker, range(8)))
+
+    assert len(calls) == 1
+    assert all(r == ["doc"] for r in results)
+    # 팔로워는 복사본을 받는다
+    assert len({id(r) for r in results}) > 1
+    assert flight.in_flight() == 0
+
+
+def test_leader_error_propagates_and_next_call_retries():
+    flight = SingleFlight("test")
+
+    def boom():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_follower_gives_up_at_its_own_deadline():
+    flight = SingleFlight("test")
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.5)
+        return "done"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        leader = pool.submit(flight.do, "k", slow)
+        started.wait()
+        begin = time.perf_counter()
+        with deadline_scope(0.1), pytest.raises(DeadlineExceeded):
+            flight.do("k", slow)
+        assert time.perf_counter() - begin < 0.3
+        # 스테이지 상한(timeout)도 적용
+        with pytest.raises(DeadlineExceeded):
+            flight.do("k", slow, timeout=0.1)
+        assert leader.result() == "done"
@@ -1 +1,117 @@
 ﻿# STT 테스트
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.fakes import STT_VOCAB, FakeOpenAI, LatencyModel, synth_speech
+from llm.embeddings import set_openai_client
+from multimodal import stt_service
+from multimodal.audio import PcmAudio, decode_audio, encode_wav, frame_db, normalize_for_stt, plan_chunks
+
+WORDS = list(STT_VOCAB)  # 30단어, 약 18초
+TRANSCRIPT = " ".join(WORDS)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_LONG_AUDIO_SEC", 5.0)
+    monkeypatch.setattr(stt_service, "STT_CHUNK_SEC", 4.0)
+    monkeypatch.setattr(stt_service, "STT_CHUNK_OVERLAP_SEC", 1.0)
+    monkeypatch.setattr(stt_service, "STT_SILENCE_SEARCH_SEC", 1.0)
+    monkeypatch.setattr(stt_service, "STT_MAX_PARALLEL", 8)
+    client = FakeOpenAI(stt_latency=LatencyModel(p50_ms=100))
+    set_openai_client(client)
+    stt_service.TRANSCRIPTS.clear()
+    yield client
+    set_openai_client(None)
+    stt_service.TRANSCRIPTS.clear()
+
+
+def test_merge_overlap_drops_repeated_words():
+    assert stt_service.merge_overlap("오늘 아침에 혈압약을", "아침에, 혈압약을 먹었어요") == "먹었어요"
+    # 1단어 일치는 실제 반복일 수 있으므로 그대로
+    assert stt_service.merge_overlap("네", "네 알겠습니다") == "네 알겠습니다"
+    assert stt_service.merge_overlap("혈압약을 먹고 약", "약 먹었어요") == "약 먹었어요"
+    assert stt_service.merge_overlap("아침에 혈압약을", "아침에 혈압약을 먹었어요.") == "먹었어요."
+    assert stt_service.merge_overlap("두통이 있어요", "병원에 갔어요") == "병원에 갔어요"
+    assert stt_service.merge_overlap("", "처음") == "처음"
+
+
+def test_plan_chunks_cuts_in_silence():
+    audio = decode_audio(synth_speech(WORDS))
+    spans = plan_chunks(audio, chunk_sec=4.0, overlap_sec=1.0, search_sec=1.0)
+    assert spans[0][0] == 0.0 and spans[-1][1] == pytest.approx(audio.duration)
+    db = frame_db(audio)
+    for (_, end, _), (start, _, overlapped) in zip(spans, spans[1:]):
+        assert end == start and not overlapped  # 무음에서 잘랐으면 겹치지 않는다
+        assert db[int(end * 1000 // 20)] < -40
+    # 무음을 안 찾으면 고정 길이 + 겹침
+    fixed = plan_chunks(audio, chunk_sec=4.0, overlap_sec=1.0)
+    assert fixed[1][0] == pytest.approx(3.0)
+    assert [o for _, _, o in fixed] == [False] + [True] * (len(fixed) - 1)
+
+
+@pytest.mark.parametrize("search_sec", [1.0, 0.0])  # 무음 분할 / 고정 길이 + 겹침 제거
+def test_long_audio_is_chunked_concurrently_and_stitched(fake, monkeypatch, search_sec):
+    monkeypatch.setattr(stt_service, "STT_SILENCE_SEARCH_SEC", search_sec)
+    start = time.perf_counter()
+    text = stt_service.transcribe_audio_bytes(synth_speech(WORDS, sample_rate=44100, channels=2))
+    elapsed = time.perf_counter() - start
+
+    assert text == TRANSCRIPT
+    assert len(fake.stt_uploads) >= 4
+    assert elapsed < 0.1 * len(fake.stt_uploads)  # 청크를 동시에 전사
+
+
+def test_repeated_word_at_silence_cut_is_kept(fake):
+    # "X 오늘 오늘 어제 어제 ..." → 무음 경계(6단어마다)가 같은 단어 사이에 온다
+    doubled = WORDS[-1:] + [w for w in WORDS[:12] for _ in range(2)]
+    assert stt_service.transcribe_audio_bytes(synth_speech(doubled)) == " ".join(doubled)
+    assert len(fake.stt_uploads) > 1
+
+
+def test_iter_transcribe_yields_partials_in_order(fake):
+    pieces = list(stt_service.iter_transcribe_audio(synth_speech(WORDS)))
+    assert len(pieces) == len(fake.stt_uploads) > 1
+    assert " ".join(p for p in pieces if p) == TRANSCRIPT
+
+
+def test_normalization_downmixes_resamples_and_trims(fake, monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_LONG_AUDIO_SEC", 60.0)
+    raw = synth_speech(WORDS[:5], sample_rate=44100, channels=2, gap_sec=1.0)
+    audio = normalize_for_stt(decode_audio(raw), 16000, pad_sec=0.2)
+    assert (audio.sample_rate, audio.channels) == (16000, 1)
+    assert audio.duration == pytest.approx(5 * 0.4 + 4 * 1.0 + 2 * 0.2, abs=0.05)  # 앞뒤 1초 무음 → 0.2초
+
+    assert stt_service.transcribe_audio_bytes(raw) == "오늘 어제 아침 점심 저녁"
+    assert len(fake.stt_uploads) == 1 and fake.stt_uploads[0] < len(raw) / 5
+
+
+def test_repeated_upload_hits_transcript_cache(fake):
+    audio = synth_speech(WORDS[:3])
+    assert stt_service.transcribe_audio_bytes(audio) == "오늘 어제 아침"
+    assert list(stt_service.iter_transcribe_audio(audio)) == ["오늘 어제 아침"]
+    assert len(fake.stt_uploads) == 1
+    stt_service.transcribe_audio_bytes(audio, language="en")  # 언어가 다르면 다시 전사
+    assert len(fake.stt_uploads) == 2
+
+    # 빈 전사 결과는 캐시하지 않는다
+    silence = encode_wav(PcmAudio(np.zeros(16000, dtype=np.int16), 16000))
+    assert stt_service.transcribe_audio_bytes(silence) == ""
+    assert stt_service.transcribe_audio_bytes(silence) == ""
+    assert len(fake.stt_uploads) == 4
+
+
+def test_quiet_recording_is_not_trimmed_away(fake, monkeypatch):
+    monkeypatch.setattr(stt_service, "STT_LONG_AUDIO_SEC", 60.0)
+    t = np.arange(3 * 16000) / 16000
+    tone = 10 ** (-45 / 20) * np.sqrt(2) * np.sin(2 * np.pi * 300 * t)  # RMS -45 dBFS
+    pad = np.zeros(8000)
+    samples = (np.concatenate([pad, tone, pad]) * 32768).astype(np.int16)
+    audio = PcmAudio(samples, 16000)
+    assert frame_db(audio).max() == pytest.approx(-45, abs=0.5)
+
+    assert normalize_for_stt(audio, 16000, pad_sec=0.2).duration == pytest.approx(3.4, abs=0.05)
+    stt_service.transcribe_audio_bytes(encode_wav(audio))
+    assert len(fake.stt_uploads) == 1
@@ -0,0 +1,122 @@
+# tests/test_telemetry.py
+import time
+
+from llm.telemetry import build_debug_snapshot, collect_timings, span, timed
+
+
+def test_span_without_collector_is_noop():
+    with span("embedding"):
+        pass
+    assert "timings_ms" not in build_debug_snapshot(query="q")
+
+
+def test_collect_timings_accumulates_spans():
+    @timed("rerank")
+    def rerank():
+        time.sleep(0.002)
+
+    with collect_timings():
+        with span("embedding"):
+            time.sleep(0.002)
+        rerank()
+        rerank()
+        debug = build_debug_snapshot(query="q")
+
+    timings = debug["timings_ms"]
+    assert timings["embedding"] >= 2
+    assert timings["rerank"] >= 4
+    assert timings["total"] >= timings["embedding"] + timings["rerank"]
+
+
+def test_metrics_are_thread_safe_and_render_prometheus():
+    import threading
+    import urllib.request
+
+    from llm.telemetry import MetricsRegistry, start_metrics_server
+
+    registry = MetricsRegistry()
+    counter = registry.counter("t_requests_total", "test", ("route",))
+    hist = registry.histogram("t_latency_ms", "test", ("route",), buckets=(10, 100))
+
+    def work():
+        for i in range(1000):
+            counter.inc(route="non_medical")
+            hist.observe(i % 200, route="non_medical")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counter.value(route="non_medical") == 8000
+    assert hist.count(route="non_medical") == 8000
+    text = registry.render()
+    assert 't_requests_total{route="non_medical"} 8000' in text
+    assert 't_latency_ms_bucket{route="non_medical",le="10"} 440' in text
+    assert 't_latency_ms_bucket{route="non_medical",le="+Inf"} 8000' in text
+
+    server = start_metrics_server(0, addr="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as resp:
+            assert b"medinote_chat_requests_total" in resp.read()
+    finally:
+        server.shutdown()
+
+
+def test_queue_log_handler_drops_instead_of_blocking():
+    import logging
+    import queue
+
+    from llm.telemetry import LOG_DROPPED, JsonFormatter, _DroppingQueueHandler
+
+    q = queue.Queue(maxsize=1)
+    handler = _DroppingQueueHandler(q)
+    log = logging.getLogger("test.queue_log")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        before = LOG_DROPPED.value()
+        fields = {"user_id": "u1", "retrieved": 3}
+        for _ in range(3):
+            log.warning("%s | %s", "chat_completed", fields, extra={"event": "chat_completed", "fields": fields})
+    finally:
+        log.removeHandler(handler)
+
+    assert LOG_DROPPED.value() - before == 2
+    record = q.get_nowait()
+    # 포맷은 리스너 쪽에서: 큐에 들어간 레코드는 원본 args 를 그대로 갖고 있다
+    assert record.args == ("chat_completed", fields)
+    assert '"event": "chat_completed", "user_id": "u1"' in JsonFormatter().format(record)
+
+
+def test_langsmith_settings_are_read_from_dotenv_on_first_use(tmp_path, monkeypatch):
+    import os
+
+    from llm import config, telemetry
+
+    env = tmp_path / ".env"
+    env.write_text("LANGSMITH_API_KEY=test-key\nLANGSMITH_TRACING=true\n", encoding="utf-8")
+    monkeypatch.setattr(config, "ENV_PATH", env)
+    for key in ("LANGSMITH_API_KEY", "LANGSMITH_TRACING"):
+        monkeypatch.delenv(key, raising=False)
+    monkeypatch.setattr(telemetry, "LANGSMITH_ENABLED", None)
+    monkeypatch.setattr(telemetry, "_langsmith_ready", False)
+    monkeypatch.setattr(telemetry, "ls_trace", None)
+
+    def fake_trace(**_):
+        raise AssertionError("not entered")
+
+    def fake_init():
+        telemetry.ls_trace = fake_trace
+        return True
+
+    monkeypatch.setattr(telemetry, "_init_langsmith", fake_init)
+    config.load_env.cache_clear()
+    try:
+        assert telemetry._langsmith_trace() is fake_trace
+        assert telemetry.LANGSMITH_ENABLED is True
+    finally:
+        for key in ("LANGSMITH_API_KEY", "LANGSMITH_TRACING"):
+            os.environ.pop(key, None)
+        config.load_env.cache_clear()
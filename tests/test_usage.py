@@ -0,0 +1,48 @@
+# tests/test_usage.py
+from types import SimpleNamespace
+
+from llm.usage import UsageLedger, collect_usage, record_usage, summarize_usage
+
+
+def test_record_usage_collects_prompt_completion_and_cached_tokens():
+    usage = SimpleNamespace(
+        prompt_tokens=120,
+        completion_tokens=30,
+        total_tokens=150,
+        prompt_tokens_details=SimpleNamespace(cached_tokens=64),
+    )
+    with collect_usage() as calls:
+        record_usage("chat", "gpt-4o", usage)
+        record_usage("embedding", "text-embedding-3-small", SimpleNamespace(prompt_tokens=12, total_tokens=12))
+
+    summary = summarize_usage(calls)
+    assert summary["prompt_tokens"] == 132
+    assert summary["completion_tokens"] == 30
+    assert summary["cached_tokens"] == 64
+    assert summary["total_tokens"] == 162
+    assert [c["kind"] for c in summary["calls"]] == ["chat", "embedding"]
+
+
+def test_usage_ledger_rolling_window():
+    ledger = UsageLedger(window_sec=60)
+    ledger.add("u1", "non_medical", 100, now=0)
+    ledger.add("u1", "candidate_medical", 50, now=30)
+    ledger.add("u2", "candidate_medical", 10, now=30)
+
+    assert ledger.total(user_id="u1", now=40) == 150
+    assert ledger.total(route="candidate_medical", now=40) == 60
+    assert ledger.total(now=40) == 160
+
+    # 첫 이벤트가 윈도우 밖으로 빠짐
+    assert ledger.total(user_id="u1", now=70) == 50
+    assert ledger.snapshot(now=70)["by_user_route"] == {"u1|candidate_medical": 50, "u2|candidate_medical": 10}
+
+
+def test_usage_ledger_drops_expired_keys_without_reads():
+    ledger = UsageLedger(window_sec=60)
+    for i in range(100):
+        ledger.add(f"u{i}", "candidate_medical", 10, now=i)
+    # 예산 확인(total) 없이 add 만 계속 불려도 지난 사용자 키는 정리된다
+    ledger.add("late", "candidate_medical", 10, now=500)
+    assert len(ledger) == 4
+    assert ledger.snapshot(now=500)["by_user"] == {"late": 10}